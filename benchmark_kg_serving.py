@@ -0,0 +1,198 @@
+"""
+So sánh bộ nhớ (RSS + tracemalloc) và độ trễ tra cứu giữa nx.DiGraph, CompactKnowledgeGraph
+và KGSnapshot (mmap) cho đúng mẫu truy cập của retrieval_service._compile_context.
+
+Ví dụ:
+    python benchmark_kg_serving.py                          # dùng config.GRAPH_FILE_TO_LOAD
+    python benchmark_kg_serving.py --synthetic-docs 2000    # KG giả lập, không cần file
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import networkx as nx
+
+from src.knowledge_graph.compact_kg import CompactKnowledgeGraph
+from src.knowledge_graph.kg_loader_service import load_nx_graph_from_file
+from src.knowledge_graph.kg_snapshot import KGSnapshot, write_kg_snapshot
+
+
+def build_synthetic_graph(num_docs: int, chunks_per_doc: int) -> nx.DiGraph:
+    """KG giả lập cùng cấu trúc với kg_builder_service (Document -HAS_CHUNK-> Chunk, NEXT_CHUNK)."""
+    rng = random.Random(42)
+    graph = nx.DiGraph()
+    for d in range(num_docs):
+        doc_node_id = f"doc:tai_lieu_{d}"
+        graph.add_node(
+            doc_node_id,
+            type="Document",
+            name=f"tai_lieu_{d}",
+            original_filename=f"tai_lieu_{d}.md",
+            summary=f"Tóm tắt tài liệu {d} về sản phẩm tiết kiệm và thẻ tín dụng.",
+            keywords="tiết kiệm, lãi suất, thẻ tín dụng",
+        )
+        previous_chunk_node_id = None
+        for i in range(chunks_per_doc):
+            chunk_node_id = f"chunk:tai_lieu_{d}_{i}"
+            text = " ".join(
+                rng.choice(["lãi", "suất", "tiết", "kiệm", "kỳ", "hạn", "thẻ", "phí"])
+                for _ in range(120)
+            )
+            graph.add_node(
+                chunk_node_id,
+                type="Chunk",
+                text_content=text,
+                order_in_doc=i,
+                source_document_id=doc_node_id,
+            )
+            graph.add_edge(doc_node_id, chunk_node_id, type="HAS_CHUNK")
+            if previous_chunk_node_id:
+                graph.add_edge(previous_chunk_node_id, chunk_node_id, type="NEXT_CHUNK")
+            previous_chunk_node_id = chunk_node_id
+    return graph
+
+
+def _current_rss_mb():
+    """RSS hiện tại của process (MB), đọc từ /proc (Linux). None nếu không hỗ trợ."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _load_graph(args) -> nx.DiGraph:
+    if args.synthetic_docs:
+        return build_synthetic_graph(args.synthetic_docs, args.chunks_per_doc)
+    return load_nx_graph_from_file(args.graph_file)
+
+
+def _measure_memory(args, representation: str, result_queue):
+    """Chạy trong process con để RSS của mỗi dạng biểu diễn không ảnh hưởng lẫn nhau."""
+    gc.collect()
+    rss_before = _current_rss_mb()
+    tracemalloc.start()
+    if representation == "snapshot":
+        graph = KGSnapshot(args.snapshot_file)
+    else:
+        graph = _load_graph(args)
+    if representation == "compact":
+        graph = CompactKnowledgeGraph.from_networkx(graph)
+    gc.collect()
+    traced_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = _current_rss_mb()
+    result_queue.put(
+        {
+            "representation": representation,
+            "traced_mb": traced_bytes / (1024 * 1024),
+            "peak_mb": peak_bytes / (1024 * 1024),
+            "rss_delta_mb": (
+                rss_after - rss_before
+                if rss_before is not None and rss_after is not None
+                else None
+            ),
+        }
+    )
+
+
+def _lookup_like_compile_context(knowledge_graph, chunk_ids) -> int:
+    """Lặp lại đúng các truy cập KG của _compile_context cho mỗi chunk."""
+    found = 0
+    for chunk_id in chunk_ids:
+        if knowledge_graph.has_node(chunk_id):
+            kg_node_data = knowledge_graph.nodes[chunk_id]
+            doc_id_of_chunk = kg_node_data.get("source_document_id")
+            if doc_id_of_chunk and knowledge_graph.has_node(doc_id_of_chunk):
+                doc_kg_data = knowledge_graph.nodes[doc_id_of_chunk]
+                if doc_kg_data.get("summary") and doc_kg_data.get("keywords"):
+                    found += 1
+    return found
+
+
+def _measure_lookup_latency(knowledge_graph, chunk_ids, repeats: int) -> float:
+    """Trả về độ trễ trung bình (micro-giây) cho một lần tra cứu chunk + document."""
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        _lookup_like_compile_context(knowledge_graph, chunk_ids)
+    elapsed = time.perf_counter() - start_time
+    return elapsed / (repeats * len(chunk_ids)) * 1e6
+
+
+def main():
+    import config
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--graph-file", default=config.GRAPH_FILE_TO_LOAD)
+    parser.add_argument("--synthetic-docs", type=int, default=0)
+    parser.add_argument("--chunks-per-doc", type=int, default=30)
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    nx_graph = _load_graph(args)
+    if nx_graph is None:
+        print("LỖI: Không tải được KG.")
+        return
+    snapshot_dir = tempfile.mkdtemp(prefix="kg_snapshot_bench_")
+    args.snapshot_file = write_kg_snapshot(
+        nx_graph, os.path.join(snapshot_dir, "bench.kgsnap")
+    )
+
+    # Lưu ý: RSS của "compact" gồm cả đỉnh bộ nhớ khi đọc GraphML sang nx.DiGraph trung gian
+    # (allocator không trả hết bộ nhớ về OS); "tracemalloc" là phần thực sự còn giữ lại.
+    # RSS của "snapshot" chỉ tính các trang mmap đã chạm tới (dùng chung giữa các worker).
+    print("--- Bộ nhớ (mỗi dạng đo trong một process riêng) ---")
+    for representation in ("networkx", "compact", "snapshot"):
+        result_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=_measure_memory, args=(args, representation, result_queue)
+        )
+        process.start()
+        result = result_queue.get()
+        process.join()
+        rss_text = (
+            f"{result['rss_delta_mb']:.1f} MB"
+            if result["rss_delta_mb"] is not None
+            else "không đo được"
+        )
+        print(
+            f"  {representation:<9} tracemalloc: {result['traced_mb']:.1f} MB (đỉnh {result['peak_mb']:.1f} MB) | RSS tăng: {rss_text}"
+        )
+
+    print("--- Độ trễ tra cứu (mẫu truy cập của _compile_context) ---")
+    compact_graph = CompactKnowledgeGraph.from_networkx(nx_graph)
+    snapshot_graph = KGSnapshot(args.snapshot_file)
+    chunk_node_ids = [
+        node_id
+        for node_id, data in nx_graph.nodes(data=True)
+        if data.get("type") == "Chunk"
+    ]
+    if not chunk_node_ids:
+        print("LỖI: KG không có node Chunk nào để tra cứu.")
+        return
+    rng = random.Random(0)
+    sample_ids = [rng.choice(chunk_node_ids) for _ in range(args.lookups)]
+    expected_found = _lookup_like_compile_context(nx_graph, sample_ids)
+    assert expected_found == _lookup_like_compile_context(compact_graph, sample_ids)
+    assert expected_found == _lookup_like_compile_context(snapshot_graph, sample_ids)
+    for name, graph in (
+        ("networkx", nx_graph),
+        ("compact", compact_graph),
+        ("snapshot", snapshot_graph),
+    ):
+        latency_us = _measure_lookup_latency(graph, sample_ids, args.repeats)
+        print(f"  {name:<9} {latency_us:.3f} µs/lần tra cứu")
+    snapshot_graph.close()
+    os.remove(args.snapshot_file)
+    os.rmdir(snapshot_dir)
+
+
+if __name__ == "__main__":
+    main()
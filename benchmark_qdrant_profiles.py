@@ -0,0 +1,217 @@
+"""
+So sánh các profile collection Qdrant (config.QDRANT_COLLECTION_PROFILES): độ trễ tìm kiếm,
+recall@k so với tìm kiếm chính xác (exact) và bộ nhớ vector ước tính, trên đúng số điểm của
+corpus hiện tại. Mỗi profile được tạo thành một collection tạm "<collection>__bench_<profile>"
+(vector copy từ collection thật hoặc sinh ngẫu nhiên), đo xong thì xóa.
+
+Cần Qdrant server thật (chế độ local ":memory:" không có HNSW / quantization).
+
+Ví dụ:
+    python benchmark_qdrant_profiles.py                          # vector từ QDRANT_COLLECTION_NAME
+    python benchmark_qdrant_profiles.py --synthetic 20000 --k 5
+    python benchmark_qdrant_profiles.py --profiles balanced scalar-int8 --hnsw-ef 32 64 128
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+
+from qdrant_client import QdrantClient, models
+
+import config
+from src.vector_store.qdrant_service import (
+    build_collection_profile_kwargs,
+    build_qdrant_client_kwargs,
+    build_search_params,
+)
+
+BENCH_SUFFIX = "__bench_"
+
+
+def _normalize(vector: list) -> list:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _load_corpus_vectors(client: QdrantClient, args) -> list:
+    if args.synthetic:
+        rng = random.Random(0)
+        # Vector quanh một số tâm cụm, gần với phân bố embedding thật hơn là nhiễu đều
+        centers = [
+            [rng.gauss(0, 1) for _ in range(args.dimension)] for _ in range(64)
+        ]
+        return [
+            _normalize([c + rng.gauss(0, 0.6) for c in rng.choice(centers)])
+            for _ in range(args.synthetic)
+        ]
+    vectors = []
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=args.collection,
+            limit=512,
+            offset=offset,
+            with_payload=False,
+            with_vectors=True,
+        )
+        for point in points:
+            vector = point.vector
+            if isinstance(vector, dict):  # Named vectors (ví dụ có sparse): lấy dense ""
+                vector = vector.get("")
+            if vector:
+                vectors.append(vector)
+        if offset is None:
+            break
+    return vectors
+
+
+def _make_queries(corpus_vectors: list, num_queries: int, noise: float) -> list:
+    rng = random.Random(1)
+    return [
+        _normalize([x + rng.gauss(0, noise) for x in rng.choice(corpus_vectors)])
+        for _ in range(num_queries)
+    ]
+
+
+def _create_bench_collection(
+    client: QdrantClient, name: str, profile: dict, vectors: list, dimension: int
+):
+    client.delete_collection(collection_name=name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=models.VectorParams(
+            size=dimension,
+            distance=models.Distance.COSINE,
+            on_disk=profile.get("on_disk"),
+        ),
+        # indexing_threshold nhỏ để HNSW luôn được dựng, kể cả với corpus nhỏ
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=1),
+        **build_collection_profile_kwargs(profile),
+    )
+    batch_size = 256
+    for start in range(0, len(vectors), batch_size):
+        client.upsert(
+            collection_name=name,
+            points=[
+                models.PointStruct(id=start + i, vector=vector)
+                for i, vector in enumerate(vectors[start : start + batch_size])
+            ],
+            wait=True,
+        )
+    # Chờ optimizer dựng xong HNSW / quantization
+    deadline = time.monotonic() + 600
+    while time.monotonic() < deadline:
+        info = client.get_collection(collection_name=name)
+        if info.status == models.CollectionStatus.GREEN:
+            return info
+        time.sleep(1)
+    print(f"  CẢNH BÁO: '{name}' chưa index xong sau 600 giây, kết quả có thể chưa chính xác.")
+    return client.get_collection(collection_name=name)
+
+
+def _search_ids(client, name, query_vector, k, search_params) -> list:
+    response = client.query_points(
+        collection_name=name,
+        query=query_vector,
+        limit=k,
+        search_params=search_params,
+        with_payload=False,
+    )
+    return [point.id for point in response.points]
+
+
+def _estimate_vector_ram_mb(profile: dict, num_vectors: int, dimension: int) -> float:
+    """RAM cho dữ liệu vector (không tính đồ thị HNSW): float32 nếu không on_disk + bản lượng tử hóa."""
+    ram_bytes = 0 if profile.get("on_disk") else num_vectors * dimension * 4
+    if profile.get("quantization") == "scalar":
+        ram_bytes += num_vectors * dimension
+    elif profile.get("quantization") == "binary":
+        ram_bytes += num_vectors * math.ceil(dimension / 8)
+    return ram_bytes / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--collection", default=config.QDRANT_COLLECTION_NAME)
+    parser.add_argument("--dimension", type=int, default=config.VECTOR_DIMENSION)
+    parser.add_argument("--synthetic", type=int, default=0, help="Số vector ngẫu nhiên thay cho corpus thật")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=config.QDRANT_SEARCH_LIMIT)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        choices=list(config.QDRANT_COLLECTION_PROFILES),
+        default=list(config.QDRANT_COLLECTION_PROFILES),
+    )
+    parser.add_argument(
+        "--hnsw-ef", type=int, nargs="*", default=[], help="Các giá trị hnsw_ef cần thử thêm"
+    )
+    parser.add_argument("--keep", action="store_true", help="Giữ lại các collection tạm")
+    args = parser.parse_args()
+
+    if not config.QDRANT_CONNECTION_PARAMS:
+        print("LỖI: QDRANT_CONNECTION_PARAMS chưa được cấu hình.")
+        return
+    client = QdrantClient(
+        **build_qdrant_client_kwargs(
+            config.QDRANT_CONNECTION_PARAMS, config.QDRANT_TRANSPORT_PARAMS
+        )
+    )
+    corpus_vectors = _load_corpus_vectors(client, args)
+    if not corpus_vectors:
+        print("LỖI: Không có vector nào để benchmark.")
+        return
+    dimension = len(corpus_vectors[0])
+    query_vectors = _make_queries(corpus_vectors, args.queries, args.noise)
+    print(
+        f"--- {len(corpus_vectors)} vector ({dimension} chiều), {len(query_vectors)} truy vấn, recall@{args.k} ---"
+    )
+
+    ground_truth = None
+    bench_collections = []
+    try:
+        for profile_name in args.profiles:
+            profile = config.QDRANT_COLLECTION_PROFILES[profile_name]
+            name = f"{args.collection}{BENCH_SUFFIX}{profile_name}"
+            bench_collections.append(name)
+            start_time = time.perf_counter()
+            _create_bench_collection(client, name, profile, corpus_vectors, dimension)
+            build_seconds = time.perf_counter() - start_time
+
+            if ground_truth is None:
+                exact_params = models.SearchParams(exact=True)
+                ground_truth = [
+                    set(_search_ids(client, name, q, args.k, exact_params))
+                    for q in query_vectors
+                ]
+
+            hnsw_ef_values = [profile.get("search_hnsw_ef")] + [
+                ef for ef in args.hnsw_ef if ef != profile.get("search_hnsw_ef")
+            ]
+            for hnsw_ef in hnsw_ef_values:
+                search_params = build_search_params(dict(profile, search_hnsw_ef=hnsw_ef))
+                _search_ids(client, name, query_vectors[0], args.k, search_params)  # Làm ấm
+                latencies_ms = []
+                recalls = []
+                for query_vector, expected_ids in zip(query_vectors, ground_truth):
+                    query_start = time.perf_counter()
+                    found_ids = _search_ids(client, name, query_vector, args.k, search_params)
+                    latencies_ms.append((time.perf_counter() - query_start) * 1000)
+                    recalls.append(len(expected_ids & set(found_ids)) / max(1, len(expected_ids)))
+                latencies_ms.sort()
+                print(
+                    f"  {profile_name:<14} hnsw_ef={hnsw_ef!s:<4} recall@{args.k}: {statistics.mean(recalls):.4f}"
+                    f" | p50: {statistics.median(latencies_ms):.2f} ms | p95: {latencies_ms[int(0.95 * (len(latencies_ms) - 1))]:.2f} ms"
+                    f" | RAM vector ~{_estimate_vector_ram_mb(profile, len(corpus_vectors), dimension):.1f} MB"
+                    f" | dựng index {build_seconds:.1f} s"
+                )
+    finally:
+        if not args.keep:
+            for name in bench_collections:
+                client.delete_collection(collection_name=name)
+
+
+if __name__ == "__main__":
+    main()
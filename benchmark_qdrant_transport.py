@@ -0,0 +1,134 @@
+"""
+So sánh độ trễ tìm kiếm Qdrant giữa các transport: REST (HTTP/1.1), REST HTTP/2 có pool
+keep-alive và gRPC. Mỗi transport dùng một AsyncQdrantClient riêng, đo lần gọi đầu (kết nối lạnh)
+và các lần gọi sau trên kết nối đã ấm, tuần tự và đồng thời.
+
+Ví dụ:
+    python benchmark_qdrant_transport.py                         # dùng QDRANT_CONNECTION_PARAMS
+    python benchmark_qdrant_transport.py --queries 500 --concurrency 16
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import config
+from src.vector_store.qdrant_service import (
+    create_async_qdrant_client,
+    search_qdrant_collection_async,
+)
+from src.retrieval.chunk_store import SLIM_PAYLOAD_FIELDS
+
+TRANSPORTS = {
+    "rest": {"http2": False},
+    "rest-http2": {"http2": True},
+    "grpc": {"prefer_grpc": True},
+}
+
+
+def _random_vectors(count: int, dimension: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [[rng.uniform(-1.0, 1.0) for _ in range(dimension)] for _ in range(count)]
+
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def _timed_search(client, args, query_vector) -> float:
+    start_time = time.perf_counter()
+    await search_qdrant_collection_async(
+        client,
+        args.collection,
+        query_vector,
+        args.limit,
+        payload_fields=SLIM_PAYLOAD_FIELDS if args.slim_payload else None,
+        timeout=config.QDRANT_SEARCH_TIMEOUT_SECONDS,
+    )
+    return (time.perf_counter() - start_time) * 1000
+
+
+async def _benchmark_transport(name: str, args, query_vectors: list) -> dict:
+    transport_params = dict(config.QDRANT_TRANSPORT_PARAMS)
+    transport_params.update(prefer_grpc=False, http2=False)
+    transport_params.update(TRANSPORTS[name])
+    transport_params["pool_max_connections"] = max(
+        args.concurrency, transport_params.get("pool_max_connections") or 0
+    )
+    client = create_async_qdrant_client(config.QDRANT_CONNECTION_PARAMS, transport_params)
+    if client is None:
+        return {"transport": name, "error": "không tạo được client"}
+    try:
+        cold_ms = await _timed_search(client, args, query_vectors[0])
+
+        sequential_ms = []
+        for query_vector in query_vectors:
+            sequential_ms.append(await _timed_search(client, args, query_vector))
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def _limited(query_vector):
+            async with semaphore:
+                return await _timed_search(client, args, query_vector)
+
+        start_time = time.perf_counter()
+        concurrent_ms = await asyncio.gather(*(_limited(v) for v in query_vectors))
+        concurrent_elapsed = time.perf_counter() - start_time
+    finally:
+        await client.close()
+
+    sequential_ms.sort()
+    concurrent_ms = sorted(concurrent_ms)
+    return {
+        "transport": name,
+        "cold_ms": cold_ms,
+        "p50_ms": statistics.median(sequential_ms),
+        "p95_ms": _percentile(sequential_ms, 0.95),
+        "concurrent_p95_ms": _percentile(concurrent_ms, 0.95),
+        "concurrent_qps": len(query_vectors) / concurrent_elapsed,
+    }
+
+
+async def _run(args):
+    query_vectors = _random_vectors(args.queries, args.dimension)
+    print(
+        f"--- Tìm kiếm '{args.collection}' (limit {args.limit}, {args.queries} truy vấn, đồng thời {args.concurrency}, payload {'rút gọn' if args.slim_payload else 'đầy đủ'}) ---"
+    )
+    for name in args.transports:
+        result = await _benchmark_transport(name, args, query_vectors)
+        if "error" in result:
+            print(f"  {name:<11} LỖI: {result['error']}")
+            continue
+        print(
+            f"  {name:<11} lần đầu: {result['cold_ms']:.1f} ms | p50: {result['p50_ms']:.2f} ms | p95: {result['p95_ms']:.2f} ms"
+            f" | đồng thời p95: {result['concurrent_p95_ms']:.2f} ms, {result['concurrent_qps']:.0f} truy vấn/s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--collection", default=config.QDRANT_COLLECTION_NAME)
+    parser.add_argument("--dimension", type=int, default=config.VECTOR_DIMENSION)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=config.QDRANT_SEARCH_LIMIT)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--transports", nargs="+", choices=list(TRANSPORTS), default=list(TRANSPORTS)
+    )
+    parser.add_argument(
+        "--full-payload",
+        dest="slim_payload",
+        action="store_false",
+        help="Lấy toàn bộ payload thay vì chỉ graph_node_id/node_type",
+    )
+    args = parser.parse_args()
+    if not config.QDRANT_CONNECTION_PARAMS:
+        print("LỖI: QDRANT_CONNECTION_PARAMS chưa được cấu hình.")
+        return
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,8 @@ def main_chatbot_application():
             retry_wait_seconds=config.RETRY_WAIT_SECONDS,
             max_retries_per_key_cycle=config.MAX_RETRIES_PER_KEY_CYCLE,
             api_key_prefix=config.GEMINI_API_KEY_PREFIX,
+            requests_per_minute_per_key=config.GEMINI_REQUESTS_PER_MINUTE_PER_KEY,
+            backoff_base_seconds=config.GEMINI_BACKOFF_BASE_SECONDS,
         )
     except ValueError as e:
         print(e)
@@ -48,7 +50,7 @@ def main_chatbot_application():
     )
     # Tuy nhiên, generation_service có thể cần tên model
     # Hoặc ApiKeyManager có thể được điều chỉnh để nhận model object
-    # Hiện tại, execute_generative_call trong manager của tôi tạo model object.
+    # Hiện tại, execute_generative_call trong manager dựng request và gọi thẳng client của key.
     print(f"Sử dụng model sinh văn bản Gemini: {config.GENERATION_MODEL_NAME}")
 
     print(f"\n--- Chào mừng bạn đến với Trợ lý ảo Ngân hàng Kienlongbank ---")
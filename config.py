@@ -30,6 +30,20 @@ QDRANT_COLLECTION_NAME = os.getenv(
     QDRANT_COLLECTION_NAME_ENV_VAR, "knowledge_graph_embeddings_v2"
 )
 
+# Nơi lưu vector: "qdrant" (Qdrant Cloud/server) hoặc "local" (chỉ mục NumPy trong process,
+# src/vector_store/local_index.py) cho dev / CI / benchmark / triển khai nhỏ không có Qdrant.
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "qdrant").lower()
+# Thư mục snapshot của chỉ mục cục bộ (vectors.npy mmap + points.json [+ ivf.npz])
+LOCAL_VECTOR_INDEX_DIR = os.getenv(
+    "LOCAL_VECTOR_INDEX_DIR",
+    os.path.join(PROJECT_ROOT, "data", "05_local_vector_index"),
+)
+# float16 giảm một nửa bộ nhớ vector, sai số điểm cosine ~1e-3
+LOCAL_VECTOR_INDEX_DTYPE = os.getenv("LOCAL_VECTOR_INDEX_DTYPE", "float32").lower()
+# Số cụm IVF dựng khi ghi snapshot (0 = chỉ brute force, đủ nhanh tới vài trăm nghìn vector)
+LOCAL_VECTOR_INDEX_IVF_LISTS = int(os.getenv("LOCAL_VECTOR_INDEX_IVF_LISTS", "0"))
+LOCAL_VECTOR_INDEX_IVF_NPROBE = int(os.getenv("LOCAL_VECTOR_INDEX_IVF_NPROBE", "8"))
+
 QDRANT_CONNECTION_PARAMS = {}
 if QDRANT_CLOUD_URI:
     QDRANT_CONNECTION_PARAMS["url"] = QDRANT_CLOUD_URI
@@ -42,11 +56,38 @@ if QDRANT_CLOUD_URI:
     print(
         f"Thông tin (config.py): Qdrant sẽ kết nối bằng Cloud URI: {QDRANT_CLOUD_URI} (API key {'đã' if QDRANT_API_KEY else 'chưa/không'} cấu hình)."
     )
+elif VECTOR_STORE_BACKEND == "local":
+    print(
+        "Thông tin (config.py): VECTOR_STORE_BACKEND=local, dùng chỉ mục vector cục bộ (không cần Qdrant)."
+    )
 else:
     print(
         f"LỖI (config.py): QDRANT_CLOUD_URI CHƯA được thiết lập trong file .env. Không thể cấu hình kết nối Qdrant Cloud."
     )
 
+# Transport Qdrant: gRPC (prefer_grpc, cổng 6334) hoặc REST qua pool httpx HTTP/2 giữ kết nối ấm.
+# QDRANT_POOL_MAX_CONNECTIONS nên >= số request đồng thời tối đa của một worker API.
+# QDRANT_SEARCH_TIMEOUT_SECONDS là timeout riêng cho mỗi lần tìm kiếm (khác timeout chung của client).
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_HTTP2 = os.getenv("QDRANT_HTTP2", "true").lower() == "true"
+QDRANT_POOL_MAX_CONNECTIONS = int(os.getenv("QDRANT_POOL_MAX_CONNECTIONS", "32"))
+QDRANT_KEEPALIVE_SECONDS = float(os.getenv("QDRANT_KEEPALIVE_SECONDS", "60"))
+QDRANT_CLIENT_TIMEOUT_SECONDS = int(os.getenv("QDRANT_CLIENT_TIMEOUT_SECONDS", "20"))
+QDRANT_SEARCH_TIMEOUT_SECONDS = int(os.getenv("QDRANT_SEARCH_TIMEOUT_SECONDS", "5"))
+QDRANT_CHECK_COMPATIBILITY = (
+    os.getenv("QDRANT_CHECK_COMPATIBILITY", "false").lower() == "true"
+)
+QDRANT_TRANSPORT_PARAMS = {
+    "prefer_grpc": QDRANT_PREFER_GRPC,
+    "grpc_port": QDRANT_GRPC_PORT,
+    "http2": QDRANT_HTTP2,
+    "pool_max_connections": QDRANT_POOL_MAX_CONNECTIONS,
+    "keepalive_seconds": QDRANT_KEEPALIVE_SECONDS,
+    "timeout": QDRANT_CLIENT_TIMEOUT_SECONDS,
+    "check_compatibility": QDRANT_CHECK_COMPATIBILITY,
+}
+
 VECTOR_DIMENSION = 768
 MONGO_USERNAME_ENV_VAR = "MONGO_USERNAME"
 MONGO_PASSWORD_ENV_VAR = "MONGO_PASSWORD"
@@ -103,6 +144,33 @@ EMBEDDING_TASK_TYPE_QUERY = "RETRIEVAL_QUERY"
 EMBEDDING_TASK_TYPE_QUERY = "RETRIEVAL_QUERY"
 # Số lượng đoạn văn bản gửi cho Gemini API trong một lượt gọi embedding
 EMBEDDING_BATCH_SIZE = 32
+# Số batch embedding gửi song song (chia trên các GEMINI_API_KEY_n, mỗi key vẫn theo
+# GEMINI_REQUESTS_PER_MINUTE_PER_KEY). 0 = 2 batch / key.
+EMBEDDING_MAX_CONCURRENT_BATCHES = int(
+    os.getenv("EMBEDDING_MAX_CONCURRENT_BATCHES", "0")
+)
+# Kho embedding bền vững trên đĩa (khóa: model, task_type, sha256 văn bản) dùng khi index:
+# tạo lại collection / chuyển cluster Qdrant không phải gọi lại Gemini cho văn bản không đổi.
+EMBEDDING_STORE_ACTIVE = os.getenv("EMBEDDING_STORE_ACTIVE", "true").lower() == "true"
+EMBEDDING_STORE_DIR = os.getenv(
+    "EMBEDDING_STORE_DIR", os.path.join(PROJECT_ROOT, "data", "06_embedding_store")
+)
+# Pipeline index dạng luồng (run_kg_builder_pipeline): số mục mỗi cửa sổ KG -> embed -> upsert
+# (nên >= EMBEDDING_BATCH_SIZE * số batch song song) và số cửa sổ tối đa chờ giữa hai stage.
+INDEXING_STREAM_WINDOW_SIZE = int(os.getenv("INDEXING_STREAM_WINDOW_SIZE", "512"))
+INDEXING_STREAM_QUEUE_SIZE = int(os.getenv("INDEXING_STREAM_QUEUE_SIZE", "2"))
+# Upsert Qdrant khi index: batch chia theo kích thước payload (byte, tối đa QDRANT_UPSERT_BATCH_SIZE
+# điểm), gửi song song với wait=False trên QDRANT_UPSERT_PARALLEL luồng, một rào chắn wait=True +
+# kiểm tra ở cuối. Batch lỗi được thử lại QDRANT_UPSERT_MAX_RETRIES lần (backoff lũy thừa).
+QDRANT_UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))
+QDRANT_UPSERT_MAX_BATCH_BYTES = int(
+    os.getenv("QDRANT_UPSERT_MAX_BATCH_BYTES", str(4 * 1024 * 1024))
+)
+QDRANT_UPSERT_PARALLEL = int(os.getenv("QDRANT_UPSERT_PARALLEL", "4"))
+QDRANT_UPSERT_MAX_RETRIES = int(os.getenv("QDRANT_UPSERT_MAX_RETRIES", "3"))
+QDRANT_UPSERT_BACKOFF_BASE_SECONDS = float(
+    os.getenv("QDRANT_UPSERT_BACKOFF_BASE_SECONDS", "0.5")
+)
 # ... (các model khác nếu có)
 MAX_DOC_CHARS_FOR_SUMMARY = 200000
 BANK_HOMEPAGE_URL = "https://kienlongbank.com"
@@ -155,19 +223,216 @@ print(f"DEBUG (config.py): KG_GRAPHML_OUTPUT_FILE = {KG_GRAPHML_OUTPUT_FILE}")
 # GRAPH_FILE_TO_LOAD = os.path.join(_PROJECT_ROOT, "src", "data_processing", "document_knowledge_graph.graphml")
 # Sửa lại đường dẫn cho phù hợp với vị trí file graphml của bạn. Ví dụ:
 GRAPH_FILE_TO_LOAD = os.path.join(KG_OUTPUT_DIR, "document_knowledge_graph.graphml")
+# Dạng KG khi phục vụ API:
+#   "snapshot": mmap file snapshot nhị phân (.kgsnap) cạnh file GraphML, dùng chung giữa các worker;
+#               nếu snapshot chưa có/cũ hơn GraphML thì đọc GraphML và ghi lại snapshot.
+#   "compact" : CompactKnowledgeGraph (chỉ đọc, gọn nhẹ) dựng từ GraphML.
+#   "networkx": nx.DiGraph đầy đủ như trước.
+KG_SERVING_FORMAT = os.getenv("KG_SERVING_FORMAT", "snapshot").lower()
 
 # GRAPH_FILE_TO_LOAD = "E:/kienlong/banking_ai_platform/src/data_processing/document_knowledge_graph.graphml"
 
 # Gemini API Keys & Retry Logic
 RETRY_WAIT_SECONDS = 60
 MAX_RETRIES_PER_KEY_CYCLE = 2
+# Giới hạn tốc độ riêng cho MỖI key (token bucket, burst = quota một phút). Mặc định 0 = không
+# giới hạn phía client (như trước); đặt bằng quota RPM của key nếu muốn tránh lỗi 429.
+# Tổng throughput tăng theo số lượng GEMINI_API_KEY_n được cấu hình.
+GEMINI_REQUESTS_PER_MINUTE_PER_KEY = float(
+    os.getenv("GEMINI_REQUESTS_PER_MINUTE_PER_KEY", "0")
+)
+# Backoff khi một key gặp lỗi mà response không có gợi ý retry_delay:
+# base * 2^(số lỗi liên tiếp - 1) (có jitter), tối đa RETRY_WAIT_SECONDS.
+GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "1"))
+# Thời gian tối đa cho các lệnh gọi Gemini trong một request API (/chat, /search).
+# Quá hạn này API trả về câu trả lời fallback thay vì chờ key hết quota.
+API_GEMINI_DEADLINE_SECONDS = float(os.getenv("API_GEMINI_DEADLINE_SECONDS", "25"))
 # API_CALL_TIMEOUT_SECONDS = 120 # Hiện tại chưa dùng trong safe_gemini_api_call
 
+# Cache embedding câu hỏi (khóa: câu hỏi đã chuẩn hóa + model + task_type)
+QUERY_EMBEDDING_CACHE_ACTIVE = True
+QUERY_EMBEDDING_CACHE_MAX_ENTRIES = int(
+    os.getenv("QUERY_EMBEDDING_CACHE_MAX_ENTRIES", "5000")
+)
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = float(
+    os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", str(24 * 3600))
+)
+# Tầng cache dùng chung giữa các worker (file SQLite). Để trống để chỉ dùng cache trong process.
+QUERY_EMBEDDING_CACHE_SQLITE_PATH = os.getenv("QUERY_EMBEDDING_CACHE_SQLITE_PATH")
+
+# Cache câu trả lời theo ngữ nghĩa cho /chat (cùng ngữ cảnh truy xuất + câu hỏi gần giống nhau)
+ANSWER_CACHE_ACTIVE = True
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(6 * 3600)))
+ANSWER_CACHE_SIMILARITY_THRESHOLD = float(
+    os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", "0.95")
+)
+# Phiên bản dữ liệu (KG + Qdrant) được kiểm tra lại sau mỗi khoảng thời gian này;
+# khi thay đổi các cache kết quả tự bị xóa. DATA_VERSION_TAG cho phép ép đổi phiên bản thủ công.
+DATA_VERSION_REFRESH_SECONDS = float(os.getenv("DATA_VERSION_REFRESH_SECONDS", "60"))
+DATA_VERSION_TAG = os.getenv("DATA_VERSION_TAG", "")
+
+# Tìm kiếm hybrid: ngoài dense vector (Gemini), mỗi điểm có thêm sparse vector BM25 tiếng Việt
+# (src/embedding/sparse_encoder.py). Khi truy xuất, dense và sparse chạy trong một lần gọi
+# query_points (prefetch) và được hợp nhất bằng Reciprocal Rank Fusion.
+# Collection phải được tạo lại (pipeline embedding) để có sparse vector.
+HYBRID_SEARCH_ACTIVE = os.getenv("HYBRID_SEARCH_ACTIVE", "true").lower() == "true"
+SPARSE_VECTOR_NAME = os.getenv("SPARSE_VECTOR_NAME", "text-sparse")
+HYBRID_PREFETCH_LIMIT = int(os.getenv("HYBRID_PREFETCH_LIMIT", "20"))
+
+# Payload Qdrant rút gọn: khi tìm kiếm chỉ lấy graph_node_id/node_type, văn bản được lấy
+# từ ChunkTextStore (dựng từ KG lúc startup). ChunkTextStore luôn được dùng cho hit có payload
+# không chứa văn bản, nên hai cờ độc lập với nhau.
+# QDRANT_PAYLOAD_INCLUDE_TEXT=false (tùy chọn) khi index để không lưu original_text/summary/keywords
+# trong Qdrant; khi đó API cần KG khớp với collection.
+QDRANT_SLIM_PAYLOAD_ACTIVE = (
+    os.getenv("QDRANT_SLIM_PAYLOAD_ACTIVE", "true").lower() == "true"
+)
+QDRANT_PAYLOAD_INCLUDE_TEXT = (
+    os.getenv("QDRANT_PAYLOAD_INCLUDE_TEXT", "true").lower() == "true"
+)
+CHUNK_STORE_CACHE_MAX_ENTRIES = int(os.getenv("CHUNK_STORE_CACHE_MAX_ENTRIES", "4096"))
+
+# Profile collection Qdrant (HNSW, lưu vector gốc trên đĩa, quantization + rescore).
+# Áp dụng khi tạo collection (pipeline embedding với recreate); search_* là SearchParams cho mỗi lần tìm.
+# - balanced: vector float32 trong RAM, HNSW mặc định.
+# - scalar-int8: thêm bản int8 trong RAM (~4 lần nhỏ hơn), rescore bằng vector gốc.
+# - binary-ondisk: vector gốc trên đĩa, chỉ giữ bản nhị phân trong RAM (~32 lần nhỏ hơn);
+#   oversampling cao để bù độ chính xác.
+# - high-recall: đồ thị HNSW dày hơn, hnsw_ef lớn hơn (chậm hơn, recall cao hơn).
+# So sánh độ trễ / recall@k: python benchmark_qdrant_profiles.py
+QDRANT_COLLECTION_PROFILES = {
+    "balanced": {
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "on_disk": False,
+        "quantization": None,
+        "search_hnsw_ef": None,  # None: để Qdrant dùng hnsw_ef mặc định (như trước khi có profile)
+    },
+    "scalar-int8": {
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "on_disk": True,
+        "quantization": "scalar",
+        "quantization_always_ram": True,
+        "search_hnsw_ef": 64,
+        "search_rescore": True,
+        "search_oversampling": 2.0,
+    },
+    "binary-ondisk": {
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "on_disk": True,
+        "quantization": "binary",
+        "quantization_always_ram": True,
+        "search_hnsw_ef": 128,
+        "search_rescore": True,
+        "search_oversampling": 4.0,
+    },
+    "high-recall": {
+        "hnsw_m": 32,
+        "hnsw_ef_construct": 256,
+        "on_disk": False,
+        "quantization": None,
+        "search_hnsw_ef": 256,
+    },
+}
+QDRANT_COLLECTION_PROFILE_NAME = os.getenv("QDRANT_COLLECTION_PROFILE", "balanced")
+if QDRANT_COLLECTION_PROFILE_NAME not in QDRANT_COLLECTION_PROFILES:
+    print(
+        f"CẢNH BÁO (config.py): QDRANT_COLLECTION_PROFILE '{QDRANT_COLLECTION_PROFILE_NAME}' không hợp lệ, dùng 'balanced'."
+    )
+    QDRANT_COLLECTION_PROFILE_NAME = "balanced"
+QDRANT_COLLECTION_PROFILE = dict(
+    QDRANT_COLLECTION_PROFILES[QDRANT_COLLECTION_PROFILE_NAME]
+)
+if os.getenv("QDRANT_SEARCH_HNSW_EF"):  # Ghi đè hnsw_ef lúc tìm kiếm mà không cần tạo lại collection
+    QDRANT_COLLECTION_PROFILE["search_hnsw_ef"] = int(os.getenv("QDRANT_SEARCH_HNSW_EF"))
+
+# Index lại tăng dần (run_kg_builder_pipeline): ID điểm cố định theo graph_node_id + hash nội dung,
+# chỉ embed / upsert node mới hoặc đã sửa, ghi đè payload thay đổi và xóa điểm không còn dùng.
+INCREMENTAL_REINDEX_ACTIVE = (
+    os.getenv("INCREMENTAL_REINDEX_ACTIVE", "true").lower() == "true"
+)
+
+# Lọc theo payload: các trường có keyword payload index, và bảng từ khóa để gán
+# product_category cho tài liệu lúc index (so khớp không dấu với tên + từ khóa tài liệu,
+# nhóm đầu tiên khớp được chọn; không khớp -> "other").
+QDRANT_PAYLOAD_INDEX_FIELDS = [
+    "document_name",
+    "node_type",
+    "product_category",
+    "source_document_id",
+]
+PRODUCT_CATEGORY_KEYWORDS = {
+    "credit_card": ["thẻ tín dụng", "credit card", "the tin dung"],
+    "debit_card": ["thẻ ghi nợ", "thẻ thanh toán", "debit", "atm"],
+    "savings": ["tiết kiệm", "tiền gửi", "savings"],
+    "loan": ["vay", "tín dụng", "cho vay", "loan"],
+    "digital_banking": ["ngân hàng số", "internet banking", "mobile banking", "ứng dụng", "app"],
+    "transfer_payment": ["chuyển tiền", "chuyển khoản", "thanh toán", "napas"],
+    "fees": ["biểu phí", "phí dịch vụ"],
+}
+
+# /search/documents/batch: số truy vấn tối đa trong một request
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "100"))
+
+# Truy xuất hai bước: tìm TWO_STAGE_DOCUMENT_LIMIT điểm Document (vector tóm tắt) trước, rồi tìm
+# Chunk chỉ trong các tài liệu đó (lọc theo payload source_document_id, cần index lại collection).
+# Chỉ các Chunk của bước 2 vào rerank / ngữ cảnh; bước 2 không có kết quả -> tìm phẳng.
+TWO_STAGE_RETRIEVAL_ACTIVE = (
+    os.getenv("TWO_STAGE_RETRIEVAL_ACTIVE", "false").lower() == "true"
+)
+TWO_STAGE_DOCUMENT_LIMIT = int(os.getenv("TWO_STAGE_DOCUMENT_LIMIT", "5"))
+
+# MMR (Maximal Marginal Relevance) trước rerank: lấy MMR_CANDIDATE_LIMIT ứng viên (kèm vector) từ
+# Qdrant, chọn ra số ứng viên rerank thông thường sao cho vừa liên quan vừa ít trùng lặp.
+# MMR_LAMBDA = 1 chỉ xét độ liên quan; càng nhỏ càng ưu tiên đa dạng.
+MMR_ACTIVE = os.getenv("MMR_ACTIVE", "false").lower() == "true"
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+MMR_CANDIDATE_LIMIT = int(os.getenv("MMR_CANDIDATE_LIMIT", "40"))
+
+# Mở rộng ngữ cảnh theo chunk lân cận (NEXT_CHUNK): mỗi chunk được chọn kèm ±WINDOW chunk
+# liền kề cùng tài liệu, các đoạn chồng lấn được gộp; tổng ký tự thêm vào <= CHAR_BUDGET.
+# Bật tính năng này cho phép giảm QDRANT_SEARCH_LIMIT mà vẫn giữ đủ ngữ cảnh.
+CONTEXT_EXPANSION_ACTIVE = (
+    os.getenv("CONTEXT_EXPANSION_ACTIVE", "false").lower() == "true"
+)
+CONTEXT_EXPANSION_WINDOW = int(os.getenv("CONTEXT_EXPANSION_WINDOW", "1"))
+CONTEXT_EXPANSION_CHAR_BUDGET = int(os.getenv("CONTEXT_EXPANSION_CHAR_BUDGET", "6000"))
+
 # Retrieval
 QDRANT_SEARCH_LIMIT = 5  # Giảm từ 5 xuống 3 để context gọn hơn, có thể tùy chỉnh
 RERANKER_ACTIVE = True  # Đặt thành False để tắt reranking
 RERANKER_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
 RERANK_TOP_N = 5  # Lấy top 3 sau khi rerank (phải <= QDRANT_SEARCH_LIMIT)
+# Backend chạy cross-encoder: "torch" (PyTorch), "onnx" (ONNX Runtime FP32) hoặc
+# "onnx-int8" (ONNX Runtime, lượng tử hóa INT8 dynamic). Model ONNX được export một lần
+# vào RERANKER_ONNX_CACHE_DIR (xem src/reranking/onnx_export.py).
+RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", "torch")
+RERANKER_ONNX_CACHE_DIR = os.getenv(
+    "RERANKER_ONNX_CACHE_DIR",
+    os.path.join(BASE_DATA_PIPELINE_OUTPUT_PATH, "models", "reranker_onnx"),
+)
+RERANKER_ONNX_QUANTIZATION_CONFIG = os.getenv("RERANKER_ONNX_QUANTIZATION_CONFIG", "avx2")
+RERANKER_ONNX_PARITY_CHECK = (
+    os.getenv("RERANKER_ONNX_PARITY_CHECK", "true").lower() == "true"
+)
+# Số thread tối đa chạy CrossEncoder.predict cho API (rerank là CPU-bound,
+# chạy ngoài event loop nhưng có giới hạn để không tranh CPU giữa các request)
+RERANK_EXECUTOR_MAX_WORKERS = int(os.getenv("RERANK_EXECUTOR_MAX_WORKERS", "2"))
+# Micro-batching cho reranker của API: gom các cặp (query, document) từ các request đồng thời
+# trong tối đa RERANK_BATCH_MAX_WAIT_MS mili-giây (hoặc tới khi đủ RERANK_BATCH_MAX_PAIRS cặp)
+# rồi chấm điểm bằng một lần CrossEncoder.predict.
+RERANK_BATCHING_ACTIVE = os.getenv("RERANK_BATCHING_ACTIVE", "true").lower() == "true"
+RERANK_BATCH_MAX_WAIT_MS = float(os.getenv("RERANK_BATCH_MAX_WAIT_MS", "5"))
+RERANK_BATCH_MAX_PAIRS = int(os.getenv("RERANK_BATCH_MAX_PAIRS", "64"))
+# Cache điểm rerank theo (câu hỏi đã chuẩn hóa, ID chunk); bị xóa khi collection được reindex
+RERANK_SCORE_CACHE_ACTIVE = (
+    os.getenv("RERANK_SCORE_CACHE_ACTIVE", "true").lower() == "true"
+)
+RERANK_SCORE_CACHE_MAX_ENTRIES = int(os.getenv("RERANK_SCORE_CACHE_MAX_ENTRIES", "20000"))
+RERANK_SCORE_CACHE_TTL_SECONDS = float(os.getenv("RERANK_SCORE_CACHE_TTL_SECONDS", "3600"))
 GENERATION_PROMPT_GUIDELINES = f"""
 1.  **Phong cách giao tiếp:** Luôn trả lời như một nhân viên ngân hàng đang tư vấn trực tiếp: tự nhiên, thân thiện, gần gũi và chuyên nghiệp. Tuyệt đối không sử dụng các cụm từ máy móc như "dựa trên tài liệu tham khảo...", "thông tin truy xuất được cho thấy...", "trong ngữ cảnh được cung cấp...". Hãy diễn giải thông tin một cách tự nhiên.
 
@@ -10,6 +10,7 @@ import config
 from src.utils.api_key_manager import GeminiApiKeyManager
 from src.knowledge_graph.kg_loader_service import load_nx_graph_from_file
 from src.embedding.embedding_service import embed_texts_in_batches
+from src.embedding.embedding_store import PersistentEmbeddingStore
 from src.vector_store.qdrant_service import (
     initialize_qdrant_and_collection,
     upsert_data_to_qdrant,
@@ -124,12 +125,23 @@ def run_embedding_and_indexing_pipeline(
     ]
     print(f"\nBắt đầu tạo embeddings cho {len(texts_for_embedding_list)} mục...")
 
+    embedding_store = None
+    if config.EMBEDDING_STORE_ACTIVE:
+        # Vector đã tạo ở các lần chạy trước (cùng model / task type / văn bản) được dùng lại
+        try:
+            embedding_store = PersistentEmbeddingStore(config.EMBEDDING_STORE_DIR)
+        except OSError as e_store:
+            print(
+                f"CẢNH BÁO: Không mở được kho embedding ({e_store}). Gọi API cho mọi văn bản."
+            )
     embeddings_list = embed_texts_in_batches(
         texts_to_embed=texts_for_embedding_list,
         api_manager=api_manager,
         embedding_model_name=embedding_model,
         task_type=embedding_task_type,
         batch_size=embedding_batch_size,
+        max_concurrent_batches=config.EMBEDDING_MAX_CONCURRENT_BATCHES,
+        embedding_store=embedding_store,
     )
 
     if (
@@ -166,7 +178,15 @@ def run_embedding_and_indexing_pipeline(
 
     # 5. Upsert vào Qdrant
     return upsert_data_to_qdrant(
-        qdrant_cli, q_collection, valid_points_data, batch_size=100
+        qdrant_cli,
+        q_collection,
+        valid_points_data,
+        batch_size=config.QDRANT_UPSERT_BATCH_SIZE,
+        max_batch_bytes=config.QDRANT_UPSERT_MAX_BATCH_BYTES,
+        parallel_workers=config.QDRANT_UPSERT_PARALLEL,
+        wait_for_each_batch=False,
+        max_retries=config.QDRANT_UPSERT_MAX_RETRIES,
+        backoff_base_seconds=config.QDRANT_UPSERT_BACKOFF_BASE_SECONDS,
     )
 
 
@@ -197,6 +217,8 @@ if __name__ == "__main__":
             retry_wait_seconds=config.RETRY_WAIT_SECONDS,
             max_retries_per_key_cycle=config.MAX_RETRIES_PER_KEY_CYCLE,
             api_key_prefix=config.GEMINI_API_KEY_PREFIX,
+            requests_per_minute_per_key=config.GEMINI_REQUESTS_PER_MINUTE_PER_KEY,
+            backoff_base_seconds=config.GEMINI_BACKOFF_BASE_SECONDS,
         )
     except ValueError as e:
         print(e)
@@ -1,6 +1,5 @@
 import os
 import time
-import uuid
 import networkx as nx
 from qdrant_client import models as qdrant_models  # Đặt alias để tránh trùng tên nếu có
 import google.generativeai as genai  # Cần thiết cho version check
@@ -8,12 +7,31 @@ import google.generativeai as genai  # Cần thiết cho version check
 # Import các thành phần từ config và các module trong src
 import config  # Từ thư mục gốc
 from src.utils.api_key_manager import GeminiApiKeyManager
-from src.knowledge_graph.kg_loader_service import load_nx_graph_from_file
+from src.knowledge_graph.kg_loader_service import load_serving_graph
 from src.embedding.embedding_service import embed_texts_in_batches
+from src.embedding.embedding_store import PersistentEmbeddingStore
+from src.embedding.sparse_encoder import VietnameseBM25SparseEncoder
+from src.retrieval.chunk_store import build_node_text_for_embedding
+from src.retrieval.search_filters import infer_product_category
 from src.vector_store.qdrant_service import (
     initialize_qdrant_and_collection,
-    upsert_data_to_qdrant,
+    ParallelPointUpserter,
+    collection_has_sparse_vector,
+    overwrite_payloads_in_qdrant,
+    delete_points_from_qdrant,
 )
+from src.vector_store.incremental_index import (
+    ITEM_NEEDS_EMBEDDING,
+    ITEM_NEEDS_PAYLOAD_UPDATE,
+    classify_item,
+    compute_content_hash,
+    deterministic_point_id,
+    fetch_existing_points,
+    stale_ids_safe_to_delete,
+    stale_point_ids_of,
+)
+from src.vector_store.local_index import LocalVectorIndex, open_local_vector_index
+from src.vector_store.streaming_pipeline import iter_windows, run_streaming_pipeline
 
 
 def print_stage_header(stage_name):
@@ -24,76 +42,67 @@ def print_stage_footer(stage_name):
     print(f"\n{'='*20} KẾT THÚC GIAI ĐOẠN: {stage_name} {'='*20}")
 
 
-def extract_and_prepare_data_from_kg(knowledge_graph: nx.DiGraph) -> list:
+def iter_kg_items_for_embedding(
+    knowledge_graph: nx.DiGraph,
+    include_text_in_payload: bool = True,
+    embedding_signature: str = "",
+):
     """
-    Trích xuất văn bản và chuẩn bị metadata từ Knowledge Graph để embedding.
+    Sinh lần lượt các mục (qdrant_id, text_to_embed, payload) từ Knowledge Graph để embedding,
+    không dựng cả danh sách trong bộ nhớ.
+    include_text_in_payload=False: payload chỉ giữ ID/metadata nhỏ, văn bản được API lấy
+    lại từ KG (ChunkTextStore) khi truy xuất.
+    ID điểm = uuid5(graph_node_id + hash nội dung và embedding_signature), cố định giữa các lần chạy.
     """
-    items_to_embed_with_metadata = []
-    print("\nChuẩn bị dữ liệu từ Knowledge Graph để embedding...")
-
     if not knowledge_graph or knowledge_graph.number_of_nodes() == 0:
-        print(
-            "CẢNH BÁO: Knowledge Graph rỗng hoặc không được tải. Không có dữ liệu để chuẩn bị."
-        )
-        return items_to_embed_with_metadata
+        return
 
     for node_id, data in knowledge_graph.nodes(data=True):
-        text_to_embed = None
-        qdrant_id_for_point = str(uuid.uuid4())
+        # Cùng quy tắc tạo văn bản với ChunkTextStore phía API
+        text_to_embed, doc_name = build_node_text_for_embedding(data)
+        if text_to_embed is None:
+            continue  # Bỏ qua các loại node không cần embedding
+        content_hash = compute_content_hash(text_to_embed.strip(), embedding_signature)
+        qdrant_id_for_point = deterministic_point_id(str(node_id), content_hash)
+
         payload = {
             "graph_node_id": str(node_id),
             "node_type": data.get("type", "Unknown"),
-            "original_text": "",
-            "document_name": "",
+            "document_name": doc_name,
+            "content_hash": content_hash,
         }
-
         node_type = data.get("type")
-        if node_type == "Document":
-            doc_name = data.get("name", "Không có tên tài liệu")
-            summary = data.get("summary", "")
-            # keywords đã là chuỗi string dạng "kw1, kw2, kw3" khi lưu vào graphml
-            keywords_str = data.get("keywords", "")
-
-            text_to_embed = (
-                f"Tài liệu: {doc_name}.\nTừ khóa: {keywords_str}.\nTóm tắt: {summary}"
-            )
-            if not summary and not keywords_str:
-                text_to_embed = f"Tài liệu: {doc_name}"
-
-            payload["document_name"] = doc_name
-            payload["summary"] = summary
-            payload["keywords"] = (
-                keywords_str.split(", ") if keywords_str else []
-            )  # Chuyển lại thành list cho payload
-            payload["original_text"] = text_to_embed.strip()
-
-        elif node_type == "Chunk":
-            text_to_embed = data.get("text_content", "")
-            source_doc_id_from_kg = data.get("source_document_id", "")
-            doc_name_from_ref = (
-                source_doc_id_from_kg.replace("doc:", "")
-                if source_doc_id_from_kg.startswith("doc:")
-                else "Tài liệu không xác định"
-            )
-
-            payload["document_name"] = doc_name_from_ref
+        # Nhóm sản phẩm suy ra từ tài liệu (chunk dùng tên + từ khóa của tài liệu nguồn)
+        doc_data = data
+        # Tài liệu nguồn (Document: chính nó) để truy xuất hai bước tài liệu -> chunk
+        payload["source_document_id"] = str(node_id)
+        if node_type == "Chunk":
             payload["order_in_doc"] = data.get("order_in_doc", -1)
+            source_doc_id = data.get("source_document_id")
+            payload["source_document_id"] = source_doc_id or ""
+            doc_data = (
+                knowledge_graph.nodes[source_doc_id]
+                if source_doc_id and knowledge_graph.has_node(source_doc_id)
+                else {}
+            )
+        payload["product_category"] = infer_product_category(
+            doc_name, doc_data.get("keywords", ""), config.PRODUCT_CATEGORY_KEYWORDS
+        )
+        if include_text_in_payload:
             payload["original_text"] = text_to_embed.strip()
-
-        else:
-            continue  # Bỏ qua các loại node không cần embedding
+            if node_type == "Document":
+                keywords_str = data.get("keywords", "")
+                payload["summary"] = data.get("summary", "")
+                payload["keywords"] = (
+                    keywords_str.split(", ") if keywords_str else []
+                )  # Chuyển lại thành list cho payload
 
         if text_to_embed and text_to_embed.strip():
-            items_to_embed_with_metadata.append(
-                {
-                    "qdrant_id": qdrant_id_for_point,
-                    "text_to_embed": text_to_embed.strip(),
-                    "payload": payload,
-                }
-            )
-
-    print(f"Đã chuẩn bị {len(items_to_embed_with_metadata)} mục từ KG để embedding.")
-    return items_to_embed_with_metadata
+            yield {
+                "qdrant_id": qdrant_id_for_point,
+                "text_to_embed": text_to_embed.strip(),
+                "payload": payload,
+            }
 
 
 def run_embedding_and_indexing_pipeline(
@@ -106,18 +115,47 @@ def run_embedding_and_indexing_pipeline(
     embedding_task_type: str,
     embedding_batch_size: int,
     recreate_qdrant_collection: bool = False,
+    incremental: bool = True,
 ):
     """
     Hàm chính điều phối việc tải KG, trích xuất text, embedding, và lưu vào Qdrant.
+    incremental: chỉ embed / upsert node mới hoặc đã sửa và xóa điểm không còn dùng
+    (bỏ qua khi tạo lại collection).
     """
     # 1. Khởi tạo Qdrant Client và Collection
     print_stage_header("KHỞI TẠO QDRANT")
-    qdrant_cli = initialize_qdrant_and_collection(  # Từ src.vector_store.qdrant_service
-        connection_params=qdrant_connection_params,
-        collection_name=qdrant_collection_name,
-        vector_dimension=vector_dimension,
-        recreate_collection=recreate_qdrant_collection,
-    )
+    if config.VECTOR_STORE_BACKEND == "local":
+        # Chỉ mục vector cục bộ: upsert vào ma trận trong bộ nhớ, ghi snapshot ở cuối pipeline
+        qdrant_cli = (
+            LocalVectorIndex(
+                qdrant_collection_name,
+                vector_dimension,
+                dtype=config.LOCAL_VECTOR_INDEX_DTYPE,
+                ivf_nprobe=config.LOCAL_VECTOR_INDEX_IVF_NPROBE,
+            )
+            if recreate_qdrant_collection
+            else open_local_vector_index(
+                config.LOCAL_VECTOR_INDEX_DIR,
+                qdrant_collection_name,
+                vector_dimension,
+                dtype=config.LOCAL_VECTOR_INDEX_DTYPE,
+                ivf_nprobe=config.LOCAL_VECTOR_INDEX_IVF_NPROBE,
+                create_if_missing=True,
+            )
+        )
+    else:
+        qdrant_cli = initialize_qdrant_and_collection(  # Từ src.vector_store.qdrant_service
+            connection_params=qdrant_connection_params,
+            collection_name=qdrant_collection_name,
+            vector_dimension=vector_dimension,
+            recreate_collection=recreate_qdrant_collection,
+            sparse_vector_name=(
+                config.SPARSE_VECTOR_NAME if config.HYBRID_SEARCH_ACTIVE else None
+            ),
+            transport_params=config.QDRANT_TRANSPORT_PARAMS,
+            collection_profile=config.QDRANT_COLLECTION_PROFILE,
+            payload_index_fields=config.QDRANT_PAYLOAD_INDEX_FIELDS,
+        )
     if qdrant_cli is None:
         print(
             "Không thể khởi tạo Qdrant client hoặc collection. Dừng pipeline embedding."
@@ -127,8 +165,10 @@ def run_embedding_and_indexing_pipeline(
     print_stage_footer("KHỞI TẠO QDRANT")
 
     # 2. Tải Knowledge Graph
+    # Ưu tiên snapshot nhị phân (.kgsnap) cạnh file GraphML; nếu chưa có hoặc đã cũ hơn GraphML
+    # thì đọc GraphML và ghi lại snapshot để API/các lần chạy sau mmap trực tiếp.
     print_stage_header("TẢI KNOWLEDGE GRAPH")
-    knowledge_graph = load_nx_graph_from_file(
+    knowledge_graph = load_serving_graph(
         graph_file_path
     )  # Từ src.knowledge_graph.kg_loader_service
     if knowledge_graph is None:
@@ -137,75 +177,218 @@ def run_embedding_and_indexing_pipeline(
         return False
     print_stage_footer("TẢI KNOWLEDGE GRAPH")
 
-    # 3. Chuẩn bị dữ liệu từ KG để embedding
-    print_stage_header("CHUẨN BỊ DỮ LIỆU TỪ KG")
-    items_to_embed = extract_and_prepare_data_from_kg(knowledge_graph)
-    if not items_to_embed:
-        print("Không có dữ liệu nào từ KG để embedding.")
-        print_stage_footer("CHUẨN BỊ DỮ LIỆU TỪ KG")
-        # Coi như thành công nếu không có gì để embed, hoặc False nếu đây là lỗi
-        return True
-    print_stage_footer("CHUẨN BỊ DỮ LIỆU TỪ KG")
-
-    # 4. Tạo Embeddings
-    print_stage_header("TẠO VECTOR EMBEDDINGS (GEMINI)")
-    texts_list = [item["text_to_embed"] for item in items_to_embed]
-
-    embeddings_list = embed_texts_in_batches(  # Từ src.embedding.embedding_service
-        texts_to_embed=texts_list,
-        api_manager=api_manager,
-        embedding_model_name=embedding_model,
-        task_type=embedding_task_type,
-        batch_size=embedding_batch_size,
-    )
+    # 3. So sánh với dữ liệu đã index: ID điểm cố định theo node + hash nội dung, nên chỉ
+    # node mới / đã sửa cần embed; điểm của node đã xóa hoặc nội dung cũ bị xóa khỏi collection.
+    embedding_signature = f"{embedding_model}|{embedding_task_type}|{vector_dimension}"
 
-    if embeddings_list is None:
-        print("LỖI NGHIÊM TRỌNG: Không thể tạo embeddings. Dừng quá trình.")
-        print_stage_footer("TẠO VECTOR EMBEDDINGS (GEMINI)")
-        return False
+    def iter_items():
+        return iter_kg_items_for_embedding(
+            knowledge_graph,
+            include_text_in_payload=config.QDRANT_PAYLOAD_INCLUDE_TEXT,
+            embedding_signature=embedding_signature,
+        )
 
-    valid_embeddings_count = sum(1 for emb in embeddings_list if emb is not None)
-    print(
-        f"Đã tạo thành công {valid_embeddings_count} / {len(items_to_embed)} embeddings."
+    existing_points = {}
+    if incremental and not recreate_qdrant_collection:
+        print_stage_header("SO SÁNH VỚI COLLECTION HIỆN CÓ")
+        try:
+            existing_points = fetch_existing_points(
+                qdrant_cli, qdrant_collection_name
+            )
+            print(f"Collection hiện có {len(existing_points)} điểm.")
+        except Exception as e_diff:
+            print(
+                f"CẢNH BÁO: Không đọc được các điểm hiện có ({e_diff}). Embed và upsert toàn bộ."
+            )
+        print_stage_footer("SO SÁNH VỚI COLLECTION HIỆN CÓ")
+
+    # Sparse vector BM25 (tìm kiếm hybrid) chỉ tạo khi collection có cấu hình sparse vector.
+    # Thống kê BM25 cần toàn bộ corpus nên được fit trong một lượt duyệt KG riêng (chỉ đọc văn bản).
+    sparse_encoder = None
+    if config.HYBRID_SEARCH_ACTIVE and collection_has_sparse_vector(
+        qdrant_cli, qdrant_collection_name, config.SPARSE_VECTOR_NAME
+    ):
+        sparse_encoder = VietnameseBM25SparseEncoder().fit(
+            item["text_to_embed"] for item in iter_items()
+        )
+        print(
+            f"Đã fit BM25 cho sparse vector (độ dài TB {sparse_encoder.avg_doc_length:.1f} âm tiết)."
+        )
+
+    embedding_store = None
+    if config.EMBEDDING_STORE_ACTIVE:
+        # Vector đã tạo ở các lần chạy trước (cùng model / task type / văn bản) được dùng lại
+        try:
+            embedding_store = PersistentEmbeddingStore(config.EMBEDDING_STORE_DIR)
+        except OSError as e_store:
+            print(
+                f"CẢNH BÁO: Không mở được kho embedding ({e_store}). Gọi API cho mọi văn bản."
+            )
+
+    # 4. KG -> embed -> upsert dạng luồng: mỗi cửa sổ mục được embed rồi upsert ngay, các stage
+    # nối bằng hàng đợi có giới hạn nên bộ nhớ không tăng theo kích thước corpus.
+    print_stage_header("EMBED VÀ UPSERT DẠNG LUỒNG (GEMINI -> QDRANT)")
+    wanted_point_ids = set()
+    payload_updates = {}
+    item_counts = {"total": 0, "to_embed": 0, "unchanged": 0}
+    failed_graph_node_ids = set()
+    stage_results = {"embedded": 0, "upserted": 0, "upsert_ok": True}
+    graph_node_id_of_new_point = {}  # Chỉ ID (chuỗi), để ánh xạ điểm upsert lỗi về node
+    # Chỉ mục cục bộ không an toàn khi ghi đồng thời: một luồng, ghi trực tiếp (không cần rào chắn)
+    writes_to_local_index = isinstance(qdrant_cli, LocalVectorIndex)
+    point_upserter = ParallelPointUpserter(  # Từ src.vector_store.qdrant_service
+        qdrant_cli,
+        qdrant_collection_name,
+        max_batch_points=config.QDRANT_UPSERT_BATCH_SIZE,
+        max_batch_bytes=config.QDRANT_UPSERT_MAX_BATCH_BYTES,
+        parallel_workers=1 if writes_to_local_index else config.QDRANT_UPSERT_PARALLEL,
+        max_retries=config.QDRANT_UPSERT_MAX_RETRIES,
+        backoff_base_seconds=config.QDRANT_UPSERT_BACKOFF_BASE_SECONDS,
+        wait_for_each_batch=writes_to_local_index,
     )
 
-    if (
-        valid_embeddings_count == 0 and len(items_to_embed) > 0
-    ):  # Có item cần embed nhưng không embed được cái nào
-        print("Không có embedding nào được tạo thành công. Dừng.")
-        print_stage_footer("TẠO VECTOR EMBEDDINGS (GEMINI)")
-        return False
-    print_stage_footer("TẠO VECTOR EMBEDDINGS (GEMINI)")
-
-    # 5. Chuẩn bị Points và Upsert vào Qdrant
-    print_stage_header("UPSERT DỮ LIỆU VÀO QDRANT")
-    points_for_qdrant = []
-    for i, item_meta in enumerate(items_to_embed):
-        # Đảm bảo rằng chúng ta chỉ lấy embedding nếu nó tồn tại và index không vượt quá
-        if i < len(embeddings_list) and embeddings_list[i] is not None:
-            points_for_qdrant.append(
+    def iter_items_to_embed():
+        for item in iter_items():
+            item_counts["total"] += 1
+            wanted_point_ids.add(item["qdrant_id"])
+            action = classify_item(item, existing_points)
+            if action == ITEM_NEEDS_EMBEDDING:
+                item_counts["to_embed"] += 1
+                yield item
+            elif action == ITEM_NEEDS_PAYLOAD_UPDATE:
+                payload_updates[item["qdrant_id"]] = item["payload"]
+            else:
+                item_counts["unchanged"] += 1
+
+    def embed_window(items):
+        try:
+            return embed_items(items)
+        except Exception:
+            # Cửa sổ bị bỏ: giữ điểm cũ của các node này (không xóa ở bước dọn điểm cũ)
+            failed_graph_node_ids.update(
+                item["payload"]["graph_node_id"] for item in items
+            )
+            raise
+
+    def embed_items(items):
+        texts = [item["text_to_embed"] for item in items]
+        embeddings_list = embed_texts_in_batches(  # Từ src.embedding.embedding_service
+            texts_to_embed=texts,
+            api_manager=api_manager,
+            embedding_model_name=embedding_model,
+            task_type=embedding_task_type,
+            batch_size=embedding_batch_size,
+            max_concurrent_batches=config.EMBEDDING_MAX_CONCURRENT_BATCHES,
+            embedding_store=embedding_store,
+        ) or [None] * len(items)
+        sparse_vectors_list = (
+            sparse_encoder.encode_documents(texts) if sparse_encoder else None
+        )
+        points = []
+        for i, item_meta in enumerate(items):
+            if embeddings_list[i] is None:
+                failed_graph_node_ids.add(item_meta["payload"]["graph_node_id"])
+                continue
+            point_vector = embeddings_list[i]
+            if sparse_vectors_list is not None:
+                # Dense vector không tên ("") + sparse vector có tên
+                point_vector = {
+                    "": embeddings_list[i],
+                    config.SPARSE_VECTOR_NAME: sparse_vectors_list[i],
+                }
+            points.append(
                 qdrant_models.PointStruct(
                     id=item_meta["qdrant_id"],
-                    vector=embeddings_list[i],
+                    vector=point_vector,
                     payload=item_meta["payload"],
                 )
             )
+            graph_node_id_of_new_point[str(item_meta["qdrant_id"])] = item_meta[
+                "payload"
+            ]["graph_node_id"]
+        stage_results["embedded"] += len(points)
+        return points
+
+    def upsert_window(points):
+        # Không chờ Qdrant áp dụng: batch được gửi song song (wait=False), submit() chỉ chặn
+        # khi số batch đang chờ đã đủ; rào chắn + kiểm tra chạy một lần ở cuối (finish)
+        try:
+            point_upserter.submit(points)
+        except Exception:
+            failed_graph_node_ids.update(
+                point.payload["graph_node_id"] for point in points
+            )
+            raise
+        return points
 
-    if not points_for_qdrant:
-        print(
-            "Không có điểm dữ liệu hợp lệ nào (đã có embedding) để upsert vào Qdrant."
+    stage_summaries = run_streaming_pipeline(
+        iter_windows(iter_items_to_embed(), config.INDEXING_STREAM_WINDOW_SIZE),
+        [("embed", embed_window), ("upsert", upsert_window)],
+        queue_size=config.INDEXING_STREAM_QUEUE_SIZE,
+    )
+    # Nguồn lỗi giữa chừng -> wanted_point_ids thiếu các mục chưa đọc; không được coi điểm
+    # của chúng là điểm cũ
+    stream_had_errors = any(summary["errors"] for summary in stage_summaries)
+    upsert_result = point_upserter.finish()
+    stage_results["upserted"] = upsert_result["upserted"]
+    if upsert_result["failed_point_ids"]:
+        # Giữ lại điểm cũ của các node upsert lỗi (không xóa ở bước dọn điểm cũ)
+        stage_results["upsert_ok"] = False
+        failed_graph_node_ids.update(
+            graph_node_id_of_new_point[point_id]
+            for point_id in upsert_result["failed_point_ids"]
+            if point_id in graph_node_id_of_new_point
         )
-        print_stage_footer("UPSERT DỮ LIỆU VÀO QDRANT")
-        return True  # Coi như không có gì để làm, không phải lỗi
-
-    upsert_status = upsert_data_to_qdrant(  # Từ src.vector_store.qdrant_service
-        qdrant_cli,
-        qdrant_collection_name,
-        points_for_qdrant,
-        batch_size=100,  # Có thể lấy từ config nếu muốn: config.QDRANT_UPSERT_BATCH_SIZE
+    print(
+        f"Tổng {item_counts['total']} mục từ KG. Mới/đã sửa: {item_counts['to_embed']}, "
+        f"chỉ đổi payload: {len(payload_updates)}, giữ nguyên: {item_counts['unchanged']}."
+    )
+    print(
+        f"Đã embed thành công {stage_results['embedded']} / {item_counts['to_embed']}, "
+        f"upsert {stage_results['upserted']} điểm."
     )
-    print_stage_footer("UPSERT DỮ LIỆU VÀO QDRANT")
-    return upsert_status
+    if embedding_store is not None:
+        print(f"Kho embedding: {embedding_store.stats()}")
+    print_stage_footer("EMBED VÀ UPSERT DẠNG LUỒNG (GEMINI -> QDRANT)")
+    if item_counts["total"] == 0 and not stream_had_errors:
+        print("Không có dữ liệu nào từ KG để embedding.")
+        return True
+    if item_counts["to_embed"] > 0 and stage_results["embedded"] == 0:
+        # Có item cần embed nhưng không embed được cái nào
+        print("Không có embedding nào được tạo thành công. Dừng.")
+        return False
+    if stream_had_errors:
+        stage_results["upsert_ok"] = False
+
+    # 5. Ghi đè payload đã đổi và xóa các điểm không còn dùng
+    print_stage_header("CẬP NHẬT PAYLOAD VÀ XÓA ĐIỂM CŨ")
+    upsert_status = stage_results["upsert_ok"]
+    stale_point_ids = stale_point_ids_of(existing_points, wanted_point_ids)
+    payload_status = overwrite_payloads_in_qdrant(
+        qdrant_cli, qdrant_collection_name, payload_updates
+    )
+    if stream_had_errors:
+        print(
+            f"CẢNH BÁO: Pipeline luồng gặp lỗi, bỏ qua việc xóa {len(stale_point_ids)} điểm cũ (chạy lại để dọn)."
+        )
+        delete_status = True
+    else:
+        delete_status = delete_points_from_qdrant(
+            qdrant_cli,
+            qdrant_collection_name,
+            stale_ids_safe_to_delete(
+                stale_point_ids, existing_points, failed_graph_node_ids
+            ),
+        )
+    if isinstance(qdrant_cli, LocalVectorIndex):
+        if config.LOCAL_VECTOR_INDEX_IVF_LISTS > 0:
+            qdrant_cli.build_ivf(config.LOCAL_VECTOR_INDEX_IVF_LISTS)
+        qdrant_cli.save_snapshot(config.LOCAL_VECTOR_INDEX_DIR)
+        print(
+            f"Đã ghi snapshot chỉ mục vector cục bộ vào '{config.LOCAL_VECTOR_INDEX_DIR}' ({qdrant_cli.stats()})."
+        )
+    print_stage_footer("CẬP NHẬT PAYLOAD VÀ XÓA ĐIỂM CŨ")
+    return upsert_status and payload_status and delete_status
 
 
 if __name__ == "__main__":
@@ -243,6 +426,8 @@ if __name__ == "__main__":
             retry_wait_seconds=config.RETRY_WAIT_SECONDS,
             max_retries_per_key_cycle=config.MAX_RETRIES_PER_KEY_CYCLE,
             api_key_prefix=config.GEMINI_API_KEY_PREFIX,
+            requests_per_minute_per_key=config.GEMINI_REQUESTS_PER_MINUTE_PER_KEY,
+            backoff_base_seconds=config.GEMINI_BACKOFF_BASE_SECONDS,
         )
     except (
         ValueError
@@ -265,7 +450,11 @@ if __name__ == "__main__":
         k: (v if k != "api_key" else "********")
         for k, v in config.QDRANT_CONNECTION_PARAMS.items()
     }
-    print(f"Qdrant Connection Params: {q_conn_params_display}")
+    print(f"Vector Store Backend: {config.VECTOR_STORE_BACKEND}")
+    if config.VECTOR_STORE_BACKEND == "local":
+        print(f"Local Vector Index Dir: {config.LOCAL_VECTOR_INDEX_DIR}")
+    else:
+        print(f"Qdrant Connection Params: {q_conn_params_display}")
     print(f"Qdrant Collection: {config.QDRANT_COLLECTION_NAME}")
     print(f"Vector Dimension: {config.VECTOR_DIMENSION}")
     print(f"Gemini Embedding Model: {config.EMBEDDING_MODEL_NAME}")
@@ -306,6 +495,7 @@ if __name__ == "__main__":
             embedding_task_type=config.EMBEDDING_TASK_TYPE_QUERY,
             embedding_batch_size=config.EMBEDDING_BATCH_SIZE,
             recreate_qdrant_collection=should_recreate_qdrant_collection,
+            incremental=config.INCREMENTAL_REINDEX_ACTIVE,
         )
         if success:
             print(
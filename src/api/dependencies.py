@@ -2,29 +2,64 @@
 import os
 import google.generativeai as genai
 import networkx as nx
-from qdrant_client import QdrantClient  # Import QdrantClient trực tiếp
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from mistralai import Mistral
-from typing import Optional
+from typing import Optional, Union
 
 import config  # Từ thư mục gốc
 from src.utils.api_key_manager import GeminiApiKeyManager
-from src.knowledge_graph.kg_loader_service import load_nx_graph_from_file
+from src.knowledge_graph.kg_loader_service import (
+    load_compact_graph_from_file,
+    load_nx_graph_from_file,
+    load_serving_graph,
+)
+from src.knowledge_graph.compact_kg import CompactKnowledgeGraph
+from src.knowledge_graph.kg_snapshot import KGSnapshot, get_snapshot_path
 from src.vector_store.qdrant_service import (
     initialize_qdrant_and_collection as init_qdrant,  # Giữ alias nếu bạn muốn
+    create_async_qdrant_client,
+    collection_has_sparse_vector,
+    get_startup_collection_info,
+    warm_up_async_qdrant_client,
+    build_search_params,
+)
+from src.vector_store.local_index import (
+    AsyncLocalVectorIndex,
+    LocalVectorIndex,
+    open_local_vector_index,
 )
+from src.embedding.sparse_encoder import VietnameseBM25SparseEncoder
+from src.retrieval.chunk_store import ChunkTextStore
+from src.retrieval.context_expansion import ChunkNeighborIndex
 from src.reranking.reranker import Reranker
+from src.embedding.embedding_cache import (
+    QueryEmbeddingCache,
+    SqliteEmbeddingCacheTier,
+)
+from src.llm.answer_cache import SemanticAnswerCache
+from src.utils.data_version import DataVersionTracker
 
 # ... (Khai báo các biến toàn cục _gemini_api_manager, _mistral_client, etc. giữ nguyên) ...
 _gemini_api_manager: Optional[GeminiApiKeyManager] = None
 _mistral_client: Optional[Mistral] = None
-_knowledge_graph: Optional[nx.DiGraph] = None
-_qdrant_cli: Optional[QdrantClient] = None
+_knowledge_graph: Optional[Union[nx.DiGraph, CompactKnowledgeGraph, KGSnapshot]] = None
+_qdrant_cli: Optional[Union[QdrantClient, LocalVectorIndex]] = None
+_async_qdrant_cli: Optional[Union[AsyncQdrantClient, AsyncLocalVectorIndex]] = None
 _reranker_instance: Optional[Reranker] = None
+_query_embedding_cache: Optional[QueryEmbeddingCache] = None
+_answer_cache: Optional[SemanticAnswerCache] = None
+_data_version_tracker: Optional[DataVersionTracker] = None
+_sparse_encoder: Optional[VietnameseBM25SparseEncoder] = None
+_chunk_store: Optional[ChunkTextStore] = None
+_qdrant_search_params = None  # models.SearchParams theo profile collection
+_context_expander: Optional[ChunkNeighborIndex] = None
 
 
 def startup_event_handler():
     """Khởi tạo tất cả tài nguyên dùng chung khi server API bắt đầu."""
-    global _gemini_api_manager, _mistral_client, _knowledge_graph, _qdrant_cli, _reranker_instance
+    global _gemini_api_manager, _mistral_client, _knowledge_graph, _qdrant_cli, _async_qdrant_cli, _reranker_instance, _query_embedding_cache
+    global _answer_cache, _data_version_tracker, _sparse_encoder, _chunk_store
+    global _qdrant_search_params, _context_expander
 
     print("\nDEBUG (dependencies.py): ==============================================")
     print("DEBUG (dependencies.py): Bắt đầu hàm startup_event_handler()")
@@ -37,6 +72,8 @@ def startup_event_handler():
             retry_wait_seconds=config.RETRY_WAIT_SECONDS,
             max_retries_per_key_cycle=config.MAX_RETRIES_PER_KEY_CYCLE,
             api_key_prefix=config.GEMINI_API_KEY_PREFIX,
+            requests_per_minute_per_key=config.GEMINI_REQUESTS_PER_MINUTE_PER_KEY,
+            backoff_base_seconds=config.GEMINI_BACKOFF_BASE_SECONDS,
         )
         print(
             f"DEBUG (dependencies.py): GeminiApiKeyManager đã khởi tạo: {'Thành công' if _gemini_api_manager else 'Thất bại'}"
@@ -84,56 +121,145 @@ def startup_event_handler():
 
     print(f"\nDEBUG (dependencies.py): --- Bước 3: Tải Knowledge Graph ---")
     print(f"DEBUG (dependencies.py): Đường dẫn file KG: '{config.GRAPH_FILE_TO_LOAD}'")
-    if not os.path.exists(config.GRAPH_FILE_TO_LOAD):
+    if not os.path.exists(config.GRAPH_FILE_TO_LOAD) and not (
+        config.KG_SERVING_FORMAT == "snapshot"
+        and os.path.exists(get_snapshot_path(config.GRAPH_FILE_TO_LOAD))
+    ):
         print(
             f"LỖI NGHIÊM TRỌNG (API Startup): Không tìm thấy file KG tại đường dẫn trên."
         )
         raise RuntimeError(f"Không tìm thấy file KG: {config.GRAPH_FILE_TO_LOAD}")
 
-    _knowledge_graph = load_nx_graph_from_file(config.GRAPH_FILE_TO_LOAD)
+    if config.KG_SERVING_FORMAT == "networkx":
+        _knowledge_graph = load_nx_graph_from_file(config.GRAPH_FILE_TO_LOAD)
+    elif config.KG_SERVING_FORMAT == "compact":
+        _knowledge_graph = load_compact_graph_from_file(config.GRAPH_FILE_TO_LOAD)
+    else:
+        _knowledge_graph = load_serving_graph(config.GRAPH_FILE_TO_LOAD)
     if _knowledge_graph is None:
         print("LỖI NGHIÊM TRỌNG (API Startup): Không thể tải Knowledge Graph từ file.")
         raise RuntimeError("Không thể tải Knowledge Graph.")
     print(
         f"DEBUG (dependencies.py): Knowledge Graph đã tải: {_knowledge_graph.number_of_nodes()} nút, {_knowledge_graph.number_of_edges()} cạnh."
     )
+    # Văn bản chunk lấy từ KG khi payload Qdrant không có (payload rút gọn, hoặc collection được
+    # index với QDRANT_PAYLOAD_INCLUDE_TEXT=false), nên luôn được dựng, độc lập với cờ slim payload
+    _chunk_store = ChunkTextStore.from_knowledge_graph(
+        _knowledge_graph, cache_max_entries=config.CHUNK_STORE_CACHE_MAX_ENTRIES
+    )
+    print(
+        f"DEBUG (dependencies.py): Chunk store cục bộ: {_chunk_store.num_entries} node có văn bản"
+        f" (payload rút gọn: {'bật' if config.QDRANT_SLIM_PAYLOAD_ACTIVE else 'tắt'})."
+    )
+    # Gộp chunk lân cận: dùng chỉ mục HAS_CHUNK / NEXT_CHUNK có sẵn của KG compact / snapshot,
+    # chỉ dựng chỉ mục tài liệu -> chunk riêng khi KG là nx.DiGraph
+    if config.CONTEXT_EXPANSION_ACTIVE:
+        _context_expander = ChunkNeighborIndex.from_knowledge_graph(
+            _knowledge_graph,
+            window=config.CONTEXT_EXPANSION_WINDOW,
+            char_budget=config.CONTEXT_EXPANSION_CHAR_BUDGET,
+        )
+        print(
+            f"DEBUG (dependencies.py): Mở rộng ngữ cảnh ±{config.CONTEXT_EXPANSION_WINDOW} chunk đã bật ({_context_expander.stats()})."
+        )
+    else:
+        _context_expander = None
 
-    print("\nDEBUG (dependencies.py): --- Bước 4: Khởi tạo Qdrant Client ---")
-    # Kiểm tra xem QDRANT_CONNECTION_PARAMS có được cấu hình không
-    if not config.QDRANT_CONNECTION_PARAMS or (
-        config.QDRANT_CONNECTION_PARAMS.get("url") is None
-        and config.QDRANT_CONNECTION_PARAMS.get("host") is None
-    ):
+    print("\nDEBUG (dependencies.py): --- Bước 4: Khởi tạo Qdrant Client / chỉ mục vector ---")
+    if config.VECTOR_STORE_BACKEND == "local":
+        # Chỉ mục NumPy trong process, mở từ snapshot (không cần QDRANT_CLOUD_URI)
+        _qdrant_cli = open_local_vector_index(
+            config.LOCAL_VECTOR_INDEX_DIR,
+            config.QDRANT_COLLECTION_NAME,
+            config.VECTOR_DIMENSION,
+            dtype=config.LOCAL_VECTOR_INDEX_DTYPE,
+            ivf_nprobe=config.LOCAL_VECTOR_INDEX_IVF_NPROBE,
+        )
+        if _qdrant_cli is None:
+            print(
+                f"LỖI NGHIÊM TRỌNG (API Startup): Không mở được chỉ mục vector cục bộ '{config.LOCAL_VECTOR_INDEX_DIR}' (chạy pipeline embedding với VECTOR_STORE_BACKEND=local trước)."
+            )
+            raise RuntimeError("Không thể mở chỉ mục vector cục bộ.")
+        _async_qdrant_cli = AsyncLocalVectorIndex(_qdrant_cli)
         print(
-            "LỖI NGHIÊM TRỌNG (API Startup): QDRANT_CONNECTION_PARAMS không được cấu hình đúng trong config.py (thiếu url hoặc host)."
+            f"DEBUG (dependencies.py): Dùng chỉ mục vector cục bộ: {_qdrant_cli.stats()}"
         )
-        print("                 Qdrant client sẽ không được khởi tạo.")
-        _qdrant_cli = None  # Đặt là None để các hàm getter báo lỗi nếu được gọi
-        # raise RuntimeError("QDRANT_CONNECTION_PARAMS không hợp lệ.") # Hoặc dừng hẳn server
     else:
-        _qdrant_cli = init_qdrant(  # init_qdrant là initialize_qdrant_and_collection
-            connection_params=config.QDRANT_CONNECTION_PARAMS,  # << --- SỬA Ở ĐÂY ---
-            collection_name=config.QDRANT_COLLECTION_NAME,
-            vector_dimension=config.VECTOR_DIMENSION,
-            recreate_collection=False,  # Quan trọng: không tạo lại collection khi API startup
+        # Kiểm tra xem QDRANT_CONNECTION_PARAMS có được cấu hình không
+        if not config.QDRANT_CONNECTION_PARAMS or (
+            config.QDRANT_CONNECTION_PARAMS.get("url") is None
+            and config.QDRANT_CONNECTION_PARAMS.get("host") is None
+        ):
+            print(
+                "LỖI NGHIÊM TRỌNG (API Startup): QDRANT_CONNECTION_PARAMS không được cấu hình đúng trong config.py (thiếu url hoặc host)."
+            )
+            print("                 Qdrant client sẽ không được khởi tạo.")
+            _qdrant_cli = None  # Đặt là None để các hàm getter báo lỗi nếu được gọi
+            # raise RuntimeError("QDRANT_CONNECTION_PARAMS không hợp lệ.") # Hoặc dừng hẳn server
+        else:
+            _qdrant_cli = init_qdrant(  # init_qdrant là initialize_qdrant_and_collection
+                connection_params=config.QDRANT_CONNECTION_PARAMS,  # << --- SỬA Ở ĐÂY ---
+                collection_name=config.QDRANT_COLLECTION_NAME,
+                vector_dimension=config.VECTOR_DIMENSION,
+                recreate_collection=False,  # Quan trọng: không tạo lại collection khi API startup
+                sparse_vector_name=(
+                    config.SPARSE_VECTOR_NAME if config.HYBRID_SEARCH_ACTIVE else None
+                ),
+                transport_params=config.QDRANT_TRANSPORT_PARAMS,
+                collection_profile=config.QDRANT_COLLECTION_PROFILE,
+                payload_index_fields=config.QDRANT_PAYLOAD_INDEX_FIELDS,
+            )
+
+        if _qdrant_cli is None:  # init_qdrant sẽ trả về None nếu có lỗi
+            print(
+                "LỖI NGHIÊM TRỌNG (API Startup): Không thể khởi tạo hoặc kết nối Qdrant client / collection."
+            )
+            raise RuntimeError("Không thể khởi tạo Qdrant client.")
+        print(
+            f"DEBUG (dependencies.py): Qdrant client đã khởi tạo và collection '{config.QDRANT_COLLECTION_NAME}' đã được xác nhận."
         )
 
-    if _qdrant_cli is None:  # init_qdrant sẽ trả về None nếu có lỗi
+        # Client async dùng cho đường request của API (/chat, /search) để không chặn event loop
+        _async_qdrant_cli = create_async_qdrant_client(
+            config.QDRANT_CONNECTION_PARAMS, config.QDRANT_TRANSPORT_PARAMS
+        )
+        if _async_qdrant_cli is None:
+            raise RuntimeError("Không thể khởi tạo AsyncQdrantClient.")
         print(
-            "LỖI NGHIÊM TRỌNG (API Startup): Không thể khởi tạo hoặc kết nối Qdrant client / collection."
+            f"DEBUG (dependencies.py): AsyncQdrantClient đã khởi tạo (transport: {'gRPC' if config.QDRANT_PREFER_GRPC else ('REST/HTTP2' if config.QDRANT_HTTP2 else 'REST')}, pool {config.QDRANT_POOL_MAX_CONNECTIONS} kết nối)."
         )
-        raise RuntimeError("Không thể khởi tạo Qdrant client.")
+
+    _qdrant_search_params = build_search_params(config.QDRANT_COLLECTION_PROFILE)
     print(
-        f"DEBUG (dependencies.py): Qdrant client đã khởi tạo và collection '{config.QDRANT_COLLECTION_NAME}' đã được xác nhận."
+        f"DEBUG (dependencies.py): Profile collection '{config.QDRANT_COLLECTION_PROFILE_NAME}', SearchParams: {_qdrant_search_params}"
     )
 
+    # Tìm kiếm hybrid chỉ bật khi collection đã được index kèm sparse vector
+    if config.HYBRID_SEARCH_ACTIVE and collection_has_sparse_vector(
+        _qdrant_cli, config.QDRANT_COLLECTION_NAME, config.SPARSE_VECTOR_NAME
+    ):
+        _sparse_encoder = VietnameseBM25SparseEncoder()
+        print(
+            f"DEBUG (dependencies.py): Tìm kiếm hybrid dense + sparse ('{config.SPARSE_VECTOR_NAME}', RRF) đã bật."
+        )
+    else:
+        _sparse_encoder = None
+        print("DEBUG (dependencies.py): Tìm kiếm hybrid không được kích hoạt (chỉ dùng dense vector).")
+
     print("\nDEBUG (dependencies.py): --- Bước 5: Khởi tạo Reranker ---")
     if hasattr(config, "RERANKER_ACTIVE") and config.RERANKER_ACTIVE:
         print(
             f"DEBUG (dependencies.py): Reranker được kích hoạt. Đang tải model '{config.RERANKER_MODEL_NAME}'..."
         )
         try:
-            _reranker_instance = Reranker(config.RERANKER_MODEL_NAME)
+            _reranker_instance = Reranker(
+                config.RERANKER_MODEL_NAME,
+                max_workers=config.RERANK_EXECUTOR_MAX_WORKERS,
+                backend=config.RERANKER_BACKEND,
+                onnx_cache_dir=config.RERANKER_ONNX_CACHE_DIR,
+                onnx_quantization_config=config.RERANKER_ONNX_QUANTIZATION_CONFIG,
+                onnx_parity_check=config.RERANKER_ONNX_PARITY_CHECK,
+            )
             if _reranker_instance.model is None:
                 print(
                     "CẢNH BÁO (API Startup): Không tải được model cho Reranker instance. Reranking sẽ không hoạt động."
@@ -143,6 +269,11 @@ def startup_event_handler():
                 print(
                     "DEBUG (dependencies.py): Reranker instance đã tạo và model đã tải thành công."
                 )
+                if config.RERANK_BATCHING_ACTIVE:
+                    _reranker_instance.enable_batching(
+                        max_batch_pairs=config.RERANK_BATCH_MAX_PAIRS,
+                        max_wait_ms=config.RERANK_BATCH_MAX_WAIT_MS,
+                    )
         except Exception as e_rerank:
             print(
                 f"LỖI (API Startup): Không thể khởi tạo Reranker instance: {e_rerank}. Reranking sẽ bị tắt."
@@ -155,11 +286,100 @@ def startup_event_handler():
         f"DEBUG (dependencies.py): Trạng thái _reranker_instance: {'Đã khởi tạo với model' if _reranker_instance and _reranker_instance.model else ('Có instance nhưng không có model' if _reranker_instance else 'None')}"
     )
 
+    print("\nDEBUG (dependencies.py): --- Bước 6: Khởi tạo cache embedding câu hỏi ---")
+    if config.QUERY_EMBEDDING_CACHE_ACTIVE:
+        shared_tier = None
+        if config.QUERY_EMBEDDING_CACHE_SQLITE_PATH:
+            try:
+                shared_tier = SqliteEmbeddingCacheTier(
+                    config.QUERY_EMBEDDING_CACHE_SQLITE_PATH,
+                    ttl_seconds=config.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+                )
+            except Exception as e_sqlite:
+                print(
+                    f"CẢNH BÁO (API Startup): Không mở được cache SQLite '{config.QUERY_EMBEDDING_CACHE_SQLITE_PATH}': {e_sqlite}. Chỉ dùng cache trong bộ nhớ."
+                )
+        _query_embedding_cache = QueryEmbeddingCache(
+            max_entries=config.QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+            ttl_seconds=config.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+            shared_tier=shared_tier,
+        )
+        print(
+            f"DEBUG (dependencies.py): Cache embedding câu hỏi đã bật (tối đa {config.QUERY_EMBEDDING_CACHE_MAX_ENTRIES} mục, tầng chung: {'SQLite' if shared_tier else 'không'})."
+        )
+    else:
+        _query_embedding_cache = None
+        print("DEBUG (dependencies.py): Cache embedding câu hỏi không được kích hoạt.")
+
+    print("\nDEBUG (dependencies.py): --- Bước 7: Phiên bản dữ liệu & cache câu trả lời ---")
+    _data_version_tracker = DataVersionTracker(
+        kg_file_path=config.GRAPH_FILE_TO_LOAD,
+        collection_name=config.QDRANT_COLLECTION_NAME,
+        refresh_interval_seconds=config.DATA_VERSION_REFRESH_SECONDS,
+        manual_tag=config.DATA_VERSION_TAG,
+    )
+    # Dùng lại thông tin collection đã đọc ở Bước 4 (không gọi get_collection thêm lần nữa)
+    startup_collection_info = get_startup_collection_info(config.QDRANT_COLLECTION_NAME)
+    current_data_version = (
+        _data_version_tracker.refresh_from_collection_info(startup_collection_info)
+        if startup_collection_info is not None
+        else _data_version_tracker.refresh(_qdrant_cli)
+    )
+    print(
+        f"DEBUG (dependencies.py): Phiên bản dữ liệu hiện tại: {current_data_version}"
+    )
+    if config.ANSWER_CACHE_ACTIVE:
+        _answer_cache = SemanticAnswerCache(
+            max_entries=config.ANSWER_CACHE_MAX_ENTRIES,
+            ttl_seconds=config.ANSWER_CACHE_TTL_SECONDS,
+            similarity_threshold=config.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+        )
+        _data_version_tracker.add_listener(_answer_cache.invalidate)
+        print(
+            f"DEBUG (dependencies.py): Cache câu trả lời đã bật (ngưỡng tương đồng {config.ANSWER_CACHE_SIMILARITY_THRESHOLD})."
+        )
+    else:
+        _answer_cache = None
+        print("DEBUG (dependencies.py): Cache câu trả lời không được kích hoạt.")
+    if _reranker_instance is not None and config.RERANK_SCORE_CACHE_ACTIVE:
+        rerank_score_cache = _reranker_instance.enable_score_cache(
+            config.RERANK_SCORE_CACHE_MAX_ENTRIES,
+            ttl_seconds=config.RERANK_SCORE_CACHE_TTL_SECONDS,
+        )
+        _data_version_tracker.add_listener(rerank_score_cache.invalidate)
+        print(
+            f"DEBUG (dependencies.py): Cache điểm rerank đã bật (tối đa {config.RERANK_SCORE_CACHE_MAX_ENTRIES} mục)."
+        )
+
     print("\nAPI Startup: Khởi tạo tài nguyên dùng chung hoàn tất.")
     print("DEBUG (dependencies.py): Kết thúc hàm startup_event_handler().")
     print("DEBUG (dependencies.py): ==============================================\n")
 
 
+async def warm_up_event_handler():
+    """Mở sẵn kết nối async tới Qdrant (chạy trong event loop của server, sau startup)."""
+    if _async_qdrant_cli is not None:
+        await warm_up_async_qdrant_client(
+            _async_qdrant_cli, config.QDRANT_COLLECTION_NAME
+        )
+
+
+async def shutdown_event_handler():
+    """Đóng các kết nối / executor khi server API tắt."""
+    global _async_qdrant_cli
+    if _async_qdrant_cli is not None:
+        try:
+            await _async_qdrant_cli.close()
+        except Exception as e_close:
+            print(f"CẢNH BÁO (API Shutdown): Lỗi khi đóng AsyncQdrantClient: {e_close}")
+        _async_qdrant_cli = None
+    if _reranker_instance is not None:
+        _reranker_instance.shutdown()
+    if _query_embedding_cache is not None and _query_embedding_cache.shared_tier:
+        _query_embedding_cache.shared_tier.close()
+    print("API Shutdown: Đã giải phóng tài nguyên dùng chung.")
+
+
 # --- Các hàm "getter" để FastAPI inject dependencies (giữ nguyên) ---
 def get_gemini_api_manager() -> GeminiApiKeyManager:
     if _gemini_api_manager is None:
@@ -182,7 +402,7 @@ def get_mistral_client() -> Optional[Mistral]:
     return _mistral_client
 
 
-def get_knowledge_graph() -> nx.DiGraph:
+def get_knowledge_graph() -> Union[nx.DiGraph, CompactKnowledgeGraph, KGSnapshot]:
     if _knowledge_graph is None:
         print(
             "LỖI RUNTIME (dependencies.py): Gọi get_knowledge_graph nhưng _knowledge_graph là None!"
@@ -204,7 +424,56 @@ def get_qdrant_client() -> QdrantClient:
     return _qdrant_cli
 
 
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    if _async_qdrant_cli is None:
+        print(
+            "LỖI RUNTIME (dependencies.py): Gọi get_async_qdrant_client nhưng _async_qdrant_cli là None!"
+        )
+        raise RuntimeError(
+            "Async Qdrant client chưa được khởi tạo. Lỗi cấu hình server nghiêm trọng."
+        )
+    return _async_qdrant_cli
+
+
 def get_reranker() -> Optional[Reranker]:
     # Logic kiểm tra trong getter có thể không cần thiết nếu startup_event_handler đã xử lý kỹ
     # và các endpoint sử dụng reranker nên tự kiểm tra xem nó có None không trước khi dùng.
     return _reranker_instance
+
+
+def get_query_embedding_cache() -> Optional[QueryEmbeddingCache]:
+    # Có thể là None nếu cache bị tắt trong config
+    return _query_embedding_cache
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    # Có thể là None nếu cache bị tắt trong config
+    return _answer_cache
+
+
+def get_sparse_encoder() -> Optional[VietnameseBM25SparseEncoder]:
+    # None nếu tìm kiếm hybrid bị tắt hoặc collection chưa có sparse vector
+    return _sparse_encoder
+
+
+def get_chunk_store() -> Optional[ChunkTextStore]:
+    # None nếu payload rút gọn bị tắt (văn bản lấy từ payload Qdrant)
+    return _chunk_store
+
+
+def get_qdrant_search_params():
+    # models.SearchParams (hnsw_ef, rescore/oversampling) theo profile collection; có thể là None
+    return _qdrant_search_params
+
+
+def get_context_expander() -> Optional[ChunkNeighborIndex]:
+    # None nếu mở rộng ngữ cảnh theo chunk lân cận bị tắt
+    return _context_expander
+
+
+def get_data_version_tracker() -> DataVersionTracker:
+    if _data_version_tracker is None:
+        raise RuntimeError(
+            "DataVersionTracker chưa được khởi tạo. Lỗi cấu hình server nghiêm trọng."
+        )
+    return _data_version_tracker
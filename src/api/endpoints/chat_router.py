@@ -1,17 +1,28 @@
 # src/api/endpoints/chat_router.py
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List, Optional, Dict
+import time
 import uuid
 import networkx as nx
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
 
 from src.api import models as api_models
 from src.api import dependencies
 import config
 from src.utils.api_key_manager import GeminiApiKeyManager
-from src.embedding.embed_querry import embed_query_gemini
-from src.retrieval.retrieval_service import retrieve_and_compile_context
-from src.llm.generation_service import generate_chatbot_response
+from src.embedding.embed_querry import embed_query_gemini_async
+from src.embedding.embedding_cache import QueryEmbeddingCache
+from src.retrieval.retrieval_service import retrieve_and_compile_context_async
+from src.llm.generation_service import (
+    generate_chatbot_response_async,
+    is_fallback_answer,
+)
+from src.llm.answer_cache import SemanticAnswerCache
+from src.utils.data_version import DataVersionTracker
+from src.embedding.sparse_encoder import VietnameseBM25SparseEncoder
+from src.retrieval.chunk_store import ChunkTextStore
+from src.retrieval.context_expansion import ChunkNeighborIndex
+from src.retrieval.search_filters import build_search_filter
 from src.reranking.reranker import Reranker
 
 
@@ -27,8 +38,25 @@ async def chat_endpoint(
     payload: api_models.ChatQuery,  # Sử dụng ChatQuery model
     api_manager: GeminiApiKeyManager = Depends(dependencies.get_gemini_api_manager),
     knowledge_graph: nx.DiGraph = Depends(dependencies.get_knowledge_graph),
-    qdrant_cli: QdrantClient = Depends(dependencies.get_qdrant_client),
+    qdrant_cli: AsyncQdrantClient = Depends(dependencies.get_async_qdrant_client),
+    embedding_cache: Optional[QueryEmbeddingCache] = Depends(
+        dependencies.get_query_embedding_cache
+    ),
     reranker_instance: Optional[Reranker] = Depends(dependencies.get_reranker),
+    answer_cache: Optional[SemanticAnswerCache] = Depends(
+        dependencies.get_answer_cache
+    ),
+    data_version_tracker: DataVersionTracker = Depends(
+        dependencies.get_data_version_tracker
+    ),
+    sparse_encoder: Optional[VietnameseBM25SparseEncoder] = Depends(
+        dependencies.get_sparse_encoder
+    ),
+    chunk_store: Optional[ChunkTextStore] = Depends(dependencies.get_chunk_store),
+    qdrant_search_params=Depends(dependencies.get_qdrant_search_params),
+    context_expander: Optional[ChunkNeighborIndex] = Depends(
+        dependencies.get_context_expander
+    ),
 ):
     print("!!!!!! DEBUG: ĐÃ VÀO ĐƯỢC HÀM chat_endpoint !!!!!!")  # <--- THÊM DÒNG NÀY
     print(f"!!!!!! DEBUG: Payload nhận được: {payload.model_dump_json(indent=2)}")
@@ -57,19 +85,28 @@ async def chat_endpoint(
             history_parts.append(f"{role_label}: {turn['content']}")
         formatted_history_for_prompt = "\n".join(history_parts)
 
+    # Deadline chung cho các lệnh gọi Gemini của request này: nếu mọi key đang cooldown
+    # lâu hơn thời gian còn lại thì trả lời fallback ngay thay vì treo request.
+    gemini_deadline = time.monotonic() + config.API_GEMINI_DEADLINE_SECONDS
+
     # 1. Embedding câu hỏi
-    query_vector = embed_query_gemini(
+    query_vector = await embed_query_gemini_async(
         user_query=payload.query,
         api_manager=api_manager,
         embedding_model_name=config.EMBEDDING_MODEL_NAME,
         task_type=config.EMBEDDING_TASK_TYPE_QUERY,
+        embedding_cache=embedding_cache,
+        deadline=gemini_deadline,
     )
     if not query_vector:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Lỗi embedding câu hỏi.",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Lỗi embedding câu hỏi (dịch vụ Gemini tạm thời quá tải).",
         )
 
+    # Làm mới phiên bản dữ liệu (nếu KG/Qdrant đổi, các cache điểm rerank/câu trả lời tự bị xóa)
+    await data_version_tracker.get_version_async(qdrant_cli)
+
     # 2. Truy xuất ngữ cảnh
     initial_retrieval_limit_chat = config.QDRANT_SEARCH_LIMIT
     final_top_n_chat = config.RERANK_TOP_N
@@ -81,7 +118,7 @@ async def chat_endpoint(
     else:
         initial_retrieval_limit_chat = final_top_n_chat
 
-    compiled_context, context_parts_for_display = retrieve_and_compile_context(
+    compiled_context, context_parts_for_display = await retrieve_and_compile_context_async(
         original_query=payload.query,
         query_vector=query_vector,
         qdrant_cli=qdrant_cli,
@@ -91,22 +128,57 @@ async def chat_endpoint(
         qdrant_search_limit=initial_retrieval_limit_chat,
         reranker_active=config.RERANKER_ACTIVE,
         rerank_top_n=final_top_n_chat,
+        sparse_query_vector=(
+            sparse_encoder.encode_query(payload.query) if sparse_encoder else None
+        ),
+        sparse_vector_name=config.SPARSE_VECTOR_NAME,
+        chunk_store=chunk_store,
+        slim_payload=config.QDRANT_SLIM_PAYLOAD_ACTIVE,
+        qdrant_search_timeout=config.QDRANT_SEARCH_TIMEOUT_SECONDS,
+        qdrant_search_params=qdrant_search_params,
+        query_filter=build_search_filter(
+            payload.document_names, payload.node_types, payload.product_categories
+        ),
+        context_expander=context_expander,
+        mmr_lambda=config.MMR_LAMBDA if config.MMR_ACTIVE else None,
+        mmr_candidate_limit=config.MMR_CANDIDATE_LIMIT,
+        two_stage_document_limit=(
+            config.TWO_STAGE_DOCUMENT_LIMIT if config.TWO_STAGE_RETRIEVAL_ACTIVE else None
+        ),
+        hybrid_prefetch_limit=max(config.HYBRID_PREFETCH_LIMIT, initial_retrieval_limit_chat),
     )
 
     # Log context (tùy chọn)
     # ...
 
-    # 3. Sinh câu trả lời
-    answer = generate_chatbot_response(
-        user_query=payload.query,
-        compiled_context=compiled_context,
-        # conversation_history_str=formatted_history_for_prompt,
-        gemini_generation_model_name=config.GENERATION_MODEL_NAME,
-        api_manager=api_manager,
-        bank_homepage_url=config.BANK_HOMEPAGE_URL,
-        bank_contact_info=config.BANK_CONTACT_INFO,
-        generation_prompt_guidelines=config.GENERATION_PROMPT_GUIDELINES,
-    )
+    # 3. Sinh câu trả lời (hoặc lấy từ cache nếu cùng ngữ cảnh và câu hỏi gần giống)
+    answer = None
+    context_ids = [item.get("graph_node_id") for item in context_parts_for_display]
+    if answer_cache is not None:
+        answer = answer_cache.lookup(query_vector, context_ids)
+        if answer is not None:
+            print("  Dùng câu trả lời từ cache ngữ nghĩa (bỏ qua gọi LLM).")
+
+    if answer is None:
+        answer = await generate_chatbot_response_async(
+            user_query=payload.query,
+            compiled_context=compiled_context,
+            # conversation_history_str=formatted_history_for_prompt,
+            gemini_generation_model_name=config.GENERATION_MODEL_NAME,
+            api_manager=api_manager,
+            bank_homepage_url=config.BANK_HOMEPAGE_URL,
+            bank_contact_info=config.BANK_CONTACT_INFO,
+            generation_prompt_guidelines=config.GENERATION_PROMPT_GUIDELINES,
+            deadline=gemini_deadline,
+        )
+        if (
+            answer
+            and answer_cache is not None
+            and not is_fallback_answer(
+                answer, config.BANK_HOMEPAGE_URL, config.BANK_CONTACT_INFO
+            )
+        ):
+            answer_cache.store(query_vector, context_ids, answer)
 
     if not answer:
         raise HTTPException(
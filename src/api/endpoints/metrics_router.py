@@ -0,0 +1,45 @@
+# src/api/endpoints/metrics_router.py
+from fastapi import APIRouter, Depends
+from typing import Any, Dict, Optional
+
+from src.api import dependencies
+from src.utils.api_key_manager import GeminiApiKeyManager
+from src.embedding.embedding_cache import QueryEmbeddingCache
+from src.llm.answer_cache import SemanticAnswerCache
+from src.utils.data_version import DataVersionTracker
+from src.reranking.reranker import Reranker
+from src.retrieval.chunk_store import ChunkTextStore
+from src.retrieval.context_expansion import ChunkNeighborIndex
+
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("")
+async def metrics_endpoint(
+    api_manager: GeminiApiKeyManager = Depends(dependencies.get_gemini_api_manager),
+    embedding_cache: Optional[QueryEmbeddingCache] = Depends(
+        dependencies.get_query_embedding_cache
+    ),
+    answer_cache: Optional[SemanticAnswerCache] = Depends(
+        dependencies.get_answer_cache
+    ),
+    data_version_tracker: DataVersionTracker = Depends(
+        dependencies.get_data_version_tracker
+    ),
+    reranker_instance: Optional[Reranker] = Depends(dependencies.get_reranker),
+    chunk_store: Optional[ChunkTextStore] = Depends(dependencies.get_chunk_store),
+    context_expander: Optional[ChunkNeighborIndex] = Depends(
+        dependencies.get_context_expander
+    ),
+) -> Dict[str, Any]:
+    """Số liệu vận hành: trạng thái các Gemini key, hit/miss của các cache và histogram batch rerank."""
+    return {
+        "gemini_keys": api_manager.get_stats(),
+        "query_embedding_cache": embedding_cache.stats() if embedding_cache else None,
+        "answer_cache": answer_cache.stats() if answer_cache else None,
+        "data_version": data_version_tracker.version,
+        "reranker": reranker_instance.stats() if reranker_instance else None,
+        "chunk_store": chunk_store.stats() if chunk_store else None,
+        "context_expansion": context_expander.stats() if context_expander else None,
+    }
@@ -1,71 +1,109 @@
 # src/api/endpoints/search_router.py
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List, Optional
+import time
 import networkx as nx
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
 
 from src.api import models as api_models
 from src.api import dependencies
 import config
 from src.utils.api_key_manager import GeminiApiKeyManager
-from src.embedding.embed_querry import embed_query_gemini
-from src.retrieval.retrieval_service import retrieve_and_compile_context
+from src.embedding.embed_querry import (
+    embed_queries_gemini_async,
+    embed_query_gemini_async,
+)
+from src.embedding.embedding_cache import QueryEmbeddingCache
+from src.retrieval.retrieval_service import (
+    retrieve_and_compile_context_async,
+    retrieve_and_compile_contexts_batch_async,
+)
 from src.reranking.reranker import Reranker
+from src.utils.data_version import DataVersionTracker
+from src.embedding.sparse_encoder import VietnameseBM25SparseEncoder
+from src.retrieval.chunk_store import ChunkTextStore
+from src.retrieval.context_expansion import ChunkNeighborIndex
+from src.retrieval.search_filters import build_search_filter
 
 
 router = APIRouter(prefix="/search", tags=["Document Search"])
 
 
+def _resolve_retrieval_limits(top_k: int, reranker_instance: Optional[Reranker]):
+    """
+    Trả về (initial_retrieval_limit, final_top_n_after_rerank).
+    Nếu reranking active, lấy nhiều hơn từ Qdrant để reranker có dữ liệu làm việc.
+    """
+    # qdrant_search_limit sẽ là số lượng lấy từ Qdrant ban đầu
+    # top_k là số lượng client muốn nhận cuối cùng
+    initial_retrieval_limit = config.QDRANT_SEARCH_LIMIT
+    final_top_n_after_rerank = top_k
+
+    if config.RERANKER_ACTIVE and reranker_instance and reranker_instance.model:
+        # Đảm bảo initial_retrieval_limit đủ lớn cho reranker, và final_top_n không lớn hơn nó
+        if initial_retrieval_limit < final_top_n_after_rerank:
+            initial_retrieval_limit = final_top_n_after_rerank * 2  # Ví dụ: lấy gấp đôi
+        print(
+            f"  Tìm kiếm ban đầu với limit: {initial_retrieval_limit}, sau rerank sẽ lấy top: {final_top_n_after_rerank}"
+        )
+    else:
+        initial_retrieval_limit = (
+            final_top_n_after_rerank  # Không rerank, lấy đúng số lượng client yêu cầu
+        )
+        print(f"  Tìm kiếm với limit: {initial_retrieval_limit} (không rerank)")
+    return initial_retrieval_limit, final_top_n_after_rerank
+
+
 @router.post("/documents", response_model=List[api_models.RetrievedSource])
 async def search_documents_endpoint(
     payload: api_models.DocumentSearchQuery,
     api_manager: GeminiApiKeyManager = Depends(dependencies.get_gemini_api_manager),
     knowledge_graph: nx.DiGraph = Depends(dependencies.get_knowledge_graph),
-    qdrant_cli: QdrantClient = Depends(dependencies.get_qdrant_client),
+    qdrant_cli: AsyncQdrantClient = Depends(dependencies.get_async_qdrant_client),
+    embedding_cache: Optional[QueryEmbeddingCache] = Depends(
+        dependencies.get_query_embedding_cache
+    ),
     reranker_instance: Optional[Reranker] = Depends(
         dependencies.get_reranker
     ),  # Sửa tên hàm dependency
+    data_version_tracker: DataVersionTracker = Depends(
+        dependencies.get_data_version_tracker
+    ),
+    sparse_encoder: Optional[VietnameseBM25SparseEncoder] = Depends(
+        dependencies.get_sparse_encoder
+    ),
+    chunk_store: Optional[ChunkTextStore] = Depends(dependencies.get_chunk_store),
+    qdrant_search_params=Depends(dependencies.get_qdrant_search_params),
+    context_expander: Optional[ChunkNeighborIndex] = Depends(
+        dependencies.get_context_expander
+    ),
 ):
     print(
         f"API Endpoint /search/documents: Query: '{payload.query}', top_k: {payload.top_k}"
     )
 
-    query_vector = embed_query_gemini(
+    query_vector = await embed_query_gemini_async(
         user_query=payload.query,
         api_manager=api_manager,
         embedding_model_name=config.EMBEDDING_MODEL_NAME,
         task_type=config.EMBEDDING_TASK_TYPE_QUERY,
+        embedding_cache=embedding_cache,
+        deadline=time.monotonic() + config.API_GEMINI_DEADLINE_SECONDS,
     )
     if not query_vector:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Lỗi embedding câu hỏi tìm kiếm.",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Lỗi embedding câu hỏi tìm kiếm (dịch vụ Gemini tạm thời quá tải).",
         )
 
-    # qdrant_search_limit sẽ là số lượng lấy từ Qdrant ban đầu
-    # rerank_top_n (trong config) sẽ là số lượng cuối cùng sau khi rerank
-    # payload.top_k là số lượng client muốn nhận cuối cùng
-
-    # Nếu reranking active, lấy nhiều hơn từ Qdrant để reranker có dữ liệu làm việc
-    initial_retrieval_limit = config.QDRANT_SEARCH_LIMIT
-    final_top_n_after_rerank = (
-        payload.top_k
-    )  # Client muốn nhận bao nhiêu kết quả cuối cùng
+    # Làm mới phiên bản dữ liệu (nếu collection được reindex, cache điểm rerank tự bị xóa)
+    await data_version_tracker.get_version_async(qdrant_cli)
 
-    if config.RERANKER_ACTIVE and reranker_instance and reranker_instance.model:
-        # Đảm bảo initial_retrieval_limit đủ lớn cho reranker, và final_top_n không lớn hơn nó
-        if initial_retrieval_limit < final_top_n_after_rerank:
-            initial_retrieval_limit = final_top_n_after_rerank * 2  # Ví dụ: lấy gấp đôi
-        print(
-            f"  Tìm kiếm ban đầu với limit: {initial_retrieval_limit}, sau rerank sẽ lấy top: {final_top_n_after_rerank}"
-        )
-    else:
-        initial_retrieval_limit = (
-            final_top_n_after_rerank  # Không rerank, lấy đúng số lượng client yêu cầu
-        )
-        print(f"  Tìm kiếm với limit: {initial_retrieval_limit} (không rerank)")
+    initial_retrieval_limit, final_top_n_after_rerank = _resolve_retrieval_limits(
+        payload.top_k, reranker_instance
+    )
 
-    _compiled_llm_context, context_parts_for_display = retrieve_and_compile_context(
+    _compiled_llm_context, context_parts_for_display = await retrieve_and_compile_context_async(
         original_query=payload.query,
         query_vector=query_vector,
         qdrant_cli=qdrant_cli,
@@ -77,6 +115,24 @@ async def search_documents_endpoint(
         qdrant_search_limit=initial_retrieval_limit,
         reranker_active=config.RERANKER_ACTIVE,
         rerank_top_n=final_top_n_after_rerank,
+        sparse_query_vector=(
+            sparse_encoder.encode_query(payload.query) if sparse_encoder else None
+        ),
+        sparse_vector_name=config.SPARSE_VECTOR_NAME,
+        chunk_store=chunk_store,
+        slim_payload=config.QDRANT_SLIM_PAYLOAD_ACTIVE,
+        qdrant_search_timeout=config.QDRANT_SEARCH_TIMEOUT_SECONDS,
+        qdrant_search_params=qdrant_search_params,
+        query_filter=build_search_filter(
+            payload.document_names, payload.node_types, payload.product_categories
+        ),
+        context_expander=context_expander,
+        mmr_lambda=config.MMR_LAMBDA if config.MMR_ACTIVE else None,
+        mmr_candidate_limit=config.MMR_CANDIDATE_LIMIT,
+        two_stage_document_limit=(
+            config.TWO_STAGE_DOCUMENT_LIMIT if config.TWO_STAGE_RETRIEVAL_ACTIVE else None
+        ),
+        hybrid_prefetch_limit=max(config.HYBRID_PREFETCH_LIMIT, initial_retrieval_limit),
     )
 
     if not context_parts_for_display:
@@ -87,3 +143,101 @@ async def search_documents_endpoint(
         api_models.RetrievedSource(**item) for item in context_parts_for_display
     ]
     return response_sources
+
+
+@router.post(
+    "/documents/batch", response_model=List[api_models.DocumentSearchBatchResult]
+)
+async def search_documents_batch_endpoint(
+    payload: api_models.DocumentSearchBatchQuery,
+    api_manager: GeminiApiKeyManager = Depends(dependencies.get_gemini_api_manager),
+    knowledge_graph: nx.DiGraph = Depends(dependencies.get_knowledge_graph),
+    qdrant_cli: AsyncQdrantClient = Depends(dependencies.get_async_qdrant_client),
+    embedding_cache: Optional[QueryEmbeddingCache] = Depends(
+        dependencies.get_query_embedding_cache
+    ),
+    reranker_instance: Optional[Reranker] = Depends(dependencies.get_reranker),
+    data_version_tracker: DataVersionTracker = Depends(
+        dependencies.get_data_version_tracker
+    ),
+    sparse_encoder: Optional[VietnameseBM25SparseEncoder] = Depends(
+        dependencies.get_sparse_encoder
+    ),
+    chunk_store: Optional[ChunkTextStore] = Depends(dependencies.get_chunk_store),
+    qdrant_search_params=Depends(dependencies.get_qdrant_search_params),
+    context_expander: Optional[ChunkNeighborIndex] = Depends(
+        dependencies.get_context_expander
+    ),
+):
+    """
+    Tìm kiếm nhiều truy vấn trong một request: một lần gọi embedding Gemini, một request
+    Qdrant (batch) và một lần predict của reranker, thay vì N lượt /search/documents.
+    """
+    print(
+        f"API Endpoint /search/documents/batch: {len(payload.queries)} truy vấn, top_k: {payload.top_k}"
+    )
+
+    query_vectors = await embed_queries_gemini_async(
+        user_queries=payload.queries,
+        api_manager=api_manager,
+        embedding_model_name=config.EMBEDDING_MODEL_NAME,
+        task_type=config.EMBEDDING_TASK_TYPE_QUERY,
+        embedding_cache=embedding_cache,
+        deadline=time.monotonic() + config.API_GEMINI_DEADLINE_SECONDS,
+    )
+    if not query_vectors or any(vector is None for vector in query_vectors):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Lỗi embedding các câu hỏi tìm kiếm (dịch vụ Gemini tạm thời quá tải).",
+        )
+
+    # Làm mới phiên bản dữ liệu một lần cho cả batch
+    await data_version_tracker.get_version_async(qdrant_cli)
+
+    initial_retrieval_limit, final_top_n_after_rerank = _resolve_retrieval_limits(
+        payload.top_k, reranker_instance
+    )
+
+    compiled_results = await retrieve_and_compile_contexts_batch_async(
+        original_queries=payload.queries,
+        query_vectors=query_vectors,
+        qdrant_cli=qdrant_cli,
+        knowledge_graph=knowledge_graph,
+        reranker=reranker_instance if config.RERANKER_ACTIVE else None,
+        qdrant_collection_name=config.QDRANT_COLLECTION_NAME,
+        qdrant_search_limit=initial_retrieval_limit,
+        reranker_active=config.RERANKER_ACTIVE,
+        rerank_top_n=final_top_n_after_rerank,
+        sparse_query_vectors=(
+            [sparse_encoder.encode_query(query) for query in payload.queries]
+            if sparse_encoder
+            else None
+        ),
+        sparse_vector_name=config.SPARSE_VECTOR_NAME,
+        chunk_store=chunk_store,
+        slim_payload=config.QDRANT_SLIM_PAYLOAD_ACTIVE,
+        qdrant_search_timeout=config.QDRANT_SEARCH_TIMEOUT_SECONDS,
+        qdrant_search_params=qdrant_search_params,
+        query_filter=build_search_filter(
+            payload.document_names, payload.node_types, payload.product_categories
+        ),
+        context_expander=context_expander,
+        mmr_lambda=config.MMR_LAMBDA if config.MMR_ACTIVE else None,
+        mmr_candidate_limit=config.MMR_CANDIDATE_LIMIT,
+        two_stage_document_limit=(
+            config.TWO_STAGE_DOCUMENT_LIMIT if config.TWO_STAGE_RETRIEVAL_ACTIVE else None
+        ),
+        hybrid_prefetch_limit=max(config.HYBRID_PREFETCH_LIMIT, initial_retrieval_limit),
+    )
+
+    return [
+        api_models.DocumentSearchBatchResult(
+            query=query,
+            results=[
+                api_models.RetrievedSource(**item) for item in context_parts_for_display
+            ],
+        )
+        for query, (_compiled_llm_context, context_parts_for_display) in zip(
+            payload.queries, compiled_results
+        )
+    ]
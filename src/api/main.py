@@ -1,7 +1,16 @@
 # src/api/main.py
 from fastapi import FastAPI
-from .dependencies import startup_event_handler  # Sự kiện startup
-from .endpoints import ocr_router, search_router, chat_router  # Import các router
+from .dependencies import (  # Sự kiện startup / shutdown
+    startup_event_handler,
+    warm_up_event_handler,
+    shutdown_event_handler,
+)
+from .endpoints import (  # Import các router
+    ocr_router,
+    search_router,
+    chat_router,
+    metrics_router,
+)
 
 app = FastAPI(
     title="Kienlongbank AI Services API",
@@ -15,12 +24,20 @@ app = FastAPI(
 async def on_app_startup():
     print("Sự kiện startup của ứng dụng API...")
     startup_event_handler()  # Gọi hàm khởi tạo tài nguyên
+    await warm_up_event_handler()  # Kết nối Qdrant ấm sẵn cho request đầu tiên
+
+
+@app.on_event("shutdown")
+async def on_app_shutdown():
+    print("Sự kiện shutdown của ứng dụng API...")
+    await shutdown_event_handler()
 
 
 # Include các router
 app.include_router(ocr_router.router)
 app.include_router(search_router.router)
 app.include_router(chat_router.router)
+app.include_router(metrics_router.router)
 
 
 @app.get("/", tags=["Root"])
@@ -15,11 +15,26 @@ class OcrResponse(BaseModel):
 
 
 # --- Document Search Models ---
-class DocumentSearchQuery(BaseModel):
+class SearchFilters(BaseModel):
+    """Bộ lọc tùy chọn theo payload (OR trong một trường, AND giữa các trường)."""
+
+    document_names: Optional[List[str]] = Field(
+        None, description="Chỉ tìm trong các tài liệu này (document_name)"
+    )
+    node_types: Optional[List[str]] = Field(
+        None, description="Loại node: 'Document' và/hoặc 'Chunk'"
+    )
+    product_categories: Optional[List[str]] = Field(
+        None,
+        description=f"Nhóm sản phẩm: {', '.join(config.PRODUCT_CATEGORY_KEYWORDS)}, other",
+    )
+
+
+class DocumentSearchQuery(SearchFilters):
     query: str = Field(..., min_length=1, description="Nội dung truy vấn tìm kiếm")
     top_k: int = Field(
         (
-            config.QDRANT_SEARCH_LIMITd
+            config.QDRANT_SEARCH_LIMIT
             if not config.RERANKER_ACTIVE
             else config.RERANK_TOP_N
         ),
@@ -27,7 +42,6 @@ class DocumentSearchQuery(BaseModel):
         le=20,
         description="Số lượng kết quả trả về",
     )
-    # Có thể thêm các trường filter khác ở đây
 
 
 class RetrievedSource(BaseModel):  # Model này đã được định nghĩa ở chatbot
@@ -37,10 +51,31 @@ class RetrievedSource(BaseModel):  # Model này đã được định nghĩa ở
     content_snippet: str
     document_summary: Optional[str] = None
     document_keywords: Optional[str] = None  # Hoặc List[str]
+    graph_node_id: Optional[str] = None
+
+
+class DocumentSearchBatchQuery(SearchFilters):  # Bộ lọc áp dụng cho mọi truy vấn
+    queries: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=config.SEARCH_BATCH_MAX_QUERIES,
+        description="Danh sách truy vấn (embedding, tìm kiếm và rerank chung một lượt)",
+    )
+    top_k: int = Field(
+        config.RERANK_TOP_N if config.RERANKER_ACTIVE else config.QDRANT_SEARCH_LIMIT,
+        ge=1,
+        le=20,
+        description="Số lượng kết quả trả về cho mỗi truy vấn",
+    )
+
+
+class DocumentSearchBatchResult(BaseModel):
+    query: str
+    results: List[RetrievedSource]
 
 
 # --- Chatbot Models ---
-class ChatQuery(BaseModel):
+class ChatQuery(SearchFilters):
     query: str = Field(..., min_length=1)
     conversation_id: Optional[str] = None
     # history: Optional[List[Dict[str, str]]] = None # Nếu muốn client gửi lên
@@ -5,6 +5,8 @@ from dotenv import load_dotenv
 import networkx as nx  # Thư viện để làm việc với đồ thị
 import json  # Để xử lý output JSON từ Gemini
 
+from src.knowledge_graph.kg_loader_service import save_kg_graph
+
 # --- CẤU HÌNH CHUNG ---
 MODEL_NAME_FOR_SUMMARIZATION = "gemini-1.5-flash-latest"  # Model cho tóm tắt và keyword
 CHUNK_DELIMITER = "\n\n---CHUNK_DELIMITER---\n\n"
@@ -320,10 +322,9 @@ def build_document_knowledge_graph(processed_md_folder, api_keys):
         print(f"Tổng số nút trong đồ thị: {G.number_of_nodes()}")
         print(f"Tổng số cạnh trong đồ thị: {G.number_of_edges()}")
 
-        # 4. Lưu đồ thị ra file (ví dụ: GraphML)
+        # 4. Lưu đồ thị ra file GraphML, kèm snapshot nhị phân (.kgsnap) để API nạp nhanh
         try:
-            nx.write_graphml(G, GRAPH_OUTPUT_FILE)
-            print(f"Đồ thị đã được lưu vào file: {GRAPH_OUTPUT_FILE}")
+            save_kg_graph(G, GRAPH_OUTPUT_FILE)
             print(f"Bạn có thể mở file này bằng các công cụ như Gephi để xem.")
         except Exception as e_save:
             print(f"Lỗi khi lưu đồ thị ra file {GRAPH_OUTPUT_FILE}: {e_save}")
@@ -10,7 +10,14 @@ def embed_query_gemini(
     api_manager,  # Instance của GeminiApiKeyManager
     embedding_model_name: str,  # từ config
     task_type: str,  # từ config
+    deadline: float | None = None,  # time.monotonic(); quá hạn thì trả về None
+    embedding_cache=None,  # QueryEmbeddingCache (tùy chọn)
 ) -> list[float] | None:
+    if embedding_cache is not None:
+        cached_vector = embedding_cache.get(user_query, embedding_model_name, task_type)
+        if cached_vector is not None:
+            print("  Dùng embedding câu hỏi từ cache.")
+            return cached_vector
     print("  Đang embedding câu hỏi...")
     embedding_params = {
         "model": embedding_model_name,  # Sử dụng model_name được truyền vào
@@ -24,9 +31,106 @@ def embed_query_gemini(
         content_to_embed=user_query,  # Sửa lại cho phù hợp với call_embedding_model
         task_type=task_type,
         call_type="Embedding Query",
+        deadline=deadline,
     )
 
     if response and "embedding" in response:
+        if embedding_cache is not None:
+            embedding_cache.set(
+                user_query, embedding_model_name, task_type, response["embedding"]
+            )
         return response["embedding"]
     print("    Lỗi embedding câu hỏi hoặc response không hợp lệ.")
     return None
+
+
+async def embed_query_gemini_async(
+    user_query: str,
+    api_manager,  # Instance của GeminiApiKeyManager
+    embedding_model_name: str,
+    task_type: str,
+    deadline: float | None = None,
+    embedding_cache=None,  # QueryEmbeddingCache (tùy chọn)
+) -> list[float] | None:
+    """Phiên bản async của embed_query_gemini, không chặn event loop khi chờ Gemini."""
+    if embedding_cache is not None:
+        cached_vector = await embedding_cache.get_async(
+            user_query, embedding_model_name, task_type
+        )
+        if cached_vector is not None:
+            print("  Dùng embedding câu hỏi từ cache.")
+            return cached_vector
+    print("  Đang embedding câu hỏi (async)...")
+    response = await api_manager.call_embedding_model_async(
+        model_name=embedding_model_name,
+        content_to_embed=user_query,
+        task_type=task_type,
+        call_type="Embedding Query",
+        deadline=deadline,
+    )
+
+    if response and "embedding" in response:
+        if embedding_cache is not None:
+            await embedding_cache.set_async(
+                user_query, embedding_model_name, task_type, response["embedding"]
+            )
+        return response["embedding"]
+    print("    Lỗi embedding câu hỏi hoặc response không hợp lệ.")
+    return None
+
+
+async def embed_queries_gemini_async(
+    user_queries: list[str],
+    api_manager,  # Instance của GeminiApiKeyManager
+    embedding_model_name: str,
+    task_type: str,
+    deadline: float | None = None,
+    embedding_cache=None,  # QueryEmbeddingCache (tùy chọn)
+) -> list[list[float] | None] | None:
+    """
+    Embedding nhiều câu hỏi: các câu chưa có trong cache được gửi trong MỘT lần gọi
+    call_embedding_model_async (content là list). Trả về list cùng thứ tự với user_queries
+    (None ở vị trí lỗi), hoặc None nếu lần gọi Gemini thất bại.
+    """
+    query_vectors = [None] * len(user_queries)
+    miss_indices = []
+    for i, user_query in enumerate(user_queries):
+        cached_vector = (
+            await embedding_cache.get_async(user_query, embedding_model_name, task_type)
+            if embedding_cache is not None
+            else None
+        )
+        if cached_vector is not None:
+            query_vectors[i] = cached_vector
+        else:
+            miss_indices.append(i)
+    if not miss_indices:
+        print(f"  Dùng embedding của {len(user_queries)} câu hỏi từ cache.")
+        return query_vectors
+
+    print(
+        f"  Đang embedding {len(miss_indices)}/{len(user_queries)} câu hỏi trong một lần gọi (async)..."
+    )
+    response = await api_manager.call_embedding_model_async(
+        model_name=embedding_model_name,
+        content_to_embed=[user_queries[i] for i in miss_indices],
+        task_type=task_type,
+        call_type=f"Batch Embedding Query ({len(miss_indices)})",
+        deadline=deadline,
+    )
+    if not response or "embedding" not in response:
+        print("    Lỗi embedding batch câu hỏi hoặc response không hợp lệ.")
+        return None
+    batch_embeddings = response["embedding"]
+    if len(batch_embeddings) != len(miss_indices):
+        print(
+            f"    Lỗi: Số lượng embedding trả về ({len(batch_embeddings)}) không khớp số câu hỏi ({len(miss_indices)})."
+        )
+        return None
+    for index, vector in zip(miss_indices, batch_embeddings):
+        query_vectors[index] = vector
+        if embedding_cache is not None:
+            await embedding_cache.set_async(
+                user_queries[index], embedding_model_name, task_type, vector
+            )
+    return query_vectors
@@ -0,0 +1,175 @@
+# src/embedding/embedding_cache.py
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+from src.utils.cache_utils import LruTtlCache, normalize_query_text
+
+
+class SqliteEmbeddingCacheTier:
+    """
+    Tầng cache dùng chung (giữa các worker / các lần khởi động lại) lưu trong một file SQLite.
+    Vector được lưu dạng float32 nhị phân. Các dòng hết hạn (TTL) được xóa lúc mở và định kỳ
+    khi ghi (tối đa một lần mỗi purge_interval_seconds), nên file không tăng mãi.
+    """
+
+    def __init__(
+        self, db_path: str, ttl_seconds: float = 0, purge_interval_seconds: float = 600
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval_seconds = purge_interval_seconds
+        self._last_purge_at = 0.0
+        self.purged_rows = 0
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            " cache_key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_query_embeddings_created_at"
+            " ON query_embeddings (created_at)"
+        )
+        self._conn.commit()
+        with self._lock:
+            self._purge_expired_locked(time.time())
+
+    def _purge_expired_locked(self, now: float):
+        """Xóa các dòng đã hết hạn (gọi khi đang giữ _lock)."""
+        self._last_purge_at = now
+        if self.ttl_seconds <= 0:
+            return
+        cursor = self._conn.execute(
+            "DELETE FROM query_embeddings WHERE created_at < ?",
+            (now - self.ttl_seconds,),
+        )
+        self._conn.commit()
+        self.purged_rows += max(cursor.rowcount, 0)
+
+    def get(self, cache_key: str) -> list[float] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector, created_at FROM query_embeddings WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+        if row is None:
+            return None
+        vector_blob, created_at = row
+        if self.ttl_seconds > 0 and created_at + self.ttl_seconds <= time.time():
+            return None
+        vector = array("f")
+        vector.frombytes(vector_blob)
+        return vector.tolist()
+
+    def set(self, cache_key: str, vector: list[float]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (cache_key, vector, created_at) VALUES (?, ?, ?)",
+                (cache_key, array("f", vector).tobytes(), now),
+            )
+            self._conn.commit()
+            if now - self._last_purge_at >= self.purge_interval_seconds:
+                self._purge_expired_locked(now)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class QueryEmbeddingCache:
+    """
+    Cache embedding của câu hỏi, khóa là (câu hỏi đã chuẩn hóa, model, task_type).
+    Tầng 1: LRU + TTL trong bộ nhớ của process. Tầng 2 (tùy chọn): SqliteEmbeddingCacheTier.
+    Trong code async dùng get_async / set_async: truy vấn SQLite (đồng bộ) chạy trên thread
+    riêng (asyncio.to_thread) để không chặn event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        shared_tier: SqliteEmbeddingCacheTier | None = None,
+    ):
+        self.memory_tier = LruTtlCache(max_entries, ttl_seconds)
+        self.shared_tier = shared_tier
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    @staticmethod
+    def make_key(query: str, model_name: str, task_type: str) -> str:
+        return f"{model_name}|{task_type}|{normalize_query_text(query)}"
+
+    def _get_from_shared_tier(self, cache_key: str) -> list[float] | None:
+        try:
+            vector = self.shared_tier.get(cache_key)
+        except sqlite3.Error as e_sqlite:
+            print(f"CẢNH BÁO (EmbeddingCache): Lỗi đọc cache SQLite: {e_sqlite}")
+            vector = None
+        if vector is None:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        self.memory_tier.set(cache_key, vector)
+        return vector
+
+    def _set_in_shared_tier(self, cache_key: str, vector: list[float]):
+        try:
+            self.shared_tier.set(cache_key, vector)
+        except sqlite3.Error as e_sqlite:
+            print(f"CẢNH BÁO (EmbeddingCache): Lỗi ghi cache SQLite: {e_sqlite}")
+
+    def get(self, query: str, model_name: str, task_type: str) -> list[float] | None:
+        cache_key = self.make_key(query, model_name, task_type)
+        vector = self.memory_tier.get(cache_key)
+        if vector is not None or self.shared_tier is None:
+            return vector
+        return self._get_from_shared_tier(cache_key)
+
+    async def get_async(
+        self, query: str, model_name: str, task_type: str
+    ) -> list[float] | None:
+        cache_key = self.make_key(query, model_name, task_type)
+        vector = self.memory_tier.get(cache_key)
+        if vector is not None or self.shared_tier is None:
+            return vector
+        return await asyncio.to_thread(self._get_from_shared_tier, cache_key)
+
+    def set(self, query: str, model_name: str, task_type: str, vector: list[float]):
+        if not vector:
+            return
+        cache_key = self.make_key(query, model_name, task_type)
+        self.memory_tier.set(cache_key, vector)
+        if self.shared_tier is not None:
+            self._set_in_shared_tier(cache_key, vector)
+
+    async def set_async(
+        self, query: str, model_name: str, task_type: str, vector: list[float]
+    ):
+        if not vector:
+            return
+        cache_key = self.make_key(query, model_name, task_type)
+        self.memory_tier.set(cache_key, vector)
+        if self.shared_tier is not None:
+            await asyncio.to_thread(self._set_in_shared_tier, cache_key, vector)
+
+    def stats(self) -> dict:
+        stats = {"memory": self.memory_tier.stats()}
+        if self.shared_tier is not None:
+            stats["shared"] = {
+                "db_path": self.shared_tier.db_path,
+                "hits": self.shared_hits,
+                "misses": self.shared_misses,
+                "purged_rows": self.shared_tier.purged_rows,
+            }
+        return stats
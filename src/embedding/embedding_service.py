@@ -2,7 +2,90 @@
 # import google.generativeai as genai # Không cần trực tiếp ở đây nếu api_manager xử lý
 # from src.utils.api_key_manager import GeminiApiKeyManager # Sẽ nhận instance của manager
 # import config # Để lấy EMBEDDING_MODEL_NAME, EMBEDDING_TASK_TYPE_DOCUMENT, EMBEDDING_BATCH_SIZE
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from google.api_core import exceptions as google_exceptions
+
+# Số batch chạy song song trên mỗi key khi không chỉ định max_concurrent_batches
+DEFAULT_BATCHES_IN_FLIGHT_PER_KEY = 2
+# Số lần thử lại nguyên batch khi api_manager bỏ cuộc (hết quota trên mọi key / hết deadline)
+MAX_BATCH_RETRIES = 2
+
+
+class _EmbeddingCountMismatch(Exception):
+    """Số embedding trả về khác số text gửi lên: không biết embedding nào ứng với text nào."""
+
+
+def _default_max_concurrent_batches(api_manager) -> int:
+    number_of_keys = len(getattr(api_manager, "key_slots", None) or [None])
+    return max(1, number_of_keys * DEFAULT_BATCHES_IN_FLIGHT_PER_KEY)
+
+
+def _save_to_store(embedding_store, model_name, task_type, texts, embeddings):
+    if embedding_store is None:
+        return
+    try:
+        embedding_store.put_many(model_name, task_type, texts, embeddings)
+    except OSError as e_store:
+        # Lỗi kho chỉ làm mất cache cho lần sau, không làm hỏng kết quả embedding
+        print(f"CẢNH BÁO (EmbeddingStore): Không ghi được vector vào kho: {e_store}")
+
+
+def _embed_one_batch(
+    api_manager,
+    embedding_model_name: str,
+    task_type: str,
+    batch_texts: list[str],
+    call_type: str,
+) -> list | None:
+    """
+    Embedding cho một batch; None nếu api_manager bỏ cuộc (hết quota / deadline).
+    Raise _EmbeddingCountMismatch hoặc google_exceptions.BadRequest khi lỗi nằm ở từng text.
+    """
+    response = api_manager.call_embedding_model(
+        model_name=embedding_model_name,
+        content_to_embed=batch_texts,  # Luôn gửi list để response luôn là list of embeddings
+        task_type=task_type,
+        call_type=call_type,
+        raise_request_errors=True,
+    )
+    if not response or "embedding" not in response:
+        print(f"    Lỗi: {call_type} không trả về kết quả hợp lệ.")
+        return None
+    batch_embeddings = response["embedding"]
+    if len(batch_embeddings) != len(batch_texts):
+        raise _EmbeddingCountMismatch(
+            f"Số lượng embedding trả về ({len(batch_embeddings)}) không khớp số lượng text đầu vào ({len(batch_texts)}) ở {call_type}."
+        )
+    return batch_embeddings
+
+
+def _embed_batch_with_retry(
+    api_manager,
+    embedding_model_name: str,
+    task_type: str,
+    batch_texts: list[str],
+    call_type: str,
+) -> tuple[list | None, bool]:
+    """
+    Embedding một batch, thử lại nguyên batch tối đa MAX_BATCH_RETRIES lần khi api_manager bỏ
+    cuộc. Trả về (embeddings hoặc None, True nếu lỗi nằm ở từng text và nên tách batch).
+    """
+    for attempt in range(MAX_BATCH_RETRIES + 1):
+        try:
+            batch_embeddings = _embed_one_batch(
+                api_manager, embedding_model_name, task_type, batch_texts, call_type
+            )
+        except (_EmbeddingCountMismatch, google_exceptions.BadRequest) as e_item:
+            print(f"      Lỗi theo từng text ở {call_type}: {e_item}")
+            return None, True
+        if batch_embeddings is not None:
+            return batch_embeddings, False
+        if attempt < MAX_BATCH_RETRIES:
+            print(
+                f"    Thử lại nguyên {call_type} (lần {attempt + 1}/{MAX_BATCH_RETRIES})..."
+            )
+    return None, False
 
 
 def embed_texts_in_batches(
@@ -11,65 +94,168 @@ def embed_texts_in_batches(
     embedding_model_name: str,
     task_type: str,
     batch_size: int,
+    max_concurrent_batches: int | None = None,
+    embedding_store=None,  # PersistentEmbeddingStore (tùy chọn)
 ) -> list | None:
     """
     Tạo embeddings cho một danh sách các đoạn văn bản sử dụng Gemini API, xử lý theo batch.
+
+    Tối đa max_concurrent_batches batch được gửi song song (mặc định 2 batch / key); mỗi lời gọi
+    do api_manager chọn key rảnh nhất còn token, nên tải được chia đều trên các key và mỗi key
+    vẫn nằm trong giới hạn tốc độ riêng. Kết quả được ghép lại theo đúng thứ tự đầu vào. Batch
+    thất bại vì hết quota / deadline được thử lại nguyên batch (tối đa MAX_BATCH_RETRIES lần);
+    chỉ khi lỗi nằm ở từng text (số embedding không khớp, lỗi 400) batch mới được tách thành
+    từng text. Text vẫn lỗi sau khi thử lại là None.
+
+    embedding_store: vector đã có trong kho (cùng model, task_type, văn bản) được dùng lại, chỉ
+    text chưa có (không trùng lặp) mới gọi API; vector mới được ghi vào kho ngay khi mỗi batch xong.
     """
     if not texts_to_embed:
         return []
+    if embedding_store is None:
+        return _embed_texts_via_api(
+            texts_to_embed,
+            api_manager,
+            embedding_model_name,
+            task_type,
+            batch_size,
+            max_concurrent_batches,
+        )
 
-    all_embeddings = []
-    num_texts = len(texts_to_embed)
+    all_embeddings = embedding_store.get_many(
+        embedding_model_name, task_type, texts_to_embed
+    )
+    indexes_by_missing_text: dict[str, list[int]] = {}
+    for index, embedding in enumerate(all_embeddings):
+        if embedding is None:
+            indexes_by_missing_text.setdefault(texts_to_embed[index], []).append(index)
+    print(
+        f"    Kho embedding: {len(texts_to_embed) - sum(map(len, indexes_by_missing_text.values()))}/{len(texts_to_embed)} text đã có vector, "
+        f"gọi API cho {len(indexes_by_missing_text)} text."
+    )
+    if not indexes_by_missing_text:
+        return all_embeddings
+    missing_texts = list(indexes_by_missing_text)
+    missing_embeddings = _embed_texts_via_api(
+        missing_texts,
+        api_manager,
+        embedding_model_name,
+        task_type,
+        batch_size,
+        max_concurrent_batches,
+        embedding_store=embedding_store,
+    )
+    for text, embedding in zip(missing_texts, missing_embeddings):
+        for index in indexes_by_missing_text[text]:
+            all_embeddings[index] = embedding
+    return all_embeddings
 
-    for i in range(0, num_texts, batch_size):
-        batch_texts = texts_to_embed[i : i + batch_size]
-        current_batch_num = i // batch_size + 1
-        total_batches = (num_texts - 1) // batch_size + 1
 
-        print(
-            f"    Đang tạo embedding cho batch {current_batch_num}/{total_batches} ({len(batch_texts)} items)..."
-        )
+def _embed_texts_via_api(
+    texts_to_embed: list[str],
+    api_manager,
+    embedding_model_name: str,
+    task_type: str,
+    batch_size: int,
+    max_concurrent_batches: int | None = None,
+    embedding_store=None,
+) -> list:
+    num_texts = len(texts_to_embed)
+    batch_size = max(1, int(batch_size))
+    if max_concurrent_batches is None or max_concurrent_batches <= 0:
+        max_concurrent_batches = _default_max_concurrent_batches(api_manager)
+    batch_starts = list(range(0, num_texts, batch_size))
+    total_batches = len(batch_starts)
+    all_embeddings: list = [None] * num_texts
+    split_batch_starts = []
 
-        # Các tham số cho phương thức call_embedding_model của ApiKeyManager
-        embedding_api_params = {
-            "content_to_embed": batch_texts,  # Tên tham số này cần khớp với những gì call_embedding_model mong đợi
-            "task_type": task_type,
+    print(
+        f"    Đang tạo embedding cho {num_texts} items ({total_batches} batch, tối đa {max_concurrent_batches} batch song song)..."
+    )
+    with ThreadPoolExecutor(
+        max_workers=min(max_concurrent_batches, total_batches),
+        thread_name_prefix="embed-batch",
+    ) as executor:
+        future_to_start = {
+            executor.submit(
+                _embed_batch_with_retry,
+                api_manager,
+                embedding_model_name,
+                task_type,
+                texts_to_embed[start : start + batch_size],
+                f"Batch Embedding {batch_number}/{total_batches}",
+            ): start
+            for batch_number, start in enumerate(batch_starts, start=1)
         }
-
-        # Gọi qua ApiKeyManager
-        response = api_manager.call_embedding_model(
-            model_name=embedding_model_name,
-            # method_params=embedding_api_params, # Sửa lại cho phù hợp với hàm mới
-            content_to_embed=batch_texts,  # Truyền trực tiếp
-            task_type=task_type,
-            call_type=f"Batch Embedding {current_batch_num}/{total_batches}",
-        )
-
-        if response and "embedding" in response:
-            batch_embeddings = response["embedding"]
-            # embed_content trả về list of embeddings nếu content là list
-            if len(batch_embeddings) == len(batch_texts):
-                all_embeddings.extend(batch_embeddings)
-            else:
+        completed_batches = 0
+        for future in as_completed(future_to_start):
+            start = future_to_start[future]
+            try:
+                batch_embeddings, split_batch = future.result()
+            except Exception as e_batch:
+                print(f"    Lỗi khi embedding batch bắt đầu tại {start}: {e_batch}")
+                batch_embeddings, split_batch = None, False
+            completed_batches += 1
+            if batch_embeddings is None:
+                if split_batch:
+                    split_batch_starts.append(start)
+                continue
+            all_embeddings[start : start + len(batch_embeddings)] = batch_embeddings
+            _save_to_store(
+                embedding_store,
+                embedding_model_name,
+                task_type,
+                texts_to_embed[start : start + len(batch_embeddings)],
+                batch_embeddings,
+            )
+            if completed_batches % 10 == 0 or completed_batches == total_batches:
                 print(
-                    f"      Lỗi: Số lượng embedding trả về ({len(batch_embeddings)}) không khớp số lượng text đầu vào ({len(batch_texts)}). Thêm None."
+                    f"    Đã xong {completed_batches}/{total_batches} batch embedding."
                 )
-                all_embeddings.extend(
-                    [None] * len(batch_texts)
-                )  # Thêm None để giữ đúng thứ tự và số lượng
-        else:
+
+        # Tách các batch lỗi theo từng text (vẫn song song, qua cùng cơ chế chọn key)
+        retry_indexes = [
+            index
+            for start in sorted(split_batch_starts)
+            for index in range(start, min(start + batch_size, num_texts))
+        ]
+        if retry_indexes:
             print(
-                f"    Lỗi: Batch embedding {current_batch_num} không trả về kết quả hợp lệ. Thêm None."
+                f"    {len(split_batch_starts)} batch lỗi theo từng text, thử lại {len(retry_indexes)} text riêng lẻ..."
             )
-            all_embeddings.extend([None] * len(batch_texts))  # Thêm None
+            future_to_index = {
+                executor.submit(
+                    _embed_batch_with_retry,
+                    api_manager,
+                    embedding_model_name,
+                    task_type,
+                    [texts_to_embed[index]],
+                    f"Embedding lại text #{index + 1}",
+                ): index
+                for index in retry_indexes
+            }
+            for future in as_completed(future_to_index):
+                try:
+                    single_embedding, _split_batch = future.result()
+                except Exception as e_single:
+                    print(
+                        f"    Lỗi khi embedding lại text #{future_to_index[future] + 1}: {e_single}"
+                    )
+                    single_embedding = None
+                if single_embedding:
+                    index = future_to_index[future]
+                    all_embeddings[index] = single_embedding[0]
+                    _save_to_store(
+                        embedding_store,
+                        embedding_model_name,
+                        task_type,
+                        [texts_to_embed[index]],
+                        single_embedding,
+                    )
 
-        if current_batch_num < total_batches:  # Tránh sleep sau batch cuối cùng
-            time.sleep(0.5)  # Sleep nhỏ giữa các batch API call
-
-    if len(all_embeddings) != num_texts:
+    failed_count = sum(1 for embedding in all_embeddings if embedding is None)
+    if failed_count:
         print(
-            f"CẢNH BÁO: Số lượng embedding cuối cùng ({len(all_embeddings)}) không khớp số lượng text ban đầu ({num_texts})."
+            f"CẢNH BÁO: {failed_count}/{num_texts} text vẫn không tạo được embedding sau khi thử lại (giữ None)."
         )
-        return None  # Hoặc xử lý khác
-
     return all_embeddings
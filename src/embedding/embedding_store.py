@@ -0,0 +1,188 @@
+# src/embedding/embedding_store.py
+"""
+Kho embedding bền vững trên đĩa, khóa là (model, task_type, sha256(văn bản)).
+
+Khi tạo lại collection (đổi số chiều HNSW / cấu hình, chuyển cluster Qdrant...) pipeline lấy
+lại vector từ kho thay vì gọi Gemini lại cho mọi văn bản không đổi.
+
+Bố cục thư mục:
+- vectors_d<số chiều>.f32 : mảng float32 chỉ ghi nối đuôi, mỗi hàng một vector, đọc qua np.memmap.
+- index.tsv              : mỗi dòng "<khóa>\\t<số chiều>\\t<hàng>", cũng chỉ ghi nối đuôi.
+Vector được ghi (flush) trước dòng chỉ mục, nên khi process dừng giữa chừng chỉ mục không bao
+giờ trỏ tới dữ liệu chưa ghi; dòng chỉ mục ghi dở / hỏng bị bỏ qua khi mở lại.
+Chỉ một process được ghi vào kho tại một thời điểm (pipeline index); trong process có khóa.
+"""
+import hashlib
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+INDEX_FILE_NAME = "index.tsv"
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_store_key(model_name: str, task_type: str, text: str) -> str:
+    return f"{model_name}|{task_type}|{text_sha256(text)}"
+
+
+class PersistentEmbeddingStore:
+    """Kho vector chỉ ghi nối đuôi (memmap float32) + chỉ mục khóa -> (số chiều, hàng)."""
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._location_of_key: Dict[str, Tuple[int, int]] = {}
+        self._rows_by_dimension: Dict[int, int] = {}
+        self._memmaps: Dict[int, np.memmap] = {}
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._load_index()
+
+    def _vectors_path(self, dimension: int) -> str:
+        return os.path.join(self.store_dir, f"vectors_d{dimension}.f32")
+
+    def _rows_on_disk(self, dimension: int) -> int:
+        vectors_path = self._vectors_path(dimension)
+        if not os.path.exists(vectors_path):
+            return 0
+        return os.path.getsize(vectors_path) // (4 * dimension)
+
+    def _truncate_partial_row(self, dimension: int, complete_rows: int):
+        """Cắt phần hàng ghi dở ở cuối file (process dừng giữa lúc ghi) để hàng mới thẳng hàng."""
+        vectors_path = self._vectors_path(dimension)
+        if (
+            os.path.exists(vectors_path)
+            and os.path.getsize(vectors_path) != complete_rows * 4 * dimension
+        ):
+            os.truncate(vectors_path, complete_rows * 4 * dimension)
+
+    @staticmethod
+    def _ends_with_partial_line(index_path: str) -> bool:
+        if not os.path.exists(index_path) or os.path.getsize(index_path) == 0:
+            return False
+        with open(index_path, "rb") as index_file:
+            index_file.seek(-1, os.SEEK_END)
+            return index_file.read(1) != b"\n"
+
+    def _load_index(self):
+        index_path = os.path.join(self.store_dir, INDEX_FILE_NAME)
+        if not os.path.exists(index_path):
+            return
+        rows_on_disk: Dict[int, int] = {}
+        skipped_lines = 0
+        with open(index_path, "r", encoding="utf-8") as index_file:
+            for line in index_file:
+                parts = line.rstrip("\n").split("\t")
+                try:
+                    key, dimension, row = parts[0], int(parts[1]), int(parts[2])
+                except (IndexError, ValueError):
+                    skipped_lines += 1
+                    continue
+                if dimension not in rows_on_disk:
+                    rows_on_disk[dimension] = self._rows_on_disk(dimension)
+                if dimension <= 0 or not 0 <= row < rows_on_disk[dimension]:
+                    skipped_lines += 1
+                    continue
+                self._location_of_key[key] = (dimension, row)
+        self._rows_by_dimension = rows_on_disk
+        if skipped_lines:
+            print(
+                f"CẢNH BÁO (EmbeddingStore): Bỏ qua {skipped_lines} dòng chỉ mục không hợp lệ trong '{index_path}'."
+            )
+        print(
+            f"Thông tin (EmbeddingStore): Đã mở kho embedding '{self.store_dir}' ({len(self._location_of_key)} vector)."
+        )
+
+    def _memmap_for(self, dimension: int) -> Optional[np.memmap]:
+        rows = self._rows_by_dimension.get(dimension, 0)
+        if rows == 0:
+            return None
+        vectors = self._memmaps.get(dimension)
+        if vectors is None or vectors.shape[0] != rows:
+            # File đã dài thêm từ lần map trước: map lại (chỉ đọc) theo số hàng hiện tại
+            vectors = np.memmap(
+                self._vectors_path(dimension),
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, dimension),
+            )
+            self._memmaps[dimension] = vectors
+        return vectors
+
+    def get_many(
+        self, model_name: str, task_type: str, texts: Sequence[str]
+    ) -> List[Optional[list]]:
+        """Vector đã lưu cho từng text (None nếu chưa có), cùng thứ tự với texts."""
+        results: List[Optional[list]] = []
+        with self._lock:
+            for text in texts:
+                location = self._location_of_key.get(
+                    make_store_key(model_name, task_type, text)
+                )
+                if location is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                dimension, row = location
+                results.append(self._memmap_for(dimension)[row].tolist())
+                self.hits += 1
+        return results
+
+    def put_many(
+        self,
+        model_name: str,
+        task_type: str,
+        texts: Sequence[str],
+        vectors: Sequence[Optional[Sequence[float]]],
+    ):
+        """Ghi nối đuôi các vector chưa có trong kho (bỏ qua vector None / đã có)."""
+        with self._lock:
+            new_entries: Dict[int, Dict[str, Sequence[float]]] = {}
+            for text, vector in zip(texts, vectors):
+                if vector is None or len(vector) == 0:
+                    continue
+                key = make_store_key(model_name, task_type, text)
+                if key in self._location_of_key:
+                    continue
+                new_entries.setdefault(len(vector), {})[key] = vector
+            if not new_entries:
+                return
+            index_lines = []
+            for dimension, vectors_by_key in new_entries.items():
+                first_row = self._rows_on_disk(dimension)
+                self._truncate_partial_row(dimension, first_row)
+                matrix = np.asarray(list(vectors_by_key.values()), dtype=np.float32)
+                with open(self._vectors_path(dimension), "ab") as vectors_file:
+                    vectors_file.write(matrix.tobytes())
+                    vectors_file.flush()
+                    os.fsync(vectors_file.fileno())
+                for offset, key in enumerate(vectors_by_key):
+                    self._location_of_key[key] = (dimension, first_row + offset)
+                    index_lines.append(f"{key}\t{dimension}\t{first_row + offset}\n")
+                self._rows_by_dimension[dimension] = first_row + len(matrix)
+            self.writes += len(index_lines)
+            index_path = os.path.join(self.store_dir, INDEX_FILE_NAME)
+            if self._ends_with_partial_line(index_path):
+                index_lines.insert(0, "\n")  # Tách khỏi dòng ghi dở của lần chạy trước
+            with open(index_path, "a", encoding="utf-8") as index_file:
+                index_file.writelines(index_lines)
+                index_file.flush()
+
+    def __len__(self) -> int:
+        return len(self._location_of_key)
+
+    def stats(self) -> dict:
+        return {
+            "store_dir": self.store_dir,
+            "vectors": len(self._location_of_key),
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+        }
@@ -0,0 +1,126 @@
+# src/embedding/sparse_encoder.py
+"""
+Sparse vector kiểu BM25 cho tiếng Việt, dùng cho tìm kiếm hybrid (dense + sparse) trên Qdrant.
+
+- Tokenize: Unicode NFC, chữ thường, tách theo ký tự chữ/số (giữ nguyên dấu tiếng Việt),
+  bỏ stopword phổ biến; thêm bigram âm tiết liền kề ("lãi suất" -> "lãi_suất", "Điều 5" -> "điều_5")
+  vì từ tiếng Việt thường gồm nhiều âm tiết.
+- Nhận biết dấu: mỗi token có dấu được index thêm dạng bỏ dấu ("lãi" -> "lai", "đ" -> "d").
+  Câu hỏi gõ không dấu sẽ chỉ dùng dạng bỏ dấu; câu hỏi có dấu dùng dạng có dấu (chính xác hơn).
+- Document: trọng số BM25 phần TF (k1, b, độ dài trung bình avg_doc_length).
+  Query: trọng số 1.0 mỗi term. IDF do Qdrant tính (SparseVectorParams(modifier=IDF)).
+- Term được băm (crc32) thành chỉ số, không cần lưu từ điển.
+"""
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Iterable, List
+
+from qdrant_client import models
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+VIETNAMESE_STOPWORDS = frozenset(
+    [
+        "và", "của", "là", "các", "có", "được", "cho", "với", "trong", "này", "những",
+        "một", "khi", "thì", "để", "từ", "theo", "tại", "như", "đã", "sẽ", "bị", "về",
+        "hoặc", "nếu", "không", "cũng", "đến", "do", "ra", "vào", "lại", "nào", "gì",
+        "bao", "nhiêu", "thế", "làm", "sao", "ạ", "ơi", "nhé", "vậy", "the", "of", "and",
+    ]
+)
+
+
+def strip_vietnamese_diacritics(text: str) -> str:
+    """Bỏ dấu tiếng Việt: 'Lãi suất đặc biệt' -> 'Lai suat dac biet'."""
+    decomposed = unicodedata.normalize("NFD", text)
+    without_marks = "".join(
+        char for char in decomposed if unicodedata.category(char) != "Mn"
+    )
+    return without_marks.replace("đ", "d").replace("Đ", "D")
+
+
+def has_vietnamese_diacritics(text: str) -> bool:
+    return strip_vietnamese_diacritics(text) != text
+
+
+def tokenize_vietnamese(text: str, fold_diacritics: bool = False) -> List[str]:
+    """Tách âm tiết (giữ dấu, hoặc bỏ dấu nếu fold_diacritics) và bỏ stopword."""
+    if not text:
+        return []
+    normalized = unicodedata.normalize("NFC", text).lower()
+    syllables = _TOKEN_PATTERN.findall(normalized)
+    tokens = [s for s in syllables if s not in VIETNAMESE_STOPWORDS]
+    if fold_diacritics:
+        tokens = [strip_vietnamese_diacritics(token) for token in tokens]
+    return tokens
+
+
+def _with_bigrams(tokens: List[str]) -> List[str]:
+    return tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def _term_index(term: str) -> int:
+    return zlib.crc32(term.encode("utf-8"))
+
+
+class VietnameseBM25SparseEncoder:
+    """Mã hóa văn bản thành models.SparseVector (BM25 TF cho document, nhị phân cho query)."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_length: float = 256.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+
+    def document_terms(self, text: str) -> List[str]:
+        accented_tokens = tokenize_vietnamese(text)
+        terms = _with_bigrams(accented_tokens)
+        folded_tokens = [strip_vietnamese_diacritics(t) for t in accented_tokens]
+        if folded_tokens != accented_tokens:
+            # Dạng bỏ dấu chỉ thêm cho các term khác dạng có dấu (term không dấu sẵn đã có)
+            accented_terms = set(terms)
+            terms += [
+                term
+                for term in _with_bigrams(folded_tokens)
+                if term not in accented_terms
+            ]
+        return terms
+
+    def query_terms(self, text: str) -> List[str]:
+        fold = not has_vietnamese_diacritics(unicodedata.normalize("NFC", text))
+        return _with_bigrams(tokenize_vietnamese(text, fold_diacritics=fold))
+
+    def fit(self, texts: Iterable[str]) -> "VietnameseBM25SparseEncoder":
+        """Ước lượng độ dài trung bình document (số âm tiết) từ corpus khi index."""
+        lengths = [len(tokenize_vietnamese(text)) for text in texts]
+        if lengths:
+            self.avg_doc_length = max(1.0, sum(lengths) / len(lengths))
+        return self
+
+    @staticmethod
+    def _to_sparse_vector(weights: dict) -> models.SparseVector:
+        # Băm có thể trùng chỉ số (hiếm): cộng dồn trọng số
+        merged = {}
+        for term, weight in weights.items():
+            index = _term_index(term)
+            merged[index] = merged.get(index, 0.0) + weight
+        indices = sorted(merged)
+        return models.SparseVector(
+            indices=indices, values=[float(merged[i]) for i in indices]
+        )
+
+    def encode_document(self, text: str) -> models.SparseVector:
+        terms = self.document_terms(text)
+        doc_length = len(tokenize_vietnamese(text)) or 1
+        length_norm = self.k1 * (1 - self.b + self.b * doc_length / self.avg_doc_length)
+        weights = {
+            term: tf * (self.k1 + 1) / (tf + length_norm)
+            for term, tf in Counter(terms).items()
+        }
+        return self._to_sparse_vector(weights)
+
+    def encode_documents(self, texts: Iterable[str]) -> List[models.SparseVector]:
+        return [self.encode_document(text) for text in texts]
+
+    def encode_query(self, text: str) -> models.SparseVector:
+        return self._to_sparse_vector({term: 1.0 for term in set(self.query_terms(text))})
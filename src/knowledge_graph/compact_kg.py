@@ -0,0 +1,274 @@
+# src/knowledge_graph/compact_kg.py
+"""
+Biểu diễn Knowledge Graph gọn nhẹ, chỉ đọc, dùng khi phục vụ API (thay cho nx.DiGraph).
+
+- Node ID được đánh số nguyên 0..N-1; chuỗi được intern qua một bảng dùng chung
+  (các giá trị lặp lại như type, source_document_id, keywords chỉ lưu một lần).
+- Mỗi node là một KGNodeRecord dùng __slots__ (không có dict riêng cho từng node).
+- Kề HAS_CHUNK lưu dạng CSR (offsets + targets trong array('i')), NEXT_CHUNK lưu dạng
+  hai mảng next/previous (-1 nếu không có).
+
+Giao diện đọc tương thích với phần networkx mà retrieval_service dùng:
+has_node(), nodes[node_id].get(...), number_of_nodes(), number_of_edges().
+"""
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import networkx as nx
+
+HAS_CHUNK_EDGE = "HAS_CHUNK"
+NEXT_CHUNK_EDGE = "NEXT_CHUNK"
+
+
+class KGNodeRecord:
+    """Thuộc tính của một node KG. Hỗ trợ .get()/[] với các key giống thuộc tính GraphML."""
+
+    __slots__ = (
+        "node_id",
+        "node_type",
+        "name",
+        "original_filename",
+        "text_content",
+        "summary",
+        "keywords",
+        "source_document_id",
+        "order_in_doc",
+        "extra",
+    )
+
+    # key thuộc tính trong GraphML -> tên slot
+    _SLOT_BY_KEY = {
+        "type": "node_type",
+        "name": "name",
+        "original_filename": "original_filename",
+        "text_content": "text_content",
+        "summary": "summary",
+        "keywords": "keywords",
+        "source_document_id": "source_document_id",
+        "order_in_doc": "order_in_doc",
+    }
+
+    def __init__(self, node_id: str):
+        self.node_id = node_id
+        self.node_type = None
+        self.name = None
+        self.original_filename = None
+        self.text_content = None
+        self.summary = None
+        self.keywords = None
+        self.source_document_id = None
+        self.order_in_doc = None
+        self.extra = None  # dict cho các thuộc tính hiếm gặp khác (thường là None)
+
+    def get(self, key: str, default=None):
+        slot_name = self._SLOT_BY_KEY.get(key)
+        if slot_name is not None:
+            value = getattr(self, slot_name)
+        elif self.extra is not None:
+            value = self.extra.get(key)
+        else:
+            value = None
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def to_dict(self) -> dict:
+        data = {}
+        for key, slot_name in self._SLOT_BY_KEY.items():
+            value = getattr(self, slot_name)
+            if value is not None:
+                data[key] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+class _CompactNodeView:
+    """Mô phỏng graph.nodes của networkx: nodes[node_id], `in`, len(), nodes(data=True)."""
+
+    __slots__ = ("_graph",)
+
+    def __init__(self, graph: "CompactKnowledgeGraph"):
+        self._graph = graph
+
+    def __getitem__(self, node_id: str) -> KGNodeRecord:
+        record = self._graph.get_node(node_id)
+        if record is None:
+            raise KeyError(node_id)
+        return record
+
+    def __contains__(self, node_id: str) -> bool:
+        return self._graph.has_node(node_id)
+
+    def __len__(self) -> int:
+        return self._graph.number_of_nodes()
+
+    def __iter__(self) -> Iterator[str]:
+        return self._graph.iter_node_ids()
+
+    def __call__(self, data: bool = False):
+        if not data:
+            return self._graph.iter_node_ids()
+        return (
+            (record.node_id, record.to_dict()) for record in self._graph.iter_records()
+        )
+
+
+class CompactKnowledgeGraph:
+    """KG chỉ đọc cho đường phục vụ API. Tạo bằng CompactKnowledgeGraph.from_networkx(graph)."""
+
+    def __init__(self):
+        self._strings: Dict[str, str] = {}
+        self._node_ids: List[str] = []
+        self._node_index: Dict[str, int] = {}
+        self._records: List[KGNodeRecord] = []
+        self._has_chunk_offsets = array("i", [0])
+        self._has_chunk_targets = array("i")
+        self._next_chunk = array("i")
+        self._previous_chunk = array("i")
+        # Các cạnh không thuộc HAS_CHUNK/NEXT_CHUNK (hiếm): (source_index, target_index, type)
+        self._other_edges: List[Tuple[int, int, Optional[str]]] = []
+        self._num_edges = 0
+        self.nodes = _CompactNodeView(self)
+
+    def _intern(self, value):
+        if not isinstance(value, str):
+            return value
+        return self._strings.setdefault(value, value)
+
+    @classmethod
+    def from_networkx(cls, graph: nx.DiGraph) -> "CompactKnowledgeGraph":
+        compact = cls()
+        slot_by_key = KGNodeRecord._SLOT_BY_KEY
+
+        for node_id, data in graph.nodes(data=True):
+            node_id = compact._intern(str(node_id))
+            record = KGNodeRecord(node_id)
+            for key, value in data.items():
+                slot_name = slot_by_key.get(key)
+                if slot_name == "order_in_doc":
+                    try:
+                        value = int(value)
+                    except (TypeError, ValueError):
+                        pass
+                else:
+                    value = compact._intern(value)
+                if slot_name is not None:
+                    setattr(record, slot_name, value)
+                else:
+                    if record.extra is None:
+                        record.extra = {}
+                    record.extra[compact._intern(key)] = value
+            compact._node_index[node_id] = len(compact._node_ids)
+            compact._node_ids.append(node_id)
+            compact._records.append(record)
+
+        num_nodes = len(compact._node_ids)
+        compact._next_chunk = array("i", [-1]) * num_nodes
+        compact._previous_chunk = array("i", [-1]) * num_nodes
+        has_chunk_lists: List[List[int]] = [[] for _ in range(num_nodes)]
+
+        for source, target, edge_data in graph.edges(data=True):
+            source_index = compact._node_index[str(source)]
+            target_index = compact._node_index[str(target)]
+            edge_type = edge_data.get("type")
+            if edge_type == HAS_CHUNK_EDGE:
+                has_chunk_lists[source_index].append(target_index)
+            elif (
+                edge_type == NEXT_CHUNK_EDGE
+                and compact._next_chunk[source_index] == -1
+                and compact._previous_chunk[target_index] == -1
+            ):
+                compact._next_chunk[source_index] = target_index
+                compact._previous_chunk[target_index] = source_index
+            else:
+                compact._other_edges.append(
+                    (source_index, target_index, compact._intern(edge_type))
+                )
+            compact._num_edges += 1
+
+        for chunk_indices in has_chunk_lists:
+            # Sắp xếp chunk theo thứ tự trong tài liệu để chunks_of_document trả về đúng thứ tự
+            chunk_indices.sort(
+                key=lambda index: (
+                    compact._records[index].order_in_doc
+                    if isinstance(compact._records[index].order_in_doc, int)
+                    else 0
+                )
+            )
+            compact._has_chunk_targets.extend(chunk_indices)
+            compact._has_chunk_offsets.append(len(compact._has_chunk_targets))
+        return compact
+
+    # --- Giao diện đọc tương thích networkx ---
+    def has_node(self, node_id) -> bool:
+        return node_id in self._node_index
+
+    def get_node(self, node_id) -> Optional[KGNodeRecord]:
+        index = self._node_index.get(node_id)
+        return None if index is None else self._records[index]
+
+    def number_of_nodes(self) -> int:
+        return len(self._node_ids)
+
+    def number_of_edges(self) -> int:
+        return self._num_edges
+
+    def iter_node_ids(self) -> Iterator[str]:
+        return iter(self._node_ids)
+
+    def iter_records(self) -> Iterator[KGNodeRecord]:
+        return iter(self._records)
+
+    # --- Truy vấn cạnh dùng mảng kề ---
+    def chunks_of_document(self, document_id: str) -> List[str]:
+        """Các chunk (HAS_CHUNK) của một Document, theo order_in_doc."""
+        index = self._node_index.get(document_id)
+        if index is None:
+            return []
+        start, end = self._has_chunk_offsets[index], self._has_chunk_offsets[index + 1]
+        return [self._node_ids[i] for i in self._has_chunk_targets[start:end]]
+
+    def next_chunk_id(self, chunk_id: str) -> Optional[str]:
+        index = self._node_index.get(chunk_id)
+        if index is None or self._next_chunk[index] == -1:
+            return None
+        return self._node_ids[self._next_chunk[index]]
+
+    def previous_chunk_id(self, chunk_id: str) -> Optional[str]:
+        index = self._node_index.get(chunk_id)
+        if index is None or self._previous_chunk[index] == -1:
+            return None
+        return self._node_ids[self._previous_chunk[index]]
+
+    def to_networkx(self) -> nx.DiGraph:
+        """Dựng lại nx.DiGraph (dùng cho export GraphML / các script cũ)."""
+        graph = nx.DiGraph()
+        for record in self._records:
+            graph.add_node(record.node_id, **record.to_dict())
+        for source_index in range(len(self._node_ids)):
+            source_id = self._node_ids[source_index]
+            start = self._has_chunk_offsets[source_index]
+            end = self._has_chunk_offsets[source_index + 1]
+            for target_index in self._has_chunk_targets[start:end]:
+                graph.add_edge(
+                    source_id, self._node_ids[target_index], type=HAS_CHUNK_EDGE
+                )
+            next_index = self._next_chunk[source_index]
+            if next_index != -1:
+                graph.add_edge(
+                    source_id, self._node_ids[next_index], type=NEXT_CHUNK_EDGE
+                )
+        for source_index, target_index, edge_type in self._other_edges:
+            edge_attrs = {"type": edge_type} if edge_type is not None else {}
+            graph.add_edge(
+                self._node_ids[source_index], self._node_ids[target_index], **edge_attrs
+            )
+        return graph
@@ -1,7 +1,16 @@
 # src/knowledge_graph/kg_loader_service.py
+import gc
 import os
 import networkx as nx
 
+from src.knowledge_graph.compact_kg import CompactKnowledgeGraph
+from src.knowledge_graph.kg_snapshot import (
+    KGSnapshot,
+    get_snapshot_path,
+    is_snapshot_fresh,
+    write_kg_snapshot,
+)
+
 
 def load_nx_graph_from_file(graph_file_path: str) -> nx.DiGraph | None:
     """
@@ -20,3 +29,66 @@ def load_nx_graph_from_file(graph_file_path: str) -> nx.DiGraph | None:
     except Exception as e:
         print(f"Lỗi khi tải đồ thị từ file '{graph_file_path}': {e}")
         return None
+
+
+def load_compact_graph_from_file(graph_file_path: str) -> CompactKnowledgeGraph | None:
+    """
+    Tải KG từ file GraphML rồi chuyển sang CompactKnowledgeGraph (chỉ đọc) để phục vụ API.
+    nx.DiGraph trung gian được giải phóng ngay sau khi chuyển đổi.
+    """
+    graph = load_nx_graph_from_file(graph_file_path)
+    if graph is None:
+        return None
+    compact_graph = CompactKnowledgeGraph.from_networkx(graph)
+    del graph
+    gc.collect()
+    print(
+        f"Đã chuyển đồ thị sang dạng compact ({compact_graph.number_of_nodes()} nút, {compact_graph.number_of_edges()} cạnh)."
+    )
+    return compact_graph
+
+
+def load_kg_snapshot(snapshot_path: str) -> KGSnapshot | None:
+    """Mở snapshot KG nhị phân (mmap, chỉ đọc)."""
+    if not os.path.exists(snapshot_path):
+        print(f"LỖI (kg_loader): File snapshot '{snapshot_path}' không tồn tại.")
+        return None
+    try:
+        snapshot = KGSnapshot(snapshot_path)
+        print(
+            f"Đã mở snapshot KG '{snapshot_path}' ({snapshot.number_of_nodes()} nút, {snapshot.number_of_edges()} cạnh)."
+        )
+        return snapshot
+    except Exception as e:
+        print(f"Lỗi khi mở snapshot KG '{snapshot_path}': {e}")
+        return None
+
+
+def load_serving_graph(graph_file_path: str):
+    """
+    Tải KG để phục vụ: ưu tiên snapshot nhị phân nằm cạnh file GraphML (nếu không cũ hơn
+    GraphML); nếu không có thì đọc GraphML, chuyển sang dạng compact và ghi snapshot cho lần sau.
+    """
+    snapshot_path = get_snapshot_path(graph_file_path)
+    if is_snapshot_fresh(snapshot_path, graph_file_path):
+        snapshot = load_kg_snapshot(snapshot_path)
+        if snapshot is not None:
+            return snapshot
+    compact_graph = load_compact_graph_from_file(graph_file_path)
+    if compact_graph is not None:
+        try:
+            write_kg_snapshot(compact_graph, snapshot_path)
+        except OSError as e_write:
+            print(f"CẢNH BÁO (kg_loader): Không ghi được snapshot KG: {e_write}")
+    return compact_graph
+
+
+def save_kg_graph(graph: nx.DiGraph, graph_file_path: str, write_snapshot: bool = True):
+    """Lưu KG ra GraphML (định dạng trao đổi) và snapshot nhị phân nằm cạnh nó."""
+    graph_dir = os.path.dirname(graph_file_path)
+    if graph_dir:
+        os.makedirs(graph_dir, exist_ok=True)
+    nx.write_graphml(graph, graph_file_path)
+    print(f"Đã lưu đồ thị vào file: {graph_file_path}")
+    if write_snapshot:
+        write_kg_snapshot(graph, get_snapshot_path(graph_file_path))
@@ -0,0 +1,494 @@
+# src/knowledge_graph/kg_snapshot.py
+"""
+Định dạng snapshot nhị phân cho Knowledge Graph (thay cho việc parse GraphML mỗi lần khởi động).
+
+File được mở bằng mmap chỉ đọc, nên nhiều worker uvicorn dùng chung các trang bộ nhớ của OS.
+Bố cục (little-endian, mỗi phần căn lề 8 byte):
+
+    header        : magic "KGSNAP01", version, số node, số cạnh HAS_CHUNK, số cạnh khác,
+                    kích thước string heap, tổng số cạnh
+    node table    : num_nodes bản ghi cố định (_NODE_DTYPE): tham chiếu chuỗi (offset, length)
+                    vào heap + order_in_doc, next_chunk, previous_chunk
+    sorted index  : u32[num_nodes], chỉ số node sắp theo node_id (tra cứu bằng binary search)
+    HAS_CHUNK CSR : u32[num_nodes + 1] offsets, u32[num_has_chunk] targets
+    other edges   : num_other_edges bản ghi (source, target, type)
+    string heap   : các chuỗi UTF-8 (đã khử trùng lặp)
+
+GraphML vẫn là định dạng trao đổi; chuyển đổi hai chiều:
+    python -m src.knowledge_graph.kg_snapshot to-snapshot <file.graphml> [<file.kgsnap>]
+    python -m src.knowledge_graph.kg_snapshot to-graphml <file.kgsnap> <file.graphml>
+"""
+import functools
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Iterator, List, Optional
+
+import networkx as nx
+import numpy as np
+
+from src.knowledge_graph.compact_kg import (
+    HAS_CHUNK_EDGE,
+    NEXT_CHUNK_EDGE,
+    CompactKnowledgeGraph,
+    KGNodeRecord,
+    _CompactNodeView,
+)
+
+SNAPSHOT_MAGIC = b"KGSNAP01"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".kgsnap"
+
+_HEADER = struct.Struct("<8sIIIIQQ")
+_NO_STRING = 0xFFFFFFFF  # offset đánh dấu giá trị None
+_NO_INT = -1
+
+# Các trường chuỗi của một node (theo thứ tự trong bản ghi)
+_STRING_FIELDS = (
+    "node_id",
+    "node_type",
+    "name",
+    "original_filename",
+    "text_content",
+    "summary",
+    "keywords",
+    "source_document_id",
+    "extra_json",
+)
+_NODE_DTYPE = np.dtype(
+    [(f"{field}_off", "<u4") for field in _STRING_FIELDS]
+    + [(f"{field}_len", "<u4") for field in _STRING_FIELDS]
+    + [("order_in_doc", "<i4"), ("next_chunk", "<i4"), ("previous_chunk", "<i4")]
+)
+_EDGE_DTYPE = np.dtype(
+    [("source", "<u4"), ("target", "<u4"), ("type_off", "<u4"), ("type_len", "<u4")]
+)
+
+
+def get_snapshot_path(graphml_path: str) -> str:
+    """Đường dẫn snapshot nằm cạnh file GraphML: <tên>.graphml -> <tên>.kgsnap"""
+    return os.path.splitext(graphml_path)[0] + SNAPSHOT_SUFFIX
+
+
+def is_snapshot_fresh(snapshot_path: str, graphml_path: str) -> bool:
+    """Snapshot tồn tại và không cũ hơn file GraphML (nếu có GraphML)."""
+    if not os.path.exists(snapshot_path):
+        return False
+    if not os.path.exists(graphml_path):
+        return True
+    return os.path.getmtime(snapshot_path) >= os.path.getmtime(graphml_path)
+
+
+def _align8(value: int) -> int:
+    return (value + 7) & ~7
+
+
+class _StringHeapWriter:
+    def __init__(self):
+        self._chunks = []
+        self._size = 0
+        self._refs = {}
+
+    def add(self, value) -> tuple:
+        if value is None:
+            return _NO_STRING, 0
+        if not isinstance(value, str):
+            value = str(value)
+        ref = self._refs.get(value)
+        if ref is None:
+            encoded = value.encode("utf-8")
+            ref = (self._size, len(encoded))
+            self._chunks.append(encoded)
+            self._size += len(encoded)
+            if self._size >= _NO_STRING:
+                raise ValueError("String heap của snapshot vượt quá 4 GB.")
+            self._refs[value] = ref
+        return ref
+
+    def to_bytes(self) -> bytes:
+        return b"".join(self._chunks)
+
+
+def write_kg_snapshot(graph, snapshot_path: str) -> str:
+    """
+    Ghi KG (nx.DiGraph hoặc CompactKnowledgeGraph) ra file snapshot.
+    Ghi vào file tạm rồi os.replace để các worker đang mmap file cũ không bị ảnh hưởng.
+    """
+    compact = (
+        graph
+        if isinstance(graph, CompactKnowledgeGraph)
+        else CompactKnowledgeGraph.from_networkx(graph)
+    )
+    num_nodes = compact.number_of_nodes()
+    heap = _StringHeapWriter()
+
+    node_table = np.zeros(num_nodes, dtype=_NODE_DTYPE)
+    for index, record in enumerate(compact._records):
+        values = {
+            "node_id": record.node_id,
+            "node_type": record.node_type,
+            "name": record.name,
+            "original_filename": record.original_filename,
+            "text_content": record.text_content,
+            "summary": record.summary,
+            "keywords": record.keywords,
+            "source_document_id": record.source_document_id,
+            "extra_json": (
+                json.dumps(record.extra, ensure_ascii=False) if record.extra else None
+            ),
+        }
+        row = node_table[index]
+        for field in _STRING_FIELDS:
+            row[f"{field}_off"], row[f"{field}_len"] = heap.add(values[field])
+        row["order_in_doc"] = (
+            record.order_in_doc if isinstance(record.order_in_doc, int) else _NO_INT
+        )
+        row["next_chunk"] = compact._next_chunk[index]
+        row["previous_chunk"] = compact._previous_chunk[index]
+
+    sorted_index = np.array(
+        sorted(range(num_nodes), key=lambda i: compact._node_ids[i].encode("utf-8")),
+        dtype="<u4",
+    )
+    has_chunk_offsets = np.asarray(compact._has_chunk_offsets, dtype="<u4")
+    has_chunk_targets = np.asarray(compact._has_chunk_targets, dtype="<u4")
+    other_edges = np.zeros(len(compact._other_edges), dtype=_EDGE_DTYPE)
+    for i, (source_index, target_index, edge_type) in enumerate(compact._other_edges):
+        type_off, type_len = heap.add(edge_type)
+        other_edges[i] = (source_index, target_index, type_off, type_len)
+    heap_bytes = heap.to_bytes()
+
+    sections = [
+        node_table.tobytes(),
+        sorted_index.tobytes(),
+        has_chunk_offsets.tobytes(),
+        has_chunk_targets.tobytes(),
+        other_edges.tobytes(),
+        heap_bytes,
+    ]
+    header = _HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        num_nodes,
+        len(has_chunk_targets),
+        len(other_edges),
+        len(heap_bytes),
+        compact.number_of_edges(),
+    )
+
+    snapshot_dir = os.path.dirname(snapshot_path)
+    if snapshot_dir:
+        os.makedirs(snapshot_dir, exist_ok=True)
+    # File tạm tên riêng cho mỗi lần ghi: nhiều worker cùng ghi snapshot lúc khởi động không
+    # ghi chồng lên nhau, os.replace chỉ cài đặt file đã ghi trọn vẹn.
+    tmp_fd, tmp_path = tempfile.mkstemp(
+        dir=snapshot_dir or None,
+        prefix=os.path.basename(snapshot_path) + ".",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(tmp_fd, "wb") as f:
+            f.write(header)
+            f.write(b"\0" * (_align8(_HEADER.size) - _HEADER.size))
+            for section in sections:
+                f.write(section)
+                f.write(b"\0" * (_align8(len(section)) - len(section)))
+        os.chmod(tmp_path, 0o644)  # mkstemp tạo file 0600; snapshot cần đọc được như file thường
+        os.replace(tmp_path, snapshot_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    print(
+        f"Thông tin (KG Snapshot): Đã ghi snapshot {num_nodes} nút, {compact.number_of_edges()} cạnh vào '{snapshot_path}'."
+    )
+    return snapshot_path
+
+
+class _SnapshotNodeRecord:
+    """
+    Bản ghi node đọc lười từ snapshot: chỉ giải mã trường được hỏi (ví dụ .get("summary")),
+    không giải mã toàn bộ text_content mỗi lần tra cứu. Giao diện giống KGNodeRecord.
+    """
+
+    __slots__ = ("_snapshot", "_row")
+
+    def __init__(self, snapshot: "KGSnapshot", row: tuple):
+        self._snapshot = snapshot
+        self._row = row
+
+    @property
+    def node_id(self) -> str:
+        return self._snapshot._row_string(self._row, 0)
+
+    def get(self, key: str, default=None):
+        field_index = _FIELD_INDEX_BY_KEY.get(key)
+        if field_index is not None:
+            value = self._snapshot._row_string(self._row, field_index)
+        elif key == "order_in_doc":
+            value = self._row[_ORDER_IN_DOC_POS]
+            value = None if value == _NO_INT else value
+        else:
+            extra_json = self._snapshot._row_string(self._row, _EXTRA_FIELD_INDEX)
+            value = json.loads(extra_json).get(key) if extra_json else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def to_dict(self) -> dict:
+        data = {}
+        for key in KGNodeRecord._SLOT_BY_KEY:
+            value = self.get(key)
+            if value is not None:
+                data[key] = value
+        extra_json = self._snapshot._row_string(self._row, _EXTRA_FIELD_INDEX)
+        if extra_json:
+            data.update(json.loads(extra_json))
+        return data
+
+
+# Vị trí các trường trong tuple giải nén từ một bản ghi node (_NODE_STRUCT)
+_NUM_STRING_FIELDS = len(_STRING_FIELDS)
+_FIELD_INDEX_BY_KEY = {
+    graphml_key: _STRING_FIELDS.index(slot_name)
+    for graphml_key, slot_name in KGNodeRecord._SLOT_BY_KEY.items()
+    if slot_name in _STRING_FIELDS
+}
+_EXTRA_FIELD_INDEX = _STRING_FIELDS.index("extra_json")
+_ORDER_IN_DOC_POS = 2 * _NUM_STRING_FIELDS
+_NEXT_CHUNK_POS = _ORDER_IN_DOC_POS + 1
+_PREVIOUS_CHUNK_POS = _ORDER_IN_DOC_POS + 2
+_NODE_STRUCT = struct.Struct("<" + "I" * (2 * _NUM_STRING_FIELDS) + "iii")
+_EDGE_STRUCT = struct.Struct("<IIII")
+assert _NODE_STRUCT.size == _NODE_DTYPE.itemsize
+
+
+class KGSnapshot:
+    """
+    KG chỉ đọc đọc trực tiếp từ file snapshot qua mmap. Cùng giao diện đọc với
+    CompactKnowledgeGraph (has_node, nodes[...].get, chunks_of_document, ...).
+    Không dựng dict node_id -> index trong bộ nhớ: tra cứu bằng binary search trên
+    bảng chỉ số đã sắp xếp, nên gần như toàn bộ dữ liệu nằm trong các trang mmap dùng chung.
+    """
+
+    def __init__(self, snapshot_path: str, index_cache_size: int = 65536):
+        self.snapshot_path = snapshot_path
+        # Cache LRU có giới hạn cho node_id -> index (các chunk "nóng" khỏi phải binary search lại)
+        self._find_index = functools.lru_cache(maxsize=index_cache_size)(
+            self._find_index_uncached
+        )
+        self._file = open(snapshot_path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            num_nodes,
+            num_has_chunk,
+            num_other_edges,
+            heap_size,
+            num_edges,
+        ) = _HEADER.unpack_from(self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            self._mmap.close()
+            self._file.close()
+            raise ValueError(
+                f"File '{snapshot_path}' không phải snapshot KG hợp lệ (magic={magic!r}, version={version})."
+            )
+        self._num_nodes = num_nodes
+        self._num_has_chunk = num_has_chunk
+        self._num_other_edges = num_other_edges
+        self._num_edges = num_edges
+
+        offset = _align8(_HEADER.size)
+        self._node_table_offset = offset
+        offset += _align8(_NODE_STRUCT.size * num_nodes)
+        sorted_index_offset = offset
+        offset += _align8(4 * num_nodes)
+        has_chunk_offsets_offset = offset
+        offset += _align8(4 * (num_nodes + 1))
+        has_chunk_targets_offset = offset
+        offset += _align8(4 * num_has_chunk)
+        self._other_edges_offset = offset
+        offset += _align8(_EDGE_STRUCT.size * num_other_edges)
+        self._heap_offset = offset
+        self._heap_size = heap_size
+
+        # memoryview kiểu u32 trỏ thẳng vào mmap (truy cập từng phần tử nhanh, không copy)
+        buffer = memoryview(self._mmap)
+        self._buffer = buffer
+        self._sorted_index = buffer[
+            sorted_index_offset : sorted_index_offset + 4 * num_nodes
+        ].cast("I")
+        self._has_chunk_offsets = buffer[
+            has_chunk_offsets_offset : has_chunk_offsets_offset + 4 * (num_nodes + 1)
+        ].cast("I")
+        self._has_chunk_targets = buffer[
+            has_chunk_targets_offset : has_chunk_targets_offset + 4 * num_has_chunk
+        ].cast("I")
+        self.nodes = _CompactNodeView(self)
+
+    def close(self):
+        self._find_index.cache_clear()
+        for view in (
+            self._sorted_index,
+            self._has_chunk_offsets,
+            self._has_chunk_targets,
+            self._buffer,
+        ):
+            view.release()
+        self._mmap.close()
+        self._file.close()
+
+    # --- Đọc chuỗi và bản ghi ---
+    def _read_string(self, offset: int, length: int) -> Optional[str]:
+        if offset == _NO_STRING:
+            return None
+        start = self._heap_offset + offset
+        return self._mmap[start : start + length].decode("utf-8")
+
+    def _row(self, index: int) -> tuple:
+        return _NODE_STRUCT.unpack_from(
+            self._mmap, self._node_table_offset + index * _NODE_STRUCT.size
+        )
+
+    def _row_string(self, row: tuple, field_index: int) -> Optional[str]:
+        return self._read_string(row[field_index], row[_NUM_STRING_FIELDS + field_index])
+
+    def _node_id_at(self, index: int) -> str:
+        return self._row_string(self._row(index), 0)
+
+    def _find_index_uncached(self, node_id) -> Optional[int]:
+        if not isinstance(node_id, str):
+            return None
+        target = node_id.encode("utf-8")
+        low, high = 0, self._num_nodes
+        heap_offset = self._heap_offset
+        while low < high:
+            middle = (low + high) // 2
+            candidate_index = self._sorted_index[middle]
+            row = self._row(candidate_index)
+            start = heap_offset + row[0]
+            candidate = self._mmap[start : start + row[_NUM_STRING_FIELDS]]
+            if candidate < target:
+                low = middle + 1
+            elif candidate > target:
+                high = middle
+            else:
+                return candidate_index
+        return None
+
+    # --- Giao diện đọc tương thích CompactKnowledgeGraph / networkx ---
+    def has_node(self, node_id) -> bool:
+        return self._find_index(node_id) is not None
+
+    def get_node(self, node_id) -> Optional[_SnapshotNodeRecord]:
+        index = self._find_index(node_id)
+        return None if index is None else _SnapshotNodeRecord(self, self._row(index))
+
+    def number_of_nodes(self) -> int:
+        return self._num_nodes
+
+    def number_of_edges(self) -> int:
+        return self._num_edges
+
+    def iter_node_ids(self) -> Iterator[str]:
+        return (self._node_id_at(index) for index in range(self._num_nodes))
+
+    def iter_records(self) -> Iterator[_SnapshotNodeRecord]:
+        return (
+            _SnapshotNodeRecord(self, self._row(index))
+            for index in range(self._num_nodes)
+        )
+
+    def chunks_of_document(self, document_id: str) -> List[str]:
+        index = self._find_index(document_id)
+        if index is None:
+            return []
+        start = self._has_chunk_offsets[index]
+        end = self._has_chunk_offsets[index + 1]
+        return [self._node_id_at(i) for i in self._has_chunk_targets[start:end]]
+
+    def next_chunk_id(self, chunk_id: str) -> Optional[str]:
+        index = self._find_index(chunk_id)
+        if index is None:
+            return None
+        next_index = self._row(index)[_NEXT_CHUNK_POS]
+        return None if next_index == _NO_INT else self._node_id_at(next_index)
+
+    def previous_chunk_id(self, chunk_id: str) -> Optional[str]:
+        index = self._find_index(chunk_id)
+        if index is None:
+            return None
+        previous_index = self._row(index)[_PREVIOUS_CHUNK_POS]
+        return None if previous_index == _NO_INT else self._node_id_at(previous_index)
+
+    def to_networkx(self) -> nx.DiGraph:
+        graph = nx.DiGraph()
+        node_ids = []
+        for record in self.iter_records():
+            node_id = record.node_id
+            node_ids.append(node_id)
+            graph.add_node(node_id, **record.to_dict())
+        for index in range(self._num_nodes):
+            start = self._has_chunk_offsets[index]
+            end = self._has_chunk_offsets[index + 1]
+            for target_index in self._has_chunk_targets[start:end]:
+                graph.add_edge(
+                    node_ids[index], node_ids[target_index], type=HAS_CHUNK_EDGE
+                )
+            next_index = self._row(index)[_NEXT_CHUNK_POS]
+            if next_index != _NO_INT:
+                graph.add_edge(
+                    node_ids[index], node_ids[next_index], type=NEXT_CHUNK_EDGE
+                )
+        for edge_index in range(self._num_other_edges):
+            source_index, target_index, type_off, type_len = _EDGE_STRUCT.unpack_from(
+                self._mmap, self._other_edges_offset + edge_index * _EDGE_STRUCT.size
+            )
+            edge_type = self._read_string(type_off, type_len)
+            edge_attrs = {"type": edge_type} if edge_type is not None else {}
+            graph.add_edge(node_ids[source_index], node_ids[target_index], **edge_attrs)
+        return graph
+
+
+def graphml_to_snapshot(graphml_path: str, snapshot_path: str = None) -> str:
+    snapshot_path = snapshot_path or get_snapshot_path(graphml_path)
+    return write_kg_snapshot(nx.read_graphml(graphml_path), snapshot_path)
+
+
+def snapshot_to_graphml(snapshot_path: str, graphml_path: str) -> str:
+    snapshot = KGSnapshot(snapshot_path)
+    try:
+        graph = snapshot.to_networkx()
+    finally:
+        snapshot.close()
+    nx.write_graphml(graph, graphml_path)
+    print(f"Thông tin (KG Snapshot): Đã xuất GraphML '{graphml_path}'.")
+    return graphml_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("to-snapshot", "to-graphml"):
+        print(
+            "Cách dùng:\n"
+            "  python -m src.knowledge_graph.kg_snapshot to-snapshot <file.graphml> [<file.kgsnap>]\n"
+            "  python -m src.knowledge_graph.kg_snapshot to-graphml <file.kgsnap> <file.graphml>"
+        )
+        sys.exit(1)
+    if sys.argv[1] == "to-snapshot":
+        graphml_to_snapshot(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+    else:
+        if len(sys.argv) < 4:
+            print("LỖI: Thiếu đường dẫn file GraphML đầu ra.")
+            sys.exit(1)
+        snapshot_to_graphml(sys.argv[2], sys.argv[3])
@@ -0,0 +1,115 @@
+# src/llm/answer_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Cache câu trả lời của LLM. Khóa gồm hai phần:
+      - hash của danh sách ID ngữ cảnh đã truy xuất (cùng ngữ cảnh => cùng prompt phần tham khảo),
+      - độ tương đồng cosine giữa embedding câu hỏi mới và câu hỏi đã cache (>= similarity_threshold).
+    Toàn bộ cache bị xóa khi phiên bản dữ liệu (KG/Qdrant) thay đổi (xem DataVersionTracker).
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        similarity_threshold: float,
+        max_entries_per_context: int = 8,
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.max_entries_per_context = max_entries_per_context
+        # context_key -> list[(unit_query_vector, answer, created_at)]
+        self._entries = OrderedDict()
+        self._num_entries = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_context_key(context_ids: list) -> str:
+        joined = "|".join(str(context_id) for context_id in context_ids)
+        return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _unit_vector(vector) -> np.ndarray | None:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        if norm == 0.0:
+            return None
+        return array / norm
+
+    def lookup(self, query_vector, context_ids: list) -> str | None:
+        unit_query = self._unit_vector(query_vector)
+        if unit_query is None:
+            return None
+        context_key = self.make_context_key(context_ids)
+        now = time.monotonic()
+        with self._lock:
+            candidates = self._entries.get(context_key)
+            if candidates and self.ttl_seconds > 0:
+                alive = [c for c in candidates if c[2] + self.ttl_seconds > now]
+                self._num_entries -= len(candidates) - len(alive)
+                candidates = alive
+                if alive:
+                    self._entries[context_key] = alive
+                else:
+                    del self._entries[context_key]
+            if not candidates:
+                self.misses += 1
+                return None
+            cached_vectors = np.stack([c[0] for c in candidates])
+            similarities = cached_vectors @ unit_query
+            best_index = int(np.argmax(similarities))
+            if similarities[best_index] < self.similarity_threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(context_key)
+            self.hits += 1
+            return candidates[best_index][1]
+
+    def store(self, query_vector, context_ids: list, answer: str):
+        unit_query = self._unit_vector(query_vector)
+        if unit_query is None or not answer:
+            return
+        context_key = self.make_context_key(context_ids)
+        with self._lock:
+            candidates = self._entries.setdefault(context_key, [])
+            candidates.append((unit_query, answer, time.monotonic()))
+            self._num_entries += 1
+            if len(candidates) > self.max_entries_per_context:
+                candidates.pop(0)
+                self._num_entries -= 1
+            self._entries.move_to_end(context_key)
+            while self._num_entries > self.max_entries and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._num_entries -= len(evicted)
+
+    def invalidate(self, *_args):
+        """Xóa toàn bộ cache (dùng làm listener của DataVersionTracker)."""
+        with self._lock:
+            self._entries.clear()
+            self._num_entries = 0
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._num_entries,
+                "contexts": len(self._entries),
+                "max_entries": self.max_entries,
+                "similarity_threshold": self.similarity_threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
@@ -5,25 +5,36 @@ import google.generativeai as genai  # Cần cho GenerationConfig
 # import config # Để lấy model name, bank info, prompt guidelines
 
 
-def generate_chatbot_response(
+def _build_fallback_text(bank_homepage_url: str, bank_contact_info: str) -> str:
+    return (
+        f"Rất tiếc, hiện tại tôi chưa thể cung cấp thông tin chính xác và đầy đủ nhất về nội dung này. "
+        f"Để được hỗ trợ cụ thể và cập nhật, bạn vui lòng truy cập trang web chính thức của Kienlongbank tại {bank_homepage_url} "
+        f"hoặc liên hệ trực tiếp với chúng tôi qua {bank_contact_info} nhé!"
+    )
+
+
+def is_fallback_answer(
+    answer: str, bank_homepage_url: str, bank_contact_info: str
+) -> bool:
+    """True nếu answer là câu fallback / câu báo bị chặn (không nên cache)."""
+    return answer == _build_fallback_text(
+        bank_homepage_url, bank_contact_info
+    ) or answer.startswith("Xin lỗi, yêu cầu của bạn không thể được xử lý")
+
+
+def _build_generation_params(
     user_query: str,
     compiled_context: str,
-    gemini_generation_model_name: str,  # Tên model từ config
-    api_manager,  # Instance của GeminiApiKeyManager
-    bank_homepage_url: str,  # từ config
-    bank_contact_info: str,  # từ config
-    generation_prompt_guidelines: str,  # từ config
-) -> str:
+    bank_homepage_url: str,
+    bank_contact_info: str,
+    generation_prompt_guidelines: str,
+) -> dict:
     """
-    Xây dựng prompt và gọi Gemini để sinh câu trả lời.
+    Xây dựng prompt và các tham số cho generate_content (dùng chung cho bản sync và async).
     """
     print("  Đang tạo prompt cho Gemini generation...")
 
-    fallback_text = (
-        f"Rất tiếc, hiện tại tôi chưa thể cung cấp thông tin chính xác và đầy đủ nhất về nội dung này. "
-        f"Để được hỗ trợ cụ thể và cập nhật, bạn vui lòng truy cập trang web chính thức của Kienlongbank tại {bank_homepage_url} "
-        f"hoặc liên hệ trực tiếp với chúng tôi qua {bank_contact_info} nhé!"
-    )
+    fallback_text = _build_fallback_text(bank_homepage_url, bank_contact_info)
 
     # Sử dụng f-string để chèn fallback_text vào guidelines nếu nó là một placeholder
     # Hoặc bạn có thể truyền fallback_text như một biến riêng vào prompt chính
@@ -55,7 +66,6 @@ NGUYÊN TẮC VÀ HƯỚNG DẪN TRẢ LỜI BẮT BUỘC CHO BẠN:
 
 TRẢ LỜI:
 """
-    print("  Đang sinh câu trả lời từ Gemini...")
     generation_params = {
         "contents": generation_prompt,
         "generation_config": genai.types.GenerationConfig(
@@ -71,14 +81,14 @@ TRẢ LỜI:
             ]
         ],
     }
+    return generation_params
 
-    # Gọi qua ApiKeyManager, truyền tên model và các params
-    llm_response = api_manager.execute_generative_call(  # Giả sử phương thức này trong ApiKeyManager
-        model_name_to_use=gemini_generation_model_name,
-        api_params_for_method=generation_params,
-        call_type="Generating Answer",
-    )
 
+def _parse_llm_response(
+    llm_response, bank_homepage_url: str, bank_contact_info: str
+) -> str:
+    """Chuyển response của Gemini thành câu trả lời (hoặc câu fallback)."""
+    fallback_text = _build_fallback_text(bank_homepage_url, bank_contact_info)
     if llm_response and llm_response.parts:
         return llm_response.text
     elif (
@@ -94,3 +104,64 @@ TRẢ LỜI:
     else:
         # Trả về fallback nếu có lỗi nghiêm trọng hoặc không có response parts
         return fallback_text  # Hoặc một thông báo lỗi chung hơn
+
+
+def generate_chatbot_response(
+    user_query: str,
+    compiled_context: str,
+    gemini_generation_model_name: str,  # Tên model từ config
+    api_manager,  # Instance của GeminiApiKeyManager
+    bank_homepage_url: str,  # từ config
+    bank_contact_info: str,  # từ config
+    generation_prompt_guidelines: str,  # từ config
+    deadline: float | None = None,  # time.monotonic(); quá hạn thì trả về câu fallback
+) -> str:
+    """
+    Xây dựng prompt và gọi Gemini để sinh câu trả lời.
+    """
+    generation_params = _build_generation_params(
+        user_query,
+        compiled_context,
+        bank_homepage_url,
+        bank_contact_info,
+        generation_prompt_guidelines,
+    )
+    print("  Đang sinh câu trả lời từ Gemini...")
+    # Gọi qua ApiKeyManager, truyền tên model và các params
+    llm_response = api_manager.execute_generative_call(
+        model_name_to_use=gemini_generation_model_name,
+        api_params_for_method=generation_params,
+        call_type="Generating Answer",
+        deadline=deadline,
+    )
+    return _parse_llm_response(llm_response, bank_homepage_url, bank_contact_info)
+
+
+async def generate_chatbot_response_async(
+    user_query: str,
+    compiled_context: str,
+    gemini_generation_model_name: str,
+    api_manager,  # Instance của GeminiApiKeyManager
+    bank_homepage_url: str,
+    bank_contact_info: str,
+    generation_prompt_guidelines: str,
+    deadline: float | None = None,
+) -> str:
+    """
+    Phiên bản async của generate_chatbot_response, dùng cho API (không chặn event loop).
+    """
+    generation_params = _build_generation_params(
+        user_query,
+        compiled_context,
+        bank_homepage_url,
+        bank_contact_info,
+        generation_prompt_guidelines,
+    )
+    print("  Đang sinh câu trả lời từ Gemini (async)...")
+    llm_response = await api_manager.execute_generative_call_async(
+        model_name_to_use=gemini_generation_model_name,
+        api_params_for_method=generation_params,
+        call_type="Generating Answer",
+        deadline=deadline,
+    )
+    return _parse_llm_response(llm_response, bank_homepage_url, bank_contact_info)
@@ -0,0 +1,150 @@
+# src/reranking/batch_scheduler.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Sequence
+
+from src.utils.histogram import Histogram
+
+_BATCH_PAIRS_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+_LATENCY_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000]
+
+_STOP = object()
+
+
+class _PendingRequest:
+    __slots__ = ("pairs", "future", "enqueued_at")
+
+    def __init__(self, pairs: Sequence, future: Future):
+        self.pairs = pairs
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class RerankBatchScheduler:
+    """
+    Gom các cặp (query, document) từ nhiều request đồng thời thành một batch và chấm điểm
+    bằng một lần gọi score_fn (ví dụ CrossEncoder.predict), sau đó trả điểm về cho từng request.
+
+    Một thread nền chờ request đầu tiên, rồi tiếp tục gom thêm cho tới khi đủ
+    max_batch_pairs cặp hoặc hết max_wait_ms mili-giây (cửa sổ batch động: khi tải thấp
+    batch được gửi đi ngay khi hết cửa sổ ngắn, khi tải cao batch đầy sớm hơn).
+    Một request không bao giờ bị tách giữa hai batch; request lớn hơn max_batch_pairs
+    được chấm điểm riêng trong một batch.
+    """
+
+    def __init__(
+        self,
+        score_fn: Callable[[List], Sequence[float]],
+        max_batch_pairs: int = 64,
+        max_wait_ms: float = 5,
+        name: str = "rerank-batcher",
+    ):
+        self.score_fn = score_fn
+        self.max_batch_pairs = max(1, int(max_batch_pairs))
+        self.max_wait_seconds = max(0.0, max_wait_ms / 1000.0)
+        self._queue = queue.Queue()
+        self.batch_pairs_histogram = Histogram(_BATCH_PAIRS_BUCKETS)
+        self.batch_requests_histogram = Histogram(_BATCH_PAIRS_BUCKETS)
+        self.queue_wait_ms_histogram = Histogram(_LATENCY_MS_BUCKETS)
+        self.predict_ms_histogram = Histogram(_LATENCY_MS_BUCKETS)
+        self.failed_batches = 0
+        self._carry_over = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, pairs: Sequence) -> Future:
+        """Đưa các cặp của một request vào hàng đợi; Future trả về list điểm cùng thứ tự."""
+        future = Future()
+        if not pairs:
+            future.set_result([])
+            return future
+        self._queue.put(_PendingRequest(pairs, future))
+        return future
+
+    def _collect_batch(self, first_request: _PendingRequest):
+        batch = [first_request]
+        num_pairs = len(first_request.pairs)
+        batch_deadline = time.monotonic() + self.max_wait_seconds
+        while num_pairs < self.max_batch_pairs:
+            remaining = batch_deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    next_request = self._queue.get_nowait()
+                else:
+                    next_request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if next_request is _STOP:
+                # Xử lý nốt batch hiện tại rồi mới dừng
+                self._queue.put(_STOP)
+                break
+            if num_pairs + len(next_request.pairs) > self.max_batch_pairs:
+                # Không cắt nhỏ request: để dành nó làm request đầu của batch sau
+                self._carry_over = next_request
+                break
+            batch.append(next_request)
+            num_pairs += len(next_request.pairs)
+        return batch, num_pairs
+
+    def _score_batch(self, batch: List[_PendingRequest], num_pairs: int):
+        # Bỏ các request đã bị hủy (client ngắt kết nối); các Future còn lại chuyển sang "running"
+        batch = [p for p in batch if p.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        num_pairs = sum(len(pending.pairs) for pending in batch)
+        dispatched_at = time.monotonic()
+        all_pairs = []
+        for pending in batch:
+            self.queue_wait_ms_histogram.observe(
+                (dispatched_at - pending.enqueued_at) * 1000
+            )
+            all_pairs.extend(pending.pairs)
+
+        try:
+            scores = self.score_fn(all_pairs)
+        except Exception as e_predict:
+            self.failed_batches += 1
+            for pending in batch:
+                pending.future.set_exception(e_predict)
+            return
+        finally:
+            self.predict_ms_histogram.observe((time.monotonic() - dispatched_at) * 1000)
+            self.batch_pairs_histogram.observe(num_pairs)
+            self.batch_requests_histogram.observe(len(batch))
+
+        offset = 0
+        for pending in batch:
+            request_scores = [
+                float(score) for score in scores[offset : offset + len(pending.pairs)]
+            ]
+            offset += len(pending.pairs)
+            pending.future.set_result(request_scores)
+
+    def _run(self):
+        while True:
+            if self._carry_over is not None:
+                first_request, self._carry_over = self._carry_over, None
+            else:
+                first_request = self._queue.get()
+            if first_request is _STOP:
+                break
+            batch, num_pairs = self._collect_batch(first_request)
+            self._score_batch(batch, num_pairs)
+
+    def stop(self, timeout: float = 5):
+        self._queue.put(_STOP)
+        self._thread.join(timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_pairs": self.max_batch_pairs,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+            "queued_requests": self._queue.qsize(),
+            "failed_batches": self.failed_batches,
+            "batch_pairs": self.batch_pairs_histogram.snapshot(),
+            "batch_requests": self.batch_requests_histogram.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms_histogram.snapshot(),
+            "predict_ms": self.predict_ms_histogram.snapshot(),
+        }
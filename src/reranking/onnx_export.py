@@ -0,0 +1,223 @@
+# src/reranking/onnx_export.py
+"""
+Xuất (export) cross-encoder sang ONNX (FP32 hoặc INT8 dynamic quantization), lưu cache trên đĩa
+và kiểm tra độ lệch điểm so với model PyTorch gốc.
+
+Dùng backend ONNX có sẵn của sentence-transformers (cần `optimum[onnxruntime]`).
+Chạy thủ công:
+    python -m src.reranking.onnx_export --backend onnx-int8
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+RERANKER_BACKENDS = ("torch", "onnx", "onnx-int8")
+PARITY_FILE_NAME = "parity.json"
+# Sai số tuyệt đối tối đa (trên logit) chấp nhận được so với PyTorch cho từng backend
+PARITY_TOLERANCES = {"onnx": 1e-3, "onnx-int8": 0.5}
+
+# Các cặp mẫu (câu hỏi, đoạn văn) dùng để so sánh điểm khi không truyền pairs riêng
+DEFAULT_PARITY_QUERIES = [
+    "Lãi suất tiết kiệm kỳ hạn 12 tháng là bao nhiêu?",
+    "Làm thế nào để mở thẻ tín dụng?",
+    "Phí chuyển tiền liên ngân hàng",
+]
+DEFAULT_PARITY_PASSAGES = [
+    "Lãi suất tiền gửi tiết kiệm kỳ hạn 12 tháng áp dụng cho khách hàng cá nhân là 5,5%/năm.",
+    "Khách hàng có thể đăng ký mở thẻ tín dụng tại quầy giao dịch hoặc trên ứng dụng ngân hàng số.",
+    "Phí chuyển tiền liên ngân hàng qua kênh điện tử được miễn phí cho giao dịch dưới 500.000 đồng.",
+    "Giờ làm việc của chi nhánh từ thứ Hai đến thứ Sáu, 7h30 - 17h00.",
+    "Savings account interest is paid monthly or at maturity depending on the product.",
+]
+
+
+def get_onnx_model_dir(model_name: str, cache_root: str) -> str:
+    """Thư mục cache ONNX cho một model, ví dụ <cache_root>/cross-encoder__ms-marco-MiniLM-L-6-v2."""
+    return os.path.join(cache_root, model_name.replace("/", "__"))
+
+
+def get_onnx_file_name(backend: str, quantization_config: str = "avx2") -> str:
+    if backend == "onnx":
+        return "onnx/model.onnx"
+    if backend == "onnx-int8":
+        return f"onnx/model_qint8_{quantization_config}.onnx"
+    raise ValueError(f"Backend reranker không hợp lệ cho ONNX: '{backend}'")
+
+
+def build_default_parity_pairs() -> List[List[str]]:
+    return [
+        [query, passage]
+        for query in DEFAULT_PARITY_QUERIES
+        for passage in DEFAULT_PARITY_PASSAGES
+    ]
+
+
+def ensure_onnx_export(
+    model_name: str,
+    cache_root: str,
+    backend: str,
+    quantization_config: str = "avx2",
+) -> Tuple[str, str]:
+    """
+    Đảm bảo model ONNX cho backend đã có trong cache (export nếu chưa có).
+    Trả về (model_dir, file_name) để truyền cho CrossEncoder(model_dir, backend="onnx",
+    model_kwargs={"file_name": file_name}).
+    """
+    from sentence_transformers.cross_encoder import CrossEncoder
+
+    model_dir = get_onnx_model_dir(model_name, cache_root)
+    file_name = get_onnx_file_name(backend, quantization_config)
+    fp32_path = os.path.join(model_dir, get_onnx_file_name("onnx"))
+
+    if not os.path.exists(fp32_path):
+        print(
+            f"Thông tin (ONNX Export): Đang export '{model_name}' sang ONNX vào '{model_dir}'..."
+        )
+        start_time = time.time()
+        onnx_model = CrossEncoder(model_name, device="cpu", backend="onnx")
+        onnx_model.save_pretrained(model_dir)
+        print(
+            f"Thông tin (ONNX Export): Export ONNX FP32 xong sau {time.time() - start_time:.2f} giây."
+        )
+
+    if backend == "onnx-int8" and not os.path.exists(os.path.join(model_dir, file_name)):
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        print(
+            f"Thông tin (ONNX Export): Đang lượng tử hóa INT8 (dynamic, cấu hình '{quantization_config}')..."
+        )
+        onnx_model = CrossEncoder(
+            model_dir,
+            device="cpu",
+            backend="onnx",
+            model_kwargs={"file_name": get_onnx_file_name("onnx")},
+        )
+        export_dynamic_quantized_onnx_model(
+            onnx_model, quantization_config, model_dir
+        )
+    return model_dir, file_name
+
+
+def check_backend_parity(
+    reference_model,
+    candidate_model,
+    pairs: List[List[str]],
+    tolerance: float,
+    group_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    So sánh điểm của candidate_model với reference_model (PyTorch) trên cùng các cặp.
+    Ngoài sai số tuyệt đối, kiểm tra thứ tự xếp hạng trong từng nhóm group_size cặp
+    (mỗi nhóm = một câu hỏi với các đoạn văn ứng viên), vì rerank chỉ phụ thuộc thứ tự.
+    """
+    reference_scores = np.asarray(
+        reference_model.predict(pairs, show_progress_bar=False), dtype=np.float32
+    )
+    candidate_scores = np.asarray(
+        candidate_model.predict(pairs, show_progress_bar=False), dtype=np.float32
+    )
+    max_abs_diff = float(np.max(np.abs(reference_scores - candidate_scores)))
+
+    group_size = group_size or len(pairs)
+    ranking_matches = 0
+    num_groups = 0
+    for start in range(0, len(pairs), group_size):
+        num_groups += 1
+        reference_order = np.argsort(-reference_scores[start : start + group_size])
+        candidate_order = np.argsort(-candidate_scores[start : start + group_size])
+        if np.array_equal(reference_order, candidate_order):
+            ranking_matches += 1
+
+    return {
+        "num_pairs": len(pairs),
+        "max_abs_diff": round(max_abs_diff, 6),
+        "tolerance": tolerance,
+        "ranking_agreement": round(ranking_matches / num_groups, 4) if num_groups else 1.0,
+        "passed": max_abs_diff <= tolerance and ranking_matches == num_groups,
+    }
+
+
+def run_parity_check(
+    model_name: str,
+    model_dir: str,
+    file_name: str,
+    backend: str,
+    pairs: Optional[List[List[str]]] = None,
+) -> Dict[str, Any]:
+    """Chạy kiểm tra parity giữa model ONNX đã export và model PyTorch gốc, lưu kết quả vào parity.json."""
+    from sentence_transformers.cross_encoder import CrossEncoder
+
+    group_size = None
+    if pairs is None:
+        pairs = build_default_parity_pairs()
+        group_size = len(DEFAULT_PARITY_PASSAGES)
+    reference_model = CrossEncoder(model_name, device="cpu")
+    candidate_model = CrossEncoder(
+        model_dir, device="cpu", backend="onnx", model_kwargs={"file_name": file_name}
+    )
+    result = check_backend_parity(
+        reference_model,
+        candidate_model,
+        pairs,
+        tolerance=PARITY_TOLERANCES[backend],
+        group_size=group_size,
+    )
+    result["backend"] = backend
+    result["file_name"] = file_name
+    _save_parity_results(model_dir, file_name, result)
+    status = "ĐẠT" if result["passed"] else "KHÔNG ĐẠT"
+    print(
+        f"Thông tin (ONNX Parity): {backend} {status} - lệch tối đa {result['max_abs_diff']} (ngưỡng {result['tolerance']}), khớp thứ hạng {result['ranking_agreement']:.0%}."
+    )
+    return result
+
+
+def _save_parity_results(model_dir: str, file_name: str, result: Dict[str, Any]):
+    parity_path = os.path.join(model_dir, PARITY_FILE_NAME)
+    all_results = {}
+    if os.path.exists(parity_path):
+        with open(parity_path, "r", encoding="utf-8") as f:
+            all_results = json.load(f)
+    all_results[file_name] = result
+    with open(parity_path, "w", encoding="utf-8") as f:
+        json.dump(all_results, f, ensure_ascii=False, indent=2)
+
+
+def load_parity_result(model_dir: str, file_name: str) -> Optional[Dict[str, Any]]:
+    parity_path = os.path.join(model_dir, PARITY_FILE_NAME)
+    if not os.path.exists(parity_path):
+        return None
+    try:
+        with open(parity_path, "r", encoding="utf-8") as f:
+            return json.load(f).get(file_name)
+    except (OSError, ValueError) as e_read:
+        print(f"CẢNH BÁO (ONNX Parity): Không đọc được '{parity_path}': {e_read}")
+        return None
+
+
+if __name__ == "__main__":
+    import config
+
+    parser = argparse.ArgumentParser(
+        description="Export cross-encoder reranker sang ONNX và kiểm tra parity với PyTorch."
+    )
+    parser.add_argument("--model", default=config.RERANKER_MODEL_NAME)
+    parser.add_argument(
+        "--backend", choices=["onnx", "onnx-int8"], default="onnx-int8"
+    )
+    parser.add_argument("--cache-dir", default=config.RERANKER_ONNX_CACHE_DIR)
+    parser.add_argument(
+        "--quantization-config",
+        default=config.RERANKER_ONNX_QUANTIZATION_CONFIG,
+        help="Cấu hình lượng tử hóa của optimum: arm64, avx2, avx512, avx512_vnni.",
+    )
+    args = parser.parse_args()
+
+    exported_dir, exported_file = ensure_onnx_export(
+        args.model, args.cache_dir, args.backend, args.quantization_config
+    )
+    run_parity_check(args.model, exported_dir, exported_file, args.backend)
@@ -1,11 +1,31 @@
 # src/reranking/reranker_service.py
 from sentence_transformers.cross_encoder import CrossEncoder
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
+
+from src.reranking.batch_scheduler import RerankBatchScheduler
+from src.reranking.score_cache import RerankScoreCache
+from src.reranking.onnx_export import (
+    RERANKER_BACKENDS,
+    ensure_onnx_export,
+    load_parity_result,
+    run_parity_check,
+)
+import asyncio
 import time  # Để đo thời gian (tùy chọn)
 
 
 class Reranker:
-    def __init__(self, model_name: str, device: str = "cpu"):
+    def __init__(
+        self,
+        model_name: str,
+        device: str = "cpu",
+        max_workers: int = 1,
+        backend: str = "torch",
+        onnx_cache_dir: str = None,
+        onnx_quantization_config: str = "avx2",
+        onnx_parity_check: bool = True,
+    ):
         """
         Khởi tạo Reranker với một model cross-encoder cụ thể.
 
@@ -13,17 +33,36 @@ class Reranker:
             model_name (str): Tên của model cross-encoder từ Hugging Face Hub.
                               Ví dụ: 'cross-encoder/ms-marco-MiniLM-L-6-v2'
             device (str): Thiết bị để chạy model ('cpu', 'cuda' nếu có).
+            max_workers (int): Số thread tối đa của executor dùng cho rerank_async.
+                               Giới hạn này tránh việc nhiều request cùng tranh CPU.
+            backend (str): 'torch' (PyTorch, mặc định), 'onnx' (ONNX Runtime FP32) hoặc
+                           'onnx-int8' (ONNX Runtime, lượng tử hóa INT8 dynamic).
+                           Model ONNX được export một lần và cache trong onnx_cache_dir.
+            onnx_parity_check (bool): Khi export lần đầu, so sánh điểm với PyTorch; nếu không
+                                      đạt ngưỡng thì quay về backend 'torch'.
         """
         self.model_name = model_name
         self.device = device
         self.model = None
+        self.backend = backend
+        self.max_workers = max_workers
+        self._executor = None
+        self._batch_scheduler = None
+        self.score_cache = None
+        self.load_time_seconds = None
         try:
             print(
-                f"Thông tin (Reranker): Đang tải model '{self.model_name}' trên '{self.device}'..."
+                f"Thông tin (Reranker): Đang tải model '{self.model_name}' trên '{self.device}' (backend: {self.backend})..."
             )
             start_time = time.time()
-            self.model = CrossEncoder(self.model_name, device=self.device)
+            if self.backend == "torch":
+                self.model = CrossEncoder(self.model_name, device=self.device)
+            else:
+                self.model = self._load_onnx_model(
+                    onnx_cache_dir, onnx_quantization_config, onnx_parity_check
+                )
             load_time = time.time() - start_time
+            self.load_time_seconds = round(load_time, 3)
             print(
                 f"Thông tin (Reranker): Model '{self.model_name}' đã tải thành công sau {load_time:.2f} giây."
             )
@@ -33,26 +72,51 @@ class Reranker:
             )
             print("Reranking sẽ không hoạt động.")
 
-    def rerank(
+    def _load_onnx_model(
+        self, onnx_cache_dir: str, quantization_config: str, parity_check: bool
+    ):
+        """Tải model ONNX (export + kiểm tra parity lần đầu); quay về PyTorch nếu thất bại."""
+        if self.backend not in RERANKER_BACKENDS:
+            raise ValueError(
+                f"Backend reranker không hợp lệ: '{self.backend}'. Hợp lệ: {RERANKER_BACKENDS}"
+            )
+        try:
+            model_dir, file_name = ensure_onnx_export(
+                self.model_name, onnx_cache_dir, self.backend, quantization_config
+            )
+            if parity_check:
+                parity = load_parity_result(model_dir, file_name)
+                if parity is None:
+                    parity = run_parity_check(
+                        self.model_name, model_dir, file_name, self.backend
+                    )
+                if not parity.get("passed"):
+                    raise ValueError(
+                        f"Điểm ONNX lệch quá ngưỡng so với PyTorch (max_abs_diff={parity.get('max_abs_diff')})"
+                    )
+            return CrossEncoder(
+                model_dir,
+                device="cpu",
+                backend="onnx",
+                model_kwargs={"file_name": file_name},
+            )
+        except Exception as e_onnx:
+            print(
+                f"CẢNH BÁO (Reranker): Không dùng được backend '{self.backend}': {e_onnx}. Quay về backend 'torch'."
+            )
+            self.backend = "torch"
+            return CrossEncoder(self.model_name, device=self.device)
+
+    def _prepare_pairs(
         self,
         query: str,
         documents: List[Dict[str, Any]],
-        text_key: str = "original_text",
+        text_key: str,
         top_n: int = None,
-    ) -> List[Dict[str, Any]]:
+    ):
         """
-        Sắp xếp lại danh sách các document dựa trên độ liên quan của chúng với query.
-
-        Args:
-            query (str): Câu hỏi gốc của người dùng.
-            documents (List[Dict[str, Any]]): Danh sách các dictionary, mỗi dict đại diện
-                                             cho một document/chunk và phải chứa trường `text_key`.
-            text_key (str): Tên trường trong mỗi dict document chứa nội dung văn bản cần rerank.
-            top_n (int, optional): Số lượng document hàng đầu cần trả về sau khi rerank.
-                                   Nếu None, trả về tất cả các document đã rerank.
-
-        Returns:
-            List[Dict[str, Any]]: Danh sách các document đã được sắp xếp lại theo điểm rerank.
+        Tạo các cặp (query, document_text). Trả về tuple (pairs, valid_documents),
+        hoặc trả về luôn danh sách kết quả (list) nếu không cần/không thể rerank.
         """
         if not self.model:
             print(
@@ -88,19 +152,55 @@ class Reranker:
             return (
                 documents[:top_n] if top_n is not None else documents
             )  # Hoặc trả về []
+        return pairs, valid_documents_for_scoring
 
-        print(
-            f"  Thông tin (Reranker): Đang tính điểm rerank cho {len(pairs)} cặp (query, document)..."
-        )
-        try:
-            scores = self.model.predict(
-                pairs, show_progress_bar=False
-            )  # show_progress_bar=True nếu muốn thấy tiến trình
-        except Exception as e_predict:
-            print(f"  LỖI (Reranker): Lỗi khi tính điểm rerank: {e_predict}")
-            # Trong trường hợp lỗi, trả về danh sách gốc (chưa rerank) để không làm gián đoạn pipeline
-            return documents[:top_n] if top_n is not None else documents
+    def _predict_pairs(self, pairs: List[List[str]]) -> List[float]:
+        """Chấm điểm một danh sách cặp (query, document_text) bằng cross-encoder."""
+        return self.model.predict(
+            pairs, show_progress_bar=False
+        )  # show_progress_bar=True nếu muốn thấy tiến trình
+
+    def _lookup_cached_scores(
+        self, query: str, valid_documents: List[Dict[str, Any]], text_key: str
+    ):
+        """
+        Tra điểm đã cache cho từng document. Trả về (scores, miss_indices, document_ids):
+        scores[i] là None với các document chưa có trong cache (cần predict).
+        """
+        if self.score_cache is None:
+            return [None] * len(valid_documents), list(range(len(valid_documents))), None
+        query_hash = self.score_cache.make_query_hash(query)
+        document_ids = []
+        scores = []
+        miss_indices = []
+        for i, doc in enumerate(valid_documents):
+            document_id = self.score_cache.get_document_id(doc, text_key)
+            document_ids.append((query_hash, document_id))
+            cached_score = self.score_cache.get(query_hash, document_id)
+            scores.append(cached_score)
+            if cached_score is None:
+                miss_indices.append(i)
+        return scores, miss_indices, document_ids
+
+    def _fill_missing_scores(self, scores, miss_indices, miss_scores, document_ids):
+        """Ghép điểm vừa predict vào vị trí các cache miss và lưu chúng vào cache."""
+        for index, score in zip(miss_indices, miss_scores):
+            scores[index] = float(score)
+            if self.score_cache is not None:
+                query_hash, document_id = document_ids[index]
+                self.score_cache.set(query_hash, document_id, score)
+        return scores
 
+    def enable_score_cache(self, max_entries: int, ttl_seconds: float = 0):
+        """Bật cache điểm rerank theo (câu hỏi đã chuẩn hóa, ID chunk); chỉ cache miss mới được predict."""
+        if self.score_cache is None:
+            self.score_cache = RerankScoreCache(max_entries, ttl_seconds)
+        return self.score_cache
+
+    @staticmethod
+    def _apply_scores(
+        valid_documents_for_scoring: List[Dict[str, Any]], scores, top_n: int = None
+    ) -> List[Dict[str, Any]]:
         # Kết hợp scores với các document hợp lệ ban đầu
         # Chỉ những document có trong valid_documents_for_scoring mới có score
         scored_documents = []
@@ -123,3 +223,210 @@ class Reranker:
         if top_n is not None:
             return reranked_documents[:top_n]
         return reranked_documents
+
+    def enable_batching(self, max_batch_pairs: int = 64, max_wait_ms: float = 5):
+        """
+        Bật micro-batching cho rerank_async: các cặp từ nhiều request đồng thời được gom
+        lại và chấm điểm trong một lần predict (xem RerankBatchScheduler).
+        """
+        if not self.model or self._batch_scheduler is not None:
+            return
+        self._batch_scheduler = RerankBatchScheduler(
+            self._predict_pairs,
+            max_batch_pairs=max_batch_pairs,
+            max_wait_ms=max_wait_ms,
+        )
+        print(
+            f"Thông tin (Reranker): Bật micro-batching (tối đa {max_batch_pairs} cặp/batch, chờ tối đa {max_wait_ms} ms)."
+        )
+
+    def stats(self) -> dict:
+        return {
+            "model_name": self.model_name,
+            "backend": self.backend,
+            "load_time_seconds": self.load_time_seconds,
+            "batching": (
+                self._batch_scheduler.stats() if self._batch_scheduler else None
+            ),
+            "score_cache": self.score_cache.stats() if self.score_cache else None,
+        }
+
+    def rerank(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        text_key: str = "original_text",
+        top_n: int = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Sắp xếp lại danh sách các document dựa trên độ liên quan của chúng với query.
+
+        Args:
+            query (str): Câu hỏi gốc của người dùng.
+            documents (List[Dict[str, Any]]): Danh sách các dictionary, mỗi dict đại diện
+                                             cho một document/chunk và phải chứa trường `text_key`.
+            text_key (str): Tên trường trong mỗi dict document chứa nội dung văn bản cần rerank.
+            top_n (int, optional): Số lượng document hàng đầu cần trả về sau khi rerank.
+                                   Nếu None, trả về tất cả các document đã rerank.
+
+        Returns:
+            List[Dict[str, Any]]: Danh sách các document đã được sắp xếp lại theo điểm rerank.
+        """
+        prepared = self._prepare_pairs(query, documents, text_key, top_n)
+        if not isinstance(prepared, tuple):
+            return prepared
+        pairs, valid_documents_for_scoring = prepared
+        scores, miss_indices, document_ids = self._lookup_cached_scores(
+            query, valid_documents_for_scoring, text_key
+        )
+
+        if miss_indices:
+            print(
+                f"  Thông tin (Reranker): Đang tính điểm rerank cho {len(miss_indices)}/{len(pairs)} cặp (query, document) chưa có trong cache..."
+            )
+            try:
+                miss_scores = self._predict_pairs([pairs[i] for i in miss_indices])
+            except Exception as e_predict:
+                print(f"  LỖI (Reranker): Lỗi khi tính điểm rerank: {e_predict}")
+                # Trong trường hợp lỗi, trả về danh sách gốc (chưa rerank) để không làm gián đoạn pipeline
+                return documents[:top_n] if top_n is not None else documents
+            scores = self._fill_missing_scores(
+                scores, miss_indices, miss_scores, document_ids
+            )
+
+        return self._apply_scores(valid_documents_for_scoring, scores, top_n)
+
+    def rerank_many(
+        self,
+        queries: List[str],
+        documents_per_query: List[List[Dict[str, Any]]],
+        text_key: str = "original_text",
+        top_n: int = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Rerank nhiều câu hỏi cùng lúc: cặp (query, document) chưa có trong cache của mọi câu hỏi
+        được chấm điểm trong MỘT lần predict, sau đó tách lại theo từng câu hỏi.
+        """
+        prepared_per_query = []
+        all_miss_pairs = []
+        for query, documents in zip(queries, documents_per_query):
+            prepared = self._prepare_pairs(query, documents, text_key, top_n)
+            if not isinstance(prepared, tuple):
+                prepared_per_query.append(prepared)  # Kết quả fallback (không cần predict)
+                continue
+            pairs, valid_documents_for_scoring = prepared
+            scores, miss_indices, document_ids = self._lookup_cached_scores(
+                query, valid_documents_for_scoring, text_key
+            )
+            miss_offset = len(all_miss_pairs)
+            all_miss_pairs.extend(pairs[i] for i in miss_indices)
+            prepared_per_query.append(
+                (valid_documents_for_scoring, scores, miss_indices, document_ids, miss_offset)
+            )
+
+        all_miss_scores = []
+        if all_miss_pairs:
+            print(
+                f"  Thông tin (Reranker): Đang tính điểm rerank cho {len(all_miss_pairs)} cặp của {len(queries)} câu hỏi trong một lần predict..."
+            )
+            try:
+                all_miss_scores = self._predict_pairs(all_miss_pairs)
+            except Exception as e_predict:
+                print(f"  LỖI (Reranker): Lỗi khi tính điểm rerank (nhiều câu hỏi): {e_predict}")
+                return [
+                    documents[:top_n] if top_n is not None else documents
+                    for documents in documents_per_query
+                ]
+
+        results = []
+        for prepared in prepared_per_query:
+            if not isinstance(prepared, tuple):
+                results.append(prepared)
+                continue
+            valid_documents_for_scoring, scores, miss_indices, document_ids, miss_offset = (
+                prepared
+            )
+            if miss_indices:
+                scores = self._fill_missing_scores(
+                    scores,
+                    miss_indices,
+                    all_miss_scores[miss_offset : miss_offset + len(miss_indices)],
+                    document_ids,
+                )
+            results.append(self._apply_scores(valid_documents_for_scoring, scores, top_n))
+        return results
+
+    async def rerank_many_async(
+        self,
+        queries: List[str],
+        documents_per_query: List[List[Dict[str, Any]]],
+        text_key: str = "original_text",
+        top_n: int = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Chạy rerank_many (một lần predict cho cả batch câu hỏi) trên executor của Reranker."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="reranker"
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            self.rerank_many,
+            queries,
+            documents_per_query,
+            text_key,
+            top_n,
+        )
+
+    async def rerank_async(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        text_key: str = "original_text",
+        top_n: int = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Chạy rerank (CPU-bound) trên executor có giới hạn số thread,
+        để event loop của API vẫn xử lý được các request khác.
+        Nếu đã bật micro-batching, các cặp được gửi qua RerankBatchScheduler.
+        """
+        if self._batch_scheduler is not None:
+            prepared = self._prepare_pairs(query, documents, text_key, top_n)
+            if not isinstance(prepared, tuple):
+                return prepared
+            pairs, valid_documents_for_scoring = prepared
+            scores, miss_indices, document_ids = self._lookup_cached_scores(
+                query, valid_documents_for_scoring, text_key
+            )
+            if miss_indices:
+                try:
+                    miss_scores = await asyncio.wrap_future(
+                        self._batch_scheduler.submit([pairs[i] for i in miss_indices])
+                    )
+                except Exception as e_predict:
+                    print(
+                        f"  LỖI (Reranker): Lỗi khi tính điểm rerank (batch): {e_predict}"
+                    )
+                    return documents[:top_n] if top_n is not None else documents
+                scores = self._fill_missing_scores(
+                    scores, miss_indices, miss_scores, document_ids
+                )
+            return self._apply_scores(valid_documents_for_scoring, scores, top_n)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="reranker"
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self.rerank, query, documents, text_key, top_n
+        )
+
+    def shutdown(self):
+        """Giải phóng executor (và thread micro-batching) khi server tắt."""
+        if self._batch_scheduler is not None:
+            self._batch_scheduler.stop()
+            self._batch_scheduler = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,44 @@
+# src/reranking/score_cache.py
+import hashlib
+
+from src.utils.cache_utils import LruTtlCache, normalize_query_text
+
+
+class RerankScoreCache:
+    """
+    Cache điểm rerank (_rerank_score) theo khóa (hash câu hỏi đã chuẩn hóa, ID chunk).
+    ID chunk ưu tiên qdrant_id, sau đó graph_node_id; nếu không có thì dùng hash nội dung.
+    Toàn bộ cache bị xóa khi collection được reindex (listener của DataVersionTracker).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float = 0):
+        self._cache = LruTtlCache(max_entries, ttl_seconds)
+        self.invalidations = 0
+
+    @staticmethod
+    def make_query_hash(query: str) -> str:
+        return hashlib.sha1(normalize_query_text(query).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_document_id(document: dict, text_key: str) -> str:
+        document_id = document.get("qdrant_id") or document.get("graph_node_id")
+        if document_id:
+            return str(document_id)
+        text = document.get(text_key) or ""
+        return "text:" + hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get(self, query_hash: str, document_id: str) -> float | None:
+        return self._cache.get((query_hash, document_id))
+
+    def set(self, query_hash: str, document_id: str, score: float):
+        self._cache.set((query_hash, document_id), float(score))
+
+    def invalidate(self, *_args):
+        """Xóa toàn bộ điểm đã cache (dùng làm listener của DataVersionTracker)."""
+        self._cache.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        stats["invalidations"] = self.invalidations
+        return stats
@@ -0,0 +1,107 @@
+# src/retrieval/chunk_store.py
+"""
+Kho văn bản chunk cục bộ dùng khi payload Qdrant được rút gọn (chỉ graph_node_id/node_type).
+
+Văn bản của mỗi điểm được tính lại từ KG đang phục vụ (nx.DiGraph, CompactKnowledgeGraph
+hoặc KGSnapshot mmap — đều tra cứu theo node ID có index), theo đúng quy tắc mà pipeline
+embedding dùng khi tạo vector (build_node_text_for_embedding). Nhờ vậy Qdrant không cần lưu
+và trả về original_text/summary/keywords, và ứng viên bị reranker loại bỏ không tốn băng thông.
+"""
+from typing import Optional, Tuple
+
+from src.utils.cache_utils import LruTtlCache
+
+# Các trường payload tối thiểu cần lấy từ Qdrant khi dùng ChunkTextStore
+SLIM_PAYLOAD_FIELDS = ["graph_node_id", "node_type"]
+
+EMBEDDABLE_NODE_TYPES = ("Document", "Chunk")
+
+
+def get_document_name_of_chunk(source_document_id: str) -> str:
+    if source_document_id and source_document_id.startswith("doc:"):
+        return source_document_id.replace("doc:", "")
+    return "Tài liệu không xác định"
+
+
+def build_node_text_for_embedding(node_data) -> Tuple[Optional[str], str]:
+    """
+    Trả về (văn bản dùng để embedding, tên tài liệu) của một node KG.
+    Văn bản là None nếu loại node không được embedding.
+    """
+    node_type = node_data.get("type")
+    if node_type == "Document":
+        doc_name = node_data.get("name", "Không có tên tài liệu")
+        summary = node_data.get("summary", "")
+        # keywords đã là chuỗi string dạng "kw1, kw2, kw3" khi lưu vào graphml
+        keywords_str = node_data.get("keywords", "")
+        text_to_embed = (
+            f"Tài liệu: {doc_name}.\nTừ khóa: {keywords_str}.\nTóm tắt: {summary}"
+        )
+        if not summary and not keywords_str:
+            text_to_embed = f"Tài liệu: {doc_name}"
+        return text_to_embed, doc_name
+    if node_type == "Chunk":
+        text_to_embed = node_data.get("text_content", "")
+        return text_to_embed, get_document_name_of_chunk(
+            node_data.get("source_document_id", "")
+        )
+    return None, ""
+
+
+class ChunkTextStore:
+    """
+    Tra cứu văn bản + metadata hiển thị của một điểm Qdrant theo graph_node_id.
+    Kết quả của các node hay gặp được giữ trong LRU nhỏ (tránh giải mã lại từ snapshot).
+    """
+
+    def __init__(self, knowledge_graph, cache_max_entries: int = 4096):
+        self._knowledge_graph = knowledge_graph
+        self._cache = LruTtlCache(cache_max_entries)
+        self.num_entries = 0
+        self.misses = 0
+
+    @classmethod
+    def from_knowledge_graph(
+        cls, knowledge_graph, cache_max_entries: int = 4096
+    ) -> "ChunkTextStore":
+        store = cls(knowledge_graph, cache_max_entries=cache_max_entries)
+        store.num_entries = sum(
+            1
+            for _node_id, data in knowledge_graph.nodes(data=True)
+            if data.get("type") in EMBEDDABLE_NODE_TYPES
+        )
+        return store
+
+    def get(self, graph_node_id: Optional[str]) -> Optional[dict]:
+        """
+        Trả về {"original_text", "document_name", "node_type", "order_in_doc"} hoặc None
+        nếu node không có trong KG (KG và collection Qdrant không đồng bộ).
+        """
+        if not graph_node_id:
+            return None
+        entry = self._cache.get(graph_node_id)
+        if entry is not None:
+            return entry
+        if not self._knowledge_graph.has_node(graph_node_id):
+            self.misses += 1
+            return None
+        node_data = self._knowledge_graph.nodes[graph_node_id]
+        text_to_embed, document_name = build_node_text_for_embedding(node_data)
+        if not text_to_embed or not text_to_embed.strip():
+            self.misses += 1
+            return None
+        entry = {
+            "original_text": text_to_embed.strip(),
+            "document_name": document_name,
+            "node_type": node_data.get("type", "Unknown"),
+            "order_in_doc": node_data.get("order_in_doc", -1),
+        }
+        self._cache.set(graph_node_id, entry)
+        return entry
+
+    def stats(self) -> dict:
+        return {
+            "entries": self.num_entries,
+            "misses": self.misses,
+            "cache": self._cache.stats(),
+        }
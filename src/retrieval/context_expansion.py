@@ -0,0 +1,201 @@
+# src/retrieval/context_expansion.py
+"""
+Mở rộng ngữ cảnh theo chunk lân cận (quan hệ NEXT_CHUNK): mỗi chunk được chọn kèm theo
+±window chunk liền kề trong cùng tài liệu, các cửa sổ chồng lấn / liền nhau được gộp thành
+một đoạn liên tục, và tổng số ký tự thêm vào bị giới hạn bởi char_budget.
+
+Thứ tự chunk trong tài liệu:
+- CompactKnowledgeGraph / KGSnapshot: dùng trực tiếp chunks_of_document (mảng kề HAS_CHUNK đã
+  sắp theo order_in_doc, dựng sẵn khi nạp KG / ghi snapshot); không dựng thêm chỉ mục nào
+  trong bộ nhớ, chỉ tra cứu các tài liệu có chunk được chọn.
+- nx.DiGraph (dự phòng): chỉ mục tài liệu -> chunk theo order_in_doc, dựng một lần lúc startup.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ChunkNeighborIndex:
+    """Tra cứu chunk -> (tài liệu, vị trí) và tài liệu -> các chunk theo thứ tự."""
+
+    def __init__(self, knowledge_graph, window: int = 1, char_budget: int = 6000):
+        self._knowledge_graph = knowledge_graph
+        self.window = max(0, int(window))
+        self.char_budget = max(0, int(char_budget))
+        # KG có sẵn chỉ mục HAS_CHUNK / NEXT_CHUNK (CompactKnowledgeGraph, KGSnapshot)
+        self._uses_graph_chunk_index = hasattr(knowledge_graph, "chunks_of_document")
+        # Chỉ dùng với nx.DiGraph (dựng trong from_knowledge_graph)
+        self._doc_chunk_ids: Dict[str, List[str]] = {}
+        self._chunk_position: Dict[str, Tuple[str, int]] = {}
+        self.expansions = 0
+        self.neighbors_added = 0
+
+    @classmethod
+    def from_knowledge_graph(
+        cls, knowledge_graph, window: int = 1, char_budget: int = 6000
+    ) -> "ChunkNeighborIndex":
+        index = cls(knowledge_graph, window=window, char_budget=char_budget)
+        if index._uses_graph_chunk_index:
+            return index
+        chunks_by_doc: Dict[str, List[Tuple[int, str]]] = {}
+        for node_id, data in knowledge_graph.nodes(data=True):
+            if data.get("type") != "Chunk":
+                continue
+            source_document_id = data.get("source_document_id")
+            if not source_document_id:
+                continue
+            try:
+                order_in_doc = int(data.get("order_in_doc", 0))
+            except (TypeError, ValueError):
+                order_in_doc = 0
+            chunks_by_doc.setdefault(source_document_id, []).append(
+                (order_in_doc, str(node_id))
+            )
+        for source_document_id, ordered_chunks in chunks_by_doc.items():
+            ordered_chunks.sort()
+            chunk_ids = [chunk_id for _order, chunk_id in ordered_chunks]
+            index._doc_chunk_ids[source_document_id] = chunk_ids
+            for position, chunk_id in enumerate(chunk_ids):
+                index._chunk_position[chunk_id] = (source_document_id, position)
+        return index
+
+    def number_of_chunks(self) -> Optional[int]:
+        """Số chunk trong chỉ mục riêng; None khi tra cứu trực tiếp trên chỉ mục của KG."""
+        if self._uses_graph_chunk_index:
+            return None
+        return len(self._chunk_position)
+
+    def _chunk_ids_of_document(
+        self, doc_id: str, doc_chunk_ids: Dict[str, List[str]]
+    ) -> List[str]:
+        """Các chunk của tài liệu theo thứ tự (doc_chunk_ids: cache trong một lần expand)."""
+        chunk_ids = doc_chunk_ids.get(doc_id)
+        if chunk_ids is None:
+            if self._uses_graph_chunk_index:
+                chunk_ids = self._knowledge_graph.chunks_of_document(doc_id)
+            else:
+                chunk_ids = self._doc_chunk_ids.get(doc_id, [])
+            doc_chunk_ids[doc_id] = chunk_ids
+        return chunk_ids
+
+    def _locate_chunk(
+        self, chunk_id: Optional[str], doc_chunk_ids: Dict[str, List[str]]
+    ) -> Optional[Tuple[str, int]]:
+        """(tài liệu, vị trí trong tài liệu) của một chunk, None nếu không tìm thấy."""
+        if not self._uses_graph_chunk_index:
+            return self._chunk_position.get(chunk_id)
+        if not chunk_id or not self._knowledge_graph.has_node(chunk_id):
+            return None
+        doc_id = self._knowledge_graph.nodes[chunk_id].get("source_document_id")
+        if not doc_id:
+            return None
+        try:
+            return doc_id, self._chunk_ids_of_document(doc_id, doc_chunk_ids).index(
+                chunk_id
+            )
+        except ValueError:
+            return None
+
+    def _chunk_text(self, chunk_id: str) -> str:
+        if not self._knowledge_graph.has_node(chunk_id):
+            return ""
+        return (self._knowledge_graph.nodes[chunk_id].get("text_content") or "").strip()
+
+    def expand(
+        self, documents: List[Dict[str, Any]], text_key: str = "original_text"
+    ) -> List[Dict[str, Any]]:
+        """
+        documents: kết quả cuối cùng (đã rerank), theo thứ tự ưu tiên. Trả về danh sách mới,
+        trong đó các chunk cùng tài liệu nằm gần nhau được gộp thành một đoạn (kèm chunk lân
+        cận); document không phải chunk hoặc không có trong chỉ mục được giữ nguyên.
+        """
+        if self.window <= 0 or not documents:
+            return documents
+
+        # Mỗi hit chunk: (thứ hạng, doc_id, vị trí); vị trí đã chọn theo tài liệu
+        doc_chunk_ids: Dict[str, List[str]] = {}
+        hits = []
+        selected_positions: Dict[str, Dict[int, str]] = {}
+        hit_by_position: Dict[Tuple[str, int], Tuple[int, Dict[str, Any]]] = {}
+        passthrough = []
+        for rank, doc_data in enumerate(documents):
+            position_info = (
+                self._locate_chunk(doc_data.get("graph_node_id"), doc_chunk_ids)
+                if doc_data.get("node_type") == "Chunk"
+                else None
+            )
+            if position_info is None:
+                passthrough.append((rank, doc_data))
+                continue
+            doc_id, position = position_info
+            if (doc_id, position) in hit_by_position:
+                continue  # Trùng chunk
+            hits.append((rank, doc_id, position))
+            hit_by_position[(doc_id, position)] = (rank, doc_data)
+            selected_positions.setdefault(doc_id, {})[position] = (
+                doc_data.get(text_key) or ""
+            )
+        if not hits:
+            return documents
+
+        # Thêm lân cận theo khoảng cách tăng dần, hit xếp hạng cao được ưu tiên ngân sách.
+        # Chỉ thêm chunk liền kề phần đã chọn để mỗi đoạn luôn liên tục.
+        budget_left = self.char_budget
+        neighbors_added = 0
+        for distance in range(1, self.window + 1):
+            for _rank, doc_id, position in hits:
+                chunk_ids = self._chunk_ids_of_document(doc_id, doc_chunk_ids)
+                selected = selected_positions[doc_id]
+                for neighbor, inner in (
+                    (position - distance, position - distance + 1),
+                    (position + distance, position + distance - 1),
+                ):
+                    if not 0 <= neighbor < len(chunk_ids) or neighbor in selected:
+                        continue
+                    if inner not in selected:
+                        continue
+                    neighbor_text = self._chunk_text(chunk_ids[neighbor])
+                    if not neighbor_text or len(neighbor_text) > budget_left:
+                        continue
+                    selected[neighbor] = neighbor_text
+                    budget_left -= len(neighbor_text)
+                    neighbors_added += 1
+
+        # Gộp các vị trí liên tiếp thành đoạn; mỗi đoạn mang thông tin của hit tốt nhất trong đó
+        expanded = list(passthrough)
+        for doc_id, selected in selected_positions.items():
+            chunk_ids = self._chunk_ids_of_document(doc_id, doc_chunk_ids)
+            run: List[int] = []
+            for position in sorted(selected) + [None]:
+                if run and (position is None or position != run[-1] + 1):
+                    run_hits = [
+                        hit_by_position[(doc_id, p)]
+                        for p in run
+                        if (doc_id, p) in hit_by_position
+                    ]
+                    best_rank, best_doc = min(run_hits, key=lambda item: item[0])
+                    merged_doc = best_doc.copy()
+                    merged_doc[text_key] = "\n".join(
+                        selected[p] for p in run if selected[p]
+                    )
+                    merged_doc["expanded_chunk_ids"] = [chunk_ids[p] for p in run]
+                    expanded.append((best_rank, merged_doc))
+                    run = []
+                if position is not None:
+                    run.append(position)
+
+        self.expansions += 1
+        self.neighbors_added += neighbors_added
+        expanded.sort(key=lambda item: item[0])
+        return [doc_data for _rank, doc_data in expanded]
+
+    def stats(self) -> dict:
+        return {
+            "source": "kg" if self._uses_graph_chunk_index else "order_in_doc",
+            "documents": (
+                None if self._uses_graph_chunk_index else len(self._doc_chunk_ids)
+            ),
+            "chunks": self.number_of_chunks(),
+            "window": self.window,
+            "char_budget": self.char_budget,
+            "expansions": self.expansions,
+            "neighbors_added": self.neighbors_added,
+        }
@@ -0,0 +1,73 @@
+# src/retrieval/mmr.py
+"""
+Đa dạng hóa kết quả truy xuất bằng Maximal Marginal Relevance (MMR), chạy trước reranker.
+
+Qdrant trả về nhiều ứng viên hơn (kèm vector), ma trận tương đồng giữa các ứng viên được tính
+bằng một phép nhân ma trận NumPy, sau đó chọn tham lam top-N:
+    MMR(d) = lambda * sim(q, d) - (1 - lambda) * max_{s đã chọn} sim(d, s)
+lambda = 1: chỉ xét độ liên quan (như không dùng MMR); lambda nhỏ: ưu tiên đa dạng.
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+VECTOR_KEY = "_vector"  # Khóa tạm chứa vector ứng viên, bị bỏ sau bước MMR
+
+
+def dense_vector_of_hit(hit) -> Optional[list]:
+    """Dense vector của một hit (named vectors khi tìm kiếm hybrid: lấy vector không tên "")."""
+    vector = getattr(hit, "vector", None)
+    if isinstance(vector, dict):
+        return vector.get("")
+    return vector
+
+
+def select_mmr_indices(
+    query_vector: list, candidate_vectors: list, top_n: int, lambda_mult: float
+) -> List[int]:
+    """Chỉ số các ứng viên được chọn theo MMR, theo thứ tự chọn."""
+    vectors = np.asarray(candidate_vectors, dtype=np.float32)
+    if vectors.ndim != 2 or len(vectors) == 0 or top_n <= 0:
+        return []
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors = vectors / norms
+    query = np.asarray(query_vector, dtype=np.float32)
+    query = query / (np.linalg.norm(query) or 1.0)
+
+    relevance = vectors @ query
+    similarity = vectors @ vectors.T  # Tương đồng từng cặp, một phép nhân ma trận
+    max_similarity_to_selected = np.full(len(vectors), -np.inf, dtype=np.float32)
+    available = np.ones(len(vectors), dtype=bool)
+    selected: List[int] = []
+    for _ in range(min(top_n, len(vectors))):
+        redundancy = max_similarity_to_selected if selected else 0.0
+        mmr_scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        mmr_scores = np.where(available, mmr_scores, -np.inf)
+        best = int(np.argmax(mmr_scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity_to_selected, similarity[best], out=max_similarity_to_selected)
+    return selected
+
+
+def apply_mmr(
+    query_vector: list,
+    candidate_documents: List[Dict[str, Any]],
+    top_n: int,
+    lambda_mult: float,
+) -> List[Dict[str, Any]]:
+    """
+    Chọn top_n document đa dạng từ candidate_documents (mỗi document mang vector ở VECTOR_KEY).
+    Document không có vector được xếp sau các document đã chọn. Vector tạm bị bỏ khỏi kết quả.
+    """
+    with_vector = [doc for doc in candidate_documents if doc.get(VECTOR_KEY) is not None]
+    without_vector = [doc for doc in candidate_documents if doc.get(VECTOR_KEY) is None]
+    selected_indices = select_mmr_indices(
+        query_vector, [doc[VECTOR_KEY] for doc in with_vector], top_n, lambda_mult
+    )
+    selected_documents = [with_vector[i] for i in selected_indices]
+    selected_documents += without_vector[: max(0, top_n - len(selected_documents))]
+    for doc in candidate_documents:
+        doc.pop(VECTOR_KEY, None)
+    return selected_documents
@@ -1,42 +1,39 @@
 # src/retrieval/retrieval_service.py
 import networkx as nx
-from src.vector_store.qdrant_service import search_qdrant_collection
+from src.vector_store.qdrant_service import (
+    search_qdrant_collection,
+    search_qdrant_collection_async,
+    search_qdrant_collection_batch_async,
+)
 from src.reranking.reranker import Reranker  # << IMPORT MỚI
+from src.retrieval.chunk_store import ChunkTextStore, SLIM_PAYLOAD_FIELDS
+from src.retrieval.context_expansion import ChunkNeighborIndex
+from src.retrieval.mmr import VECTOR_KEY, apply_mmr, dense_vector_of_hit
+from src.retrieval.search_filters import restrict_search_filter
 from typing import List, Dict, Any, Optional  # << IMPORT TYPE HINTING
 
 # import config # Các hằng số sẽ được truyền vào từ chatbot_cli.py
 
 
-def retrieve_and_compile_context(
-    original_query: str,  # << THÊM original_query
-    query_vector: list[float],
-    qdrant_cli,
-    knowledge_graph: nx.DiGraph,
-    reranker: Optional[Reranker],  # << THÊM reranker instance (có thể là None)
-    qdrant_collection_name: str,
-    qdrant_search_limit: int,
-    reranker_active: bool,  # << THÊM cờ kích hoạt reranker
-    rerank_top_n: int,  # << THÊM số lượng top N sau rerank
-):
+def _build_candidate_documents(
+    search_hits, chunk_store: Optional[ChunkTextStore] = None, include_vectors: bool = False
+) -> List[Dict[str, Any]]:
     """
-    Truy xuất, (tùy chọn) rerank, và tổng hợp ngữ cảnh.
+    Chuẩn bị danh sách các document ứng viên từ Qdrant hits.
+    Nếu payload không có văn bản (payload rút gọn / index không lưu văn bản), lấy văn bản từ
+    chunk_store theo graph_node_id.
+    include_vectors: giữ dense vector của hit (khóa tạm VECTOR_KEY) cho bước MMR.
     """
-    print(
-        f"  Đang tìm kiếm trên Qdrant (collection: {qdrant_collection_name}, top {qdrant_search_limit} kết quả)..."
-    )
-    search_hits = search_qdrant_collection(
-        qdrant_cli, qdrant_collection_name, query_vector, qdrant_search_limit
-    )
-
-    if not search_hits:
-        print("  Không có kết quả tìm kiếm nào từ Qdrant cho câu hỏi này.")
-        return "", []  # Trả về context rỗng và list rỗng
-
-    # Chuẩn bị danh sách các document ứng viên từ Qdrant hits
     candidate_documents = []
     for hit in search_hits:
-        payload = hit.payload
-        original_text_content = payload.get("original_text", "").strip()
+        payload = hit.payload or {}
+        original_text_content = (payload.get("original_text") or "").strip()
+        document_name = payload.get("document_name")
+        if not original_text_content and chunk_store is not None:
+            stored_entry = chunk_store.get(payload.get("graph_node_id"))
+            if stored_entry is not None:
+                original_text_content = stored_entry["original_text"]
+                document_name = document_name or stored_entry["document_name"]
         if original_text_content:  # Chỉ thêm nếu có nội dung text
             candidate_documents.append(
                 {
@@ -46,45 +43,227 @@ def retrieve_and_compile_context(
                     "score": float(hit.score),  # Điểm từ Qdrant
                     "original_text": original_text_content,
                     "graph_node_id": payload.get("graph_node_id"),
-                    "document_name": payload.get(
-                        "document_name", "Tài liệu không xác định"
-                    ),
+                    "document_name": document_name or "Tài liệu không xác định",
                     "node_type": payload.get("node_type", "Nội dung"),
                     # Mang theo các payload khác nếu cần thiết cho bước sau
                 }
             )
+            if include_vectors:
+                candidate_documents[-1][VECTOR_KEY] = dense_vector_of_hit(hit)
+    return candidate_documents
+
+
+def _search_limit_for(qdrant_search_limit: int, mmr_lambda, mmr_candidate_limit) -> int:
+    # Khi bật MMR: lấy nhiều ứng viên hơn từ Qdrant rồi chọn qdrant_search_limit ứng viên đa dạng
+    if mmr_lambda is None:
+        return qdrant_search_limit
+    return max(qdrant_search_limit, mmr_candidate_limit or 0)
+
+
+def _document_stage_filter(query_filter):
+    return restrict_search_filter(query_filter, node_types=["Document"])
+
+
+def _chunk_stage_filter(query_filter, document_hits):
+    """Bước 2: chỉ Chunk thuộc các tài liệu tìm được ở bước 1 (không có tài liệu -> mọi Chunk)."""
+    document_ids = []
+    for hit in document_hits:
+        document_id = (hit.payload or {}).get("graph_node_id")
+        if document_id and document_id not in document_ids:
+            document_ids.append(document_id)
+    return restrict_search_filter(
+        query_filter, node_types=["Chunk"], source_document_ids=document_ids or None
+    )
+
+
+# Khi cần vector cho MMR: chỉ lấy dense vector (tên ""), không lấy sparse BM25 của hybrid
+_DENSE_VECTOR_ONLY = [""]
+
+
+def _vectors_to_fetch(with_vectors: bool):
+    return list(_DENSE_VECTOR_ONLY) if with_vectors else False
+
+
+def _search_plan(
+    search_limit: int, query_filter, two_stage_document_limit, with_vectors: bool
+):
+    """
+    Trình tự tìm kiếm dùng chung cho bản sync / async / batch (không tự gọi Qdrant).
+    Generator: yield (limit, query_filter, with_vectors) của lần tìm kiếm kế tiếp, nhận hits
+    qua send() và return danh sách hits cuối cùng.
+    Hai bước: chỉ trả về hits Chunk của bước 2 (điểm của hai lần tìm kiếm độc lập không so sánh
+    được với nhau); hits Document của bước 1 chỉ dùng để lọc (không cần vector). Bước 2 rỗng
+    -> tìm phẳng.
+    """
+    if not two_stage_document_limit:
+        return (yield (search_limit, query_filter, with_vectors))
+    # Bước 1: top tài liệu theo vector tóm tắt; bước 2: chunk trong các tài liệu đó
+    document_hits = yield (
+        two_stage_document_limit,
+        _document_stage_filter(query_filter),
+        False,
+    )
+    chunk_hits = yield (
+        search_limit,
+        _chunk_stage_filter(query_filter, document_hits),
+        with_vectors,
+    )
+    if chunk_hits:
+        return chunk_hits
+    print(
+        "  CẢNH BÁO: Truy xuất hai bước không tìm thấy chunk nào (collection đã có payload source_document_id chưa?). Tìm kiếm phẳng."
+    )
+    return (yield (search_limit, query_filter, with_vectors))
+
+
+def _run_search_plan(plan, search_fn) -> list:
+    """
+    Chạy _search_plan với search_fn(limit, query_filter, with_vectors) đồng bộ; with_vectors đã
+    được đổi sang tham số của Qdrant (_vectors_to_fetch).
+    """
+    try:
+        step = next(plan)
+        while True:
+            limit, query_filter, with_vectors = step
+            step = plan.send(
+                search_fn(limit, query_filter, _vectors_to_fetch(with_vectors))
+            )
+    except StopIteration as plan_done:
+        return plan_done.value
+
+
+async def _run_search_plan_async(plan, search_fn) -> list:
+    """Như _run_search_plan, search_fn là coroutine function."""
+    try:
+        step = next(plan)
+        while True:
+            limit, query_filter, with_vectors = step
+            step = plan.send(
+                await search_fn(limit, query_filter, _vectors_to_fetch(with_vectors))
+            )
+    except StopIteration as plan_done:
+        return plan_done.value
+
+
+async def _run_search_plans_batch_async(plans: list, search_batch_fn) -> List[list]:
+    """
+    Chạy nhiều _search_plan cùng lúc: mỗi vòng, các bước đang chờ có cùng (limit, with_vectors)
+    được gom vào một request batch search_batch_fn(indexes, limit, query_filters, with_vectors).
+    """
+    results: List[list] = [[] for _ in plans]
+    pending_steps = {}
+    for index, plan in enumerate(plans):
+        try:
+            pending_steps[index] = next(plan)
+        except StopIteration as plan_done:
+            results[index] = plan_done.value
+    while pending_steps:
+        indexes_by_group: Dict[tuple, List[int]] = {}
+        for index, (limit, _query_filter, with_vectors) in pending_steps.items():
+            indexes_by_group.setdefault((limit, with_vectors), []).append(index)
+        next_steps = {}
+        for (limit, with_vectors), indexes in indexes_by_group.items():
+            hits_per_query = await search_batch_fn(
+                indexes,
+                limit,
+                [pending_steps[index][1] for index in indexes],
+                _vectors_to_fetch(with_vectors),
+            )
+            for index, hits in zip(indexes, hits_per_query):
+                try:
+                    next_steps[index] = plans[index].send(hits)
+                except StopIteration as plan_done:
+                    results[index] = plan_done.value
+        pending_steps = next_steps
+    return results
 
+
+def _search_kwargs(
+    sparse_vector_name,
+    hybrid_prefetch_limit,
+    slim_payload,
+    qdrant_search_timeout,
+    qdrant_search_params,
+) -> dict:
+    """Tham số tìm kiếm chung cho mọi bước (trừ vector truy vấn, limit, bộ lọc, with_vectors)."""
+    return dict(
+        sparse_vector_name=sparse_vector_name,
+        prefetch_limit=hybrid_prefetch_limit,
+        payload_fields=SLIM_PAYLOAD_FIELDS if slim_payload else None,
+        timeout=qdrant_search_timeout,
+        search_params=qdrant_search_params,
+    )
+
+
+def _candidates_from_hits(
+    query_vector: list[float],
+    search_hits: list,
+    chunk_store: Optional[ChunkTextStore],
+    qdrant_search_limit: int,
+    mmr_lambda: Optional[float],
+) -> List[Dict[str, Any]]:
+    """Hits -> document ứng viên cho rerank (lọc text rỗng, MMR nếu bật); [] nếu không có."""
+    if not search_hits:
+        print("  Không có kết quả tìm kiếm nào từ Qdrant cho câu hỏi này.")
+        return []
+    candidate_documents = _build_candidate_documents(
+        search_hits, chunk_store, include_vectors=mmr_lambda is not None
+    )
     if not candidate_documents:
         print(
             "  Không có tài liệu hợp lệ nào từ Qdrant (sau khi lọc text rỗng) để xử lý tiếp."
         )
+        return []
+    if mmr_lambda is not None:
+        candidate_documents = _diversify_candidates(
+            query_vector, candidate_documents, qdrant_search_limit, mmr_lambda
+        )
+    return candidate_documents
+
+
+def _finish_context(
+    final_documents: List[Dict[str, Any]],
+    context_expander: Optional[ChunkNeighborIndex],
+    knowledge_graph: nx.DiGraph,
+):
+    """Gộp chunk lân cận (nếu bật) rồi dựng ngữ cảnh; ("", []) khi không còn document nào."""
+    if not final_documents:
         return "", []
+    if context_expander is not None:
+        final_documents = context_expander.expand(final_documents)
+    return _compile_context(final_documents, knowledge_graph)
 
-    # Thực hiện Reranking nếu được kích hoạt và reranker đã được khởi tạo
-    final_documents_for_context = []
+
+def _diversify_candidates(
+    query_vector: list[float],
+    candidate_documents: List[Dict[str, Any]],
+    top_n: int,
+    mmr_lambda: float,
+) -> List[Dict[str, Any]]:
+    diversified_documents = apply_mmr(query_vector, candidate_documents, top_n, mmr_lambda)
+    print(
+        f"  MMR (lambda={mmr_lambda}): chọn {len(diversified_documents)}/{len(candidate_documents)} ứng viên đa dạng trước rerank."
+    )
+    return diversified_documents
+
+
+def _should_rerank(reranker: Optional[Reranker], reranker_active: bool) -> bool:
     if reranker_active and reranker and reranker.model:
-        print(f"  Thực hiện reranking cho {len(candidate_documents)} ứng viên...")
-        # text_key="original_text" vì đó là trường chứa nội dung để reranker so sánh
-        reranked_docs = reranker.rerank(
-            original_query,
-            candidate_documents,
-            text_key="original_text",
-            top_n=rerank_top_n,
-        )
-        final_documents_for_context = reranked_docs
+        return True
+    if reranker_active and (not reranker or not reranker.model):
         print(
-            f"  Đã chọn top {len(final_documents_for_context)} tài liệu sau khi rerank."
+            "  CẢNH BÁO: Reranking được kích hoạt nhưng model reranker không khả dụng. Sử dụng kết quả gốc từ Qdrant."
         )
-    else:
-        if reranker_active and (not reranker or not reranker.model):
-            print(
-                "  CẢNH BÁO: Reranking được kích hoạt nhưng model reranker không khả dụng. Sử dụng kết quả gốc từ Qdrant."
-            )
-        # Nếu không rerank, lấy top_n từ kết quả Qdrant (đã được sắp xếp theo score từ Qdrant)
-        final_documents_for_context = candidate_documents[:rerank_top_n]
-        # rerank_top_n ở đây đóng vai trò là số lượng context cuối cùng muốn lấy
+    return False
+
 
-    # Xây dựng ngữ cảnh từ final_documents_for_context
+def _compile_context(
+    final_documents_for_context: List[Dict[str, Any]], knowledge_graph: nx.DiGraph
+):
+    """
+    Xây dựng ngữ cảnh cho LLM và danh sách nguồn để hiển thị từ các kết quả cuối cùng.
+    knowledge_graph có thể là nx.DiGraph hoặc CompactKnowledgeGraph (cùng giao diện đọc).
+    """
     print(
         f"  Đang xây dựng ngữ cảnh từ {len(final_documents_for_context)} kết quả cuối cùng và KG..."
     )
@@ -114,6 +293,7 @@ def retrieve_and_compile_context(
                 if len(original_text) > 300
                 else original_text
             ),
+            "graph_node_id": graph_node_id,
         }
 
         if knowledge_graph.has_node(graph_node_id):
@@ -146,3 +326,261 @@ def retrieve_and_compile_context(
     compiled_context_for_llm = compiled_context_for_llm.strip().strip("---")
 
     return compiled_context_for_llm, context_parts_for_display
+
+
+def retrieve_and_compile_context(
+    original_query: str,  # << THÊM original_query
+    query_vector: list[float],
+    qdrant_cli,
+    knowledge_graph: nx.DiGraph,
+    reranker: Optional[Reranker],  # << THÊM reranker instance (có thể là None)
+    qdrant_collection_name: str,
+    qdrant_search_limit: int,
+    reranker_active: bool,  # << THÊM cờ kích hoạt reranker
+    rerank_top_n: int,  # << THÊM số lượng top N sau rerank
+    sparse_query_vector=None,  # models.SparseVector: bật tìm kiếm hybrid dense + sparse
+    sparse_vector_name: Optional[str] = None,
+    hybrid_prefetch_limit: Optional[int] = None,
+    chunk_store: Optional[ChunkTextStore] = None,  # văn bản cho hit có payload không chứa text
+    slim_payload: bool = False,  # chỉ lấy ID/loại node từ Qdrant (cần chunk_store)
+    qdrant_search_timeout: Optional[int] = None,  # timeout (giây) cho lần tìm kiếm này
+    qdrant_search_params=None,  # models.SearchParams (hnsw_ef, rescore) theo profile collection
+    query_filter=None,  # models.Filter theo payload (xem search_filters.build_search_filter)
+    context_expander: Optional[ChunkNeighborIndex] = None,  # gộp ±k chunk lân cận
+    mmr_lambda: Optional[float] = None,  # None = tắt MMR
+    mmr_candidate_limit: Optional[int] = None,  # số ứng viên lấy từ Qdrant cho MMR
+    two_stage_document_limit: Optional[int] = None,  # None = tìm phẳng (không hai bước)
+):
+    """
+    Truy xuất, (tùy chọn) rerank, và tổng hợp ngữ cảnh.
+    """
+    search_limit = _search_limit_for(qdrant_search_limit, mmr_lambda, mmr_candidate_limit)
+    print(
+        f"  Đang tìm kiếm trên Qdrant (collection: {qdrant_collection_name}, top {search_limit} kết quả{', hybrid' if sparse_query_vector is not None else ''})..."
+    )
+    search_kwargs = _search_kwargs(
+        sparse_vector_name,
+        hybrid_prefetch_limit,
+        slim_payload and chunk_store is not None,
+        qdrant_search_timeout,
+        qdrant_search_params,
+    )
+
+    def search(limit, step_filter, with_vectors):
+        return search_qdrant_collection(
+            qdrant_cli,
+            qdrant_collection_name,
+            query_vector,
+            limit,
+            sparse_query_vector=sparse_query_vector,
+            query_filter=step_filter,
+            with_vectors=with_vectors,
+            **search_kwargs,
+        )
+
+    search_hits = _run_search_plan(
+        _search_plan(
+            search_limit, query_filter, two_stage_document_limit, mmr_lambda is not None
+        ),
+        search,
+    )
+    candidate_documents = _candidates_from_hits(
+        query_vector, search_hits, chunk_store, qdrant_search_limit, mmr_lambda
+    )
+    if not candidate_documents:
+        return "", []  # Trả về context rỗng và list rỗng
+
+    # Thực hiện Reranking nếu được kích hoạt và reranker đã được khởi tạo
+    if _should_rerank(reranker, reranker_active):
+        print(f"  Thực hiện reranking cho {len(candidate_documents)} ứng viên...")
+        # text_key="original_text" vì đó là trường chứa nội dung để reranker so sánh
+        final_documents_for_context = reranker.rerank(
+            original_query,
+            candidate_documents,
+            text_key="original_text",
+            top_n=rerank_top_n,
+        )
+        print(
+            f"  Đã chọn top {len(final_documents_for_context)} tài liệu sau khi rerank."
+        )
+    else:
+        # Nếu không rerank, lấy top_n từ kết quả Qdrant (đã được sắp xếp theo score từ Qdrant)
+        # rerank_top_n ở đây đóng vai trò là số lượng context cuối cùng muốn lấy
+        final_documents_for_context = candidate_documents[:rerank_top_n]
+    return _finish_context(final_documents_for_context, context_expander, knowledge_graph)
+
+
+async def retrieve_and_compile_context_async(
+    original_query: str,
+    query_vector: list[float],
+    qdrant_cli,  # AsyncQdrantClient
+    knowledge_graph: nx.DiGraph,
+    reranker: Optional[Reranker],
+    qdrant_collection_name: str,
+    qdrant_search_limit: int,
+    reranker_active: bool,
+    rerank_top_n: int,
+    sparse_query_vector=None,
+    sparse_vector_name: Optional[str] = None,
+    hybrid_prefetch_limit: Optional[int] = None,
+    chunk_store: Optional[ChunkTextStore] = None,  # văn bản cho hit có payload không chứa text
+    slim_payload: bool = False,  # chỉ lấy ID/loại node từ Qdrant (cần chunk_store)
+    qdrant_search_timeout: Optional[int] = None,  # timeout (giây) cho lần tìm kiếm này
+    qdrant_search_params=None,  # models.SearchParams (hnsw_ef, rescore) theo profile collection
+    query_filter=None,  # models.Filter theo payload (xem search_filters.build_search_filter)
+    context_expander: Optional[ChunkNeighborIndex] = None,  # gộp ±k chunk lân cận
+    mmr_lambda: Optional[float] = None,  # None = tắt MMR
+    mmr_candidate_limit: Optional[int] = None,  # số ứng viên lấy từ Qdrant cho MMR
+    two_stage_document_limit: Optional[int] = None,  # None = tìm phẳng (không hai bước)
+):
+    """
+    Phiên bản async của retrieve_and_compile_context dùng cho API:
+    tìm kiếm qua AsyncQdrantClient, rerank chạy trên executor của Reranker.
+    """
+    search_limit = _search_limit_for(qdrant_search_limit, mmr_lambda, mmr_candidate_limit)
+    print(
+        f"  Đang tìm kiếm trên Qdrant (async, collection: {qdrant_collection_name}, top {search_limit} kết quả{', hybrid' if sparse_query_vector is not None else ''})..."
+    )
+    search_kwargs = _search_kwargs(
+        sparse_vector_name,
+        hybrid_prefetch_limit,
+        slim_payload and chunk_store is not None,
+        qdrant_search_timeout,
+        qdrant_search_params,
+    )
+
+    async def search(limit, step_filter, with_vectors):
+        return await search_qdrant_collection_async(
+            qdrant_cli,
+            qdrant_collection_name,
+            query_vector,
+            limit,
+            sparse_query_vector=sparse_query_vector,
+            query_filter=step_filter,
+            with_vectors=with_vectors,
+            **search_kwargs,
+        )
+
+    search_hits = await _run_search_plan_async(
+        _search_plan(
+            search_limit, query_filter, two_stage_document_limit, mmr_lambda is not None
+        ),
+        search,
+    )
+    candidate_documents = _candidates_from_hits(
+        query_vector, search_hits, chunk_store, qdrant_search_limit, mmr_lambda
+    )
+    if not candidate_documents:
+        return "", []
+
+    if _should_rerank(reranker, reranker_active):
+        print(f"  Thực hiện reranking cho {len(candidate_documents)} ứng viên...")
+        final_documents_for_context = await reranker.rerank_async(
+            original_query,
+            candidate_documents,
+            text_key="original_text",
+            top_n=rerank_top_n,
+        )
+        print(
+            f"  Đã chọn top {len(final_documents_for_context)} tài liệu sau khi rerank."
+        )
+    else:
+        final_documents_for_context = candidate_documents[:rerank_top_n]
+    return _finish_context(final_documents_for_context, context_expander, knowledge_graph)
+
+
+async def retrieve_and_compile_contexts_batch_async(
+    original_queries: List[str],
+    query_vectors: List[list[float]],
+    qdrant_cli,  # AsyncQdrantClient
+    knowledge_graph: nx.DiGraph,
+    reranker: Optional[Reranker],
+    qdrant_collection_name: str,
+    qdrant_search_limit: int,
+    reranker_active: bool,
+    rerank_top_n: int,
+    sparse_query_vectors=None,  # list[models.SparseVector], cùng thứ tự với original_queries
+    sparse_vector_name: Optional[str] = None,
+    hybrid_prefetch_limit: Optional[int] = None,
+    chunk_store: Optional[ChunkTextStore] = None,
+    slim_payload: bool = False,
+    qdrant_search_timeout: Optional[int] = None,
+    qdrant_search_params=None,
+    query_filter=None,
+    context_expander: Optional[ChunkNeighborIndex] = None,
+    mmr_lambda: Optional[float] = None,
+    mmr_candidate_limit: Optional[int] = None,
+    two_stage_document_limit: Optional[int] = None,
+):
+    """
+    Phiên bản nhiều câu hỏi của retrieve_and_compile_context_async: mỗi bước tìm kiếm là một
+    request Qdrant (query_batch_points) cho cả batch, và một lần predict của reranker.
+    Trả về list (compiled_context, context_parts_for_display) theo thứ tự câu hỏi.
+    """
+    search_limit = _search_limit_for(qdrant_search_limit, mmr_lambda, mmr_candidate_limit)
+    print(
+        f"  Đang tìm kiếm batch {len(original_queries)} câu hỏi trên Qdrant (async, collection: {qdrant_collection_name}, top {search_limit} kết quả)..."
+    )
+    search_kwargs = _search_kwargs(
+        sparse_vector_name,
+        hybrid_prefetch_limit,
+        slim_payload and chunk_store is not None,
+        qdrant_search_timeout,
+        qdrant_search_params,
+    )
+
+    async def search_batch(indexes, limit, step_filters, with_vectors):
+        return await search_qdrant_collection_batch_async(
+            qdrant_cli,
+            qdrant_collection_name,
+            [query_vectors[index] for index in indexes],
+            limit,
+            sparse_query_vectors=(
+                [sparse_query_vectors[index] for index in indexes]
+                if sparse_query_vectors is not None
+                else None
+            ),
+            query_filters=step_filters,
+            with_vectors=with_vectors,
+            **search_kwargs,
+        )
+
+    search_hits_per_query = await _run_search_plans_batch_async(
+        [
+            _search_plan(
+                search_limit,
+                query_filter,
+                two_stage_document_limit,
+                mmr_lambda is not None,
+            )
+            for _ in original_queries
+        ],
+        search_batch,
+    )
+    candidates_per_query = [
+        _candidates_from_hits(
+            query_vector, search_hits, chunk_store, qdrant_search_limit, mmr_lambda
+        )
+        for query_vector, search_hits in zip(query_vectors, search_hits_per_query)
+    ]
+
+    if _should_rerank(reranker, reranker_active):
+        # Bỏ qua câu hỏi không có ứng viên, rerank phần còn lại trong một lần predict
+        rerank_indices = [i for i, docs in enumerate(candidates_per_query) if docs]
+        reranked_lists = await reranker.rerank_many_async(
+            [original_queries[i] for i in rerank_indices],
+            [candidates_per_query[i] for i in rerank_indices],
+            text_key="original_text",
+            top_n=rerank_top_n,
+        )
+        final_documents_per_query = [[] for _ in original_queries]
+        for index, reranked_documents in zip(rerank_indices, reranked_lists):
+            final_documents_per_query[index] = reranked_documents
+    else:
+        final_documents_per_query = [
+            docs[:rerank_top_n] for docs in candidates_per_query
+        ]
+    return [
+        _finish_context(final_documents, context_expander, knowledge_graph)
+        for final_documents in final_documents_per_query
+    ]
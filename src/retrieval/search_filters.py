@@ -0,0 +1,92 @@
+# src/retrieval/search_filters.py
+"""
+Bộ lọc tìm kiếm theo payload (document_name, node_type, product_category).
+
+product_category được suy ra lúc index từ tên + từ khóa của tài liệu, theo bảng từ khóa
+config.PRODUCT_CATEGORY_KEYWORDS (so khớp không dấu, ví dụ "thẻ tín dụng" -> "credit_card").
+Các trường lọc đều có keyword payload index (initialize_qdrant_and_collection) để Qdrant
+lọc ngay trong HNSW thay vì quét cả collection.
+
+restrict_search_filter thêm điều kiện node_type / source_document_id vào bộ lọc của người dùng
+(truy xuất hai bước tài liệu -> chunk).
+"""
+import re
+from typing import Dict, List, Optional
+
+from qdrant_client import models
+
+from src.embedding.sparse_encoder import strip_vietnamese_diacritics
+
+DEFAULT_PRODUCT_CATEGORY = "other"
+
+
+def _fold_for_matching(text: str) -> str:
+    folded = strip_vietnamese_diacritics(text or "").lower()
+    return " ".join(re.split(r"[\W_]+", folded)).strip()
+
+
+def infer_product_category(
+    document_name: str,
+    keywords: str,
+    category_keywords: Dict[str, List[str]],
+) -> str:
+    """
+    Nhóm sản phẩm của một tài liệu: nhóm đầu tiên (theo thứ tự trong category_keywords)
+    có từ khóa xuất hiện trong tên tài liệu, nếu không có thì xét từ khóa của tài liệu.
+    """
+    for source_text in (document_name, keywords):
+        folded_source = f" {_fold_for_matching(source_text)} "
+        for category, phrases in category_keywords.items():
+            for phrase in phrases:
+                if f" {_fold_for_matching(phrase)} " in folded_source:
+                    return category
+    return DEFAULT_PRODUCT_CATEGORY
+
+
+def build_search_filter(
+    document_names: Optional[List[str]] = None,
+    node_types: Optional[List[str]] = None,
+    product_categories: Optional[List[str]] = None,
+    source_document_ids: Optional[List[str]] = None,
+) -> Optional[models.Filter]:
+    """
+    Filter Qdrant từ các tham số lọc (mỗi tham số là danh sách giá trị chấp nhận, OR trong
+    một trường, AND giữa các trường). Trả về None nếu không có điều kiện nào.
+    """
+    conditions = []
+    for field_name, values in (
+        ("document_name", document_names),
+        ("node_type", node_types),
+        ("product_category", product_categories),
+        ("source_document_id", source_document_ids),
+    ):
+        if values:
+            conditions.append(
+                models.FieldCondition(
+                    key=field_name, match=models.MatchAny(any=list(values))
+                )
+            )
+    if not conditions:
+        return None
+    return models.Filter(must=conditions)
+
+
+def restrict_search_filter(
+    base_filter: Optional[models.Filter],
+    node_types: Optional[List[str]] = None,
+    source_document_ids: Optional[List[str]] = None,
+) -> Optional[models.Filter]:
+    """base_filter AND các điều kiện node_type / source_document_id (nếu có)."""
+    extra_filter = build_search_filter(
+        node_types=node_types, source_document_ids=source_document_ids
+    )
+    if base_filter is None:
+        return extra_filter
+    if extra_filter is None:
+        return base_filter
+    base_must = base_filter.must
+    if base_must is None:
+        base_must = []
+    elif not isinstance(base_must, list):
+        base_must = [base_must]
+    return base_filter.model_copy(update={"must": base_must + extra_filter.must})
@@ -1,14 +1,119 @@
 # src/utils/api_key_manager.py
 import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.generativeai.types import content_types, generation_types, safety_types
+from google.api_core import exceptions as google_exceptions
+import asyncio
 import os
+import random
+import re
+import threading
 import time
 from dotenv import load_dotenv
 
+from src.utils.rate_limiter import TokenBucket
+
 # Giả sử config.py nằm ở thư mục gốc của dự án
 # và utils nằm trong src, thì đường dẫn .env là 2 cấp lên rồi vào .env
 # PROJECT_ROOT_FOR_ENV = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # DOTENV_PATH = os.path.join(PROJECT_ROOT_FOR_ENV, '.env')
 
+# Các dạng gợi ý thời gian chờ thường gặp trong response 429 của Gemini
+_RETRY_DELAY_PATTERNS = (
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+(?:\.\d+)?)"),
+    re.compile(r'"retryDelay"\s*:\s*"(\d+(?:\.\d+)?)s"'),
+    re.compile(r"retry in (\d+(?:\.\d+)?)\s*s", re.IGNORECASE),
+)
+
+
+# Các bước của GeminiApiKeyManager._retry_steps
+_STEP_SLEEP = "sleep"
+_STEP_CALL = "call"
+
+
+def _parse_retry_delay_seconds(error: Exception) -> float | None:
+    """Lấy số giây phải chờ từ lỗi 429 (RetryInfo trong error.details hoặc trong message)."""
+    details = getattr(error, "details", None)
+    if not isinstance(details, (list, tuple)):  # grpc.RpcError.details là method
+        details = []
+    for detail in details:
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is not None:
+            return retry_delay.seconds + retry_delay.nanos / 1e9
+    error_str = str(error)
+    for pattern in _RETRY_DELAY_PATTERNS:
+        match = pattern.search(error_str)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def _build_generate_content_request(
+    model_name, contents, generation_config=None, safety_settings=None
+) -> glm.GenerateContentRequest:
+    """
+    GenerateContentRequest tương đương GenerativeModel.generate_content(contents,
+    generation_config=..., safety_settings=...), để gọi thẳng trên client của từng key.
+    """
+    if "/" not in model_name:
+        model_name = "models/" + model_name
+    request = glm.GenerateContentRequest(
+        model=model_name,
+        contents=content_types.to_contents(contents),
+        generation_config=generation_types.to_generation_config_dict(generation_config),
+        safety_settings=safety_types.normalize_safety_settings(
+            safety_types.to_easy_safety_dict(safety_settings)
+        ),
+    )
+    if request.contents and not request.contents[-1].role:
+        request.contents[-1].role = "user"
+    return request
+
+
+def _is_quota_error(error: Exception) -> bool:
+    error_str = str(error).lower()
+    return "429" in error_str or "resource_exhausted" in error_str or "quota" in error_str
+
+
+class _GeminiKeySlot:
+    """
+    Trạng thái của một API key trong pool: client riêng (không dùng genai.configure toàn cục),
+    số request đang chạy và token bucket giới hạn tốc độ riêng cho key đó.
+    """
+
+    __slots__ = (
+        "index",
+        "api_key",
+        "client",
+        "_async_client",
+        "in_flight",
+        "rate_limiter",
+        "consecutive_failures",
+        "cooldown_until",
+        "total_calls",
+        "total_failures",
+    )
+
+    def __init__(self, index: int, api_key: str, requests_per_minute: float):
+        self.index = index
+        self.api_key = api_key
+        self.client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+        self._async_client = None
+        self.in_flight = 0
+        self.rate_limiter = TokenBucket(requests_per_minute)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0  # time.monotonic(); key bị bỏ qua cho tới thời điểm này
+        self.total_calls = 0
+        self.total_failures = 0
+
+    def get_async_client(self) -> glm.GenerativeServiceAsyncClient:
+        # Client gRPC asyncio gắn với event loop nên chỉ tạo khi đã có loop đang chạy
+        if self._async_client is None:
+            self._async_client = glm.GenerativeServiceAsyncClient(
+                client_options={"api_key": self.api_key}
+            )
+        return self._async_client
+
 
 class GeminiApiKeyManager:
     def __init__(
@@ -16,6 +121,8 @@ class GeminiApiKeyManager:
         retry_wait_seconds,
         max_retries_per_key_cycle,
         api_key_prefix="GEMINI_API_KEY_",
+        requests_per_minute_per_key=0,
+        backoff_base_seconds=1.0,
     ):
         # Xác định đường dẫn đến file .env từ thư mục gốc của dự án
         # Giả sử thư mục gốc của dự án là thư mục cha của 'src'
@@ -45,10 +152,16 @@ class GeminiApiKeyManager:
                 f"LỖI (ApiKeyManager): Không tìm thấy API key nào với tiền tố '{self.api_key_prefix}' trong file .env hoặc biến môi trường."
             )
 
-        self.current_key_index = 0
-        self.total_keys_exhausted_cycles = 0
+        # retry_wait_seconds giờ là mức trần của thời gian cooldown cho một key
         self.retry_wait_seconds = retry_wait_seconds
         self.max_retries_per_key_cycle = max_retries_per_key_cycle
+        self.backoff_base_seconds = backoff_base_seconds
+        # Mỗi key có client, bộ đếm in-flight và rate limit riêng; _lock bảo vệ việc chọn key
+        self._lock = threading.Lock()
+        self.key_slots = [
+            _GeminiKeySlot(i, key, requests_per_minute_per_key)
+            for i, key in enumerate(self.api_keys)
+        ]
         # print(f"GeminiApiKeyManager: Đã tải {len(self.api_keys)} API keys (tiền tố: {self.api_key_prefix}).")
         # if hasattr(genai, '__version__'):
         #      print(f"Phiên bản google-generativeai đang được sử dụng bởi ApiKeyManager: {genai.__version__}")
@@ -71,86 +184,394 @@ class GeminiApiKeyManager:
                 break
         return keys
 
-    def _execute_with_retry(self, api_call_logic_func, call_type):
-        """Hàm nội bộ để thực hiện logic gọi API với retry và xoay vòng key."""
-        keys_tried_in_current_cycle = 0
-        while True:
-            current_api_key = self.api_keys[self.current_key_index]
-            # print(f"    Sử dụng API Key #{self.current_key_index + 1} cho {call_type}...")
-            try:
-                genai.configure(api_key=current_api_key)
-                response = api_call_logic_func()  # Thực thi logic gọi API cụ thể
-                # print(f"    {call_type} thành công với Key #{self.current_key_index + 1}.")
-                self.total_keys_exhausted_cycles = 0  # Reset khi thành công
-                return response
+    def _acquire_slot(self, excluded_indexes: set):
+        """
+        Chọn key "rảnh" nhất (ít request đang chạy nhất, ít lỗi liên tiếp nhất) trong các key
+        chưa thử, không trong thời gian cooldown và còn token. Trả về (slot, None) nếu chọn được;
+        (None, số giây cần chờ) nếu các key còn lại tạm thời chưa dùng được; (None, None) nếu
+        đã thử hết các key trong chu kỳ này.
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                slot for slot in self.key_slots if slot.index not in excluded_indexes
+            ]
+            if not candidates:
+                return None, None
+            ready = [
+                slot
+                for slot in candidates
+                if slot.cooldown_until <= now and slot.rate_limiter.has_token(now)
+            ]
+            if not ready:
+                return None, min(
+                    max(
+                        slot.cooldown_until - now,
+                        slot.rate_limiter.seconds_until_available(now),
+                    )
+                    for slot in candidates
+                )
+            slot = min(
+                ready, key=lambda s: (s.in_flight, s.consecutive_failures, s.index)
+            )
+            slot.rate_limiter.consume(now)
+            slot.in_flight += 1
+            slot.total_calls += 1
+            return slot, None
 
-            except (
+    def _release_slot(
+        self,
+        slot: _GeminiKeySlot,
+        succeeded: bool,
+        error: Exception | None = None,
+        count_as_failure: bool = True,
+    ):
+        with self._lock:
+            slot.in_flight -= 1
+            if not count_as_failure:
+                return  # Ví dụ timeout do deadline của request: không phải lỗi của key
+            if succeeded:
+                slot.consecutive_failures = 0
+                return
+            slot.consecutive_failures += 1
+            slot.total_failures += 1
+            if error is None or isinstance(
+                error,
+                (
+                    genai.types.generation_types.BlockedPromptException,
+                    genai.types.generation_types.StopCandidateException,
+                ),
+            ):
+                return  # Lỗi do nội dung, không phải do key: không cần cooldown
+            cooldown_seconds = (
+                _parse_retry_delay_seconds(error) if _is_quota_error(error) else None
+            )
+            if cooldown_seconds is None:
+                # Exponential backoff có jitter, trần là retry_wait_seconds
+                cooldown_seconds = min(
+                    self.retry_wait_seconds,
+                    self.backoff_base_seconds * (2 ** (slot.consecutive_failures - 1)),
+                )
+                cooldown_seconds *= random.uniform(0.5, 1.0)
+            slot.cooldown_until = max(
+                slot.cooldown_until, time.monotonic() + cooldown_seconds
+            )
+
+    def _seconds_until_any_key_ready(self, only_indexes: set | None = None) -> float:
+        with self._lock:
+            now = time.monotonic()
+            slots = [
+                slot
+                for slot in self.key_slots
+                if only_indexes is None or slot.index in only_indexes
+            ]
+            if not slots:
+                return float("inf")
+            return max(
+                0.0,
+                min(
+                    max(
+                        slot.cooldown_until - now,
+                        slot.rate_limiter.seconds_until_available(now),
+                    )
+                    for slot in slots
+                ),
+            )
+
+    @staticmethod
+    def _remaining_seconds(deadline: float | None) -> float | None:
+        return None if deadline is None else deadline - time.monotonic()
+
+    # Dung sai khi xác định một lỗi xảy ra do chính deadline của request (timeout tối thiểu 0.1s)
+    _DEADLINE_TOLERANCE_SECONDS = 0.1
+
+    def _deadline_expired(self, deadline: float | None, call_type: str) -> bool:
+        remaining = self._remaining_seconds(deadline)
+        if remaining is not None and remaining <= 0:
+            print(f"    Đã hết thời gian (deadline) cho {call_type}. Bỏ qua yêu cầu này.")
+            return True
+        return False
+
+    def _is_deadline_error(self, deadline: float | None) -> bool:
+        """Lỗi xảy ra khi đã (gần như) tới deadline: timeout do request, không do key."""
+        remaining = self._remaining_seconds(deadline)
+        return remaining is not None and remaining <= self._DEADLINE_TOLERANCE_SECONDS
+
+    def _log_call_error(self, slot: _GeminiKeySlot, call_type: str, error: Exception):
+        if isinstance(
+            error,
+            (
                 genai.types.generation_types.BlockedPromptException,
                 genai.types.generation_types.StopCandidateException,
-            ) as e_block:
-                print(
-                    f"    Cảnh báo/Lỗi (Blocked/Stop) với Key #{self.current_key_index + 1} ({call_type}): {type(e_block).__name__} - {e_block.args if hasattr(e_block, 'args') else e_block}"
+            ),
+        ):
+            print(
+                f"    Cảnh báo/Lỗi (Blocked/Stop) với Key #{slot.index + 1} ({call_type}): {type(error).__name__} - {error.args if hasattr(error, 'args') else error}"
+            )
+        elif _is_quota_error(error):
+            retry_delay = _parse_retry_delay_seconds(error)
+            print(
+                f"    Lỗi Quota với Key #{slot.index + 1} ({call_type})."
+                + (f" Gemini yêu cầu chờ {retry_delay:.1f} giây." if retry_delay else "")
+            )
+        else:
+            print(
+                f"    Lỗi không xác định với Key #{slot.index + 1} ({call_type}): {type(error).__name__} - {error}"
+            )
+
+    def _next_wait_seconds(
+        self, wait_seconds, tried_indexes: set, exhausted_cycles: int, call_type: str
+    ):
+        """
+        Tính thời gian chờ trước lần thử tiếp theo. Trả về (số giây chờ, exhausted_cycles mới),
+        hoặc (None, exhausted_cycles) nếu đã hết số chu kỳ cho phép.
+        """
+        if wait_seconds is not None and wait_seconds <= self._seconds_until_any_key_ready(
+            tried_indexes
+        ):
+            # Còn key chưa thử nhưng đang cooldown / hết token (ví dụ bị các batch song song dùng
+            # hết token), và không có key đã thử nào sẵn sàng sớm hơn: chỉ chờ, không tính là một chu kỳ lỗi
+            return wait_seconds, exhausted_cycles
+        seconds_until_any_ready = self._seconds_until_any_key_ready()
+        exhausted_cycles += 1
+        print(
+            f"    Tất cả {len(self.key_slots)} API key đã gặp lỗi/quota {exhausted_cycles} lần cho {call_type}."
+        )
+        if exhausted_cycles >= self.max_retries_per_key_cycle:
+            print(
+                f"    Đã thử {self.max_retries_per_key_cycle} chu kỳ cho {call_type}. Bỏ qua yêu cầu này."
+            )
+            return None, exhausted_cycles
+        tried_indexes.clear()
+        # Chờ tới khi key sớm nhất hết cooldown (thêm jitter nhỏ để các request không dồn cùng lúc)
+        return seconds_until_any_ready + random.uniform(0, 0.25), exhausted_cycles
+
+    def _retry_steps(self, call_type, deadline=None, raise_request_errors=False):
+        """
+        Vòng chọn key / chờ cooldown / kiểm tra deadline dùng chung cho _execute_with_retry và
+        _execute_with_retry_async (không tự gọi API hay ngủ). Generator yield
+        (_STEP_SLEEP, giây) hoặc (_STEP_CALL, slot, request_options); sau _STEP_CALL nhận lại
+        (True, response) hoặc (False, exception) qua send(). Return response, hoặc None khi bỏ cuộc.
+        raise_request_errors: lỗi 400 (nội dung request không hợp lệ) được raise lại ngay thay vì
+        thử key khác.
+        """
+        tried_indexes = set()
+        exhausted_cycles = 0
+        while True:
+            if self._deadline_expired(deadline, call_type):
+                return None
+            slot, wait_seconds = self._acquire_slot(tried_indexes)
+            if slot is None:
+                wait_seconds, exhausted_cycles = self._next_wait_seconds(
+                    wait_seconds, tried_indexes, exhausted_cycles, call_type
                 )
-            except Exception as e_api:
-                error_str = str(e_api).lower()
-                if (
-                    "429" in error_str
-                    or "resource_exhausted" in error_str
-                    or "quota" in error_str
-                ):
+                if wait_seconds is None:
+                    return None
+                remaining = self._remaining_seconds(deadline)
+                if remaining is not None and wait_seconds >= remaining:
                     print(
-                        f"    Lỗi Quota với Key #{self.current_key_index + 1} ({call_type})."
+                        f"    Không đủ thời gian chờ key khả dụng ({wait_seconds:.1f}s) trước deadline cho {call_type}. Bỏ qua yêu cầu này."
                     )
-                else:
+                    return None
+                if wait_seconds > 1:
                     print(
-                        f"    Lỗi không xác định với Key #{self.current_key_index + 1} ({call_type}): {type(e_api).__name__} - {e_api}"
+                        f"    Đang đợi {wait_seconds:.1f} giây tới khi có key khả dụng cho {call_type}..."
                     )
+                yield _STEP_SLEEP, wait_seconds
+                continue
 
-            keys_tried_in_current_cycle += 1
-            self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
+            if self._deadline_expired(deadline, call_type):
+                self._release_slot(slot, False, count_as_failure=False)
+                return None
+            remaining = self._remaining_seconds(deadline)
+            request_options = (
+                {"timeout": max(remaining, 0.1)} if remaining is not None else None
+            )
+            try:
+                succeeded, outcome = yield _STEP_CALL, slot, request_options
+            except GeneratorExit:
+                # Lời gọi bị hủy (CancelledError, KeyboardInterrupt...): trả slot, không phạt key
+                self._release_slot(slot, False, count_as_failure=False)
+                raise
+            if succeeded:
+                self._release_slot(slot, True)
+                return outcome
+            if raise_request_errors and isinstance(outcome, google_exceptions.BadRequest):
+                # Lỗi do chính request: key khác cũng sẽ lỗi, key này không bị phạt
+                self._log_call_error(slot, call_type, outcome)
+                self._release_slot(slot, False, count_as_failure=False)
+                raise outcome
+            deadline_error = self._is_deadline_error(deadline)
+            self._log_call_error(slot, call_type, outcome)
+            self._release_slot(
+                slot, False, outcome, count_as_failure=not deadline_error
+            )
+            if deadline_error:
+                # Hết thời gian của request: không thử key khác, key này không bị cooldown
+                return None
+            tried_indexes.add(slot.index)
 
-            if keys_tried_in_current_cycle >= len(self.api_keys):
-                self.total_keys_exhausted_cycles += 1
-                print(
-                    f"    Tất cả {len(self.api_keys)} API key đã gặp lỗi/quota {self.total_keys_exhausted_cycles} lần cho {call_type}."
-                )
-                if self.total_keys_exhausted_cycles >= self.max_retries_per_key_cycle:
-                    print(
-                        f"    Đã thử {self.max_retries_per_key_cycle} chu kỳ cho {call_type}. Bỏ qua yêu cầu này."
-                    )
-                    return None
-                print(
-                    f"    Đang đợi {self.retry_wait_seconds} giây trước khi thử lại chu kỳ mới cho {call_type}..."
-                )
-                time.sleep(self.retry_wait_seconds)
-                keys_tried_in_current_cycle = 0
+    def _execute_with_retry(
+        self, api_call_logic_func, call_type, deadline=None, raise_request_errors=False
+    ):
+        """
+        Hàm nội bộ để thực hiện logic gọi API với retry và xoay vòng key.
+        api_call_logic_func(slot, request_options) dùng slot.client để gọi API.
+        deadline (time.monotonic()) - nếu không kịp thử lại trước deadline thì trả về None ngay.
+        """
+        steps = self._retry_steps(call_type, deadline, raise_request_errors)
+        try:
+            step = next(steps)
+            while True:
+                if step[0] == _STEP_SLEEP:
+                    time.sleep(step[1])
+                    step = next(steps)
+                    continue
+                _step_kind, slot, request_options = step
+                try:
+                    outcome = True, api_call_logic_func(slot, request_options)
+                except Exception as e_api:
+                    outcome = False, e_api
+                step = steps.send(outcome)
+        except StopIteration as retry_done:
+            return retry_done.value
+        finally:
+            steps.close()
+
+    async def _execute_with_retry_async(
+        self, api_call_logic_coro_func, call_type, deadline=None
+    ):
+        """
+        Phiên bản async của _execute_with_retry: api_call_logic_coro_func(slot, request_options)
+        trả về coroutine. Thời gian chờ dùng asyncio.sleep nên các request khác vẫn chạy tiếp
+        trên những key còn khả dụng.
+        """
+        steps = self._retry_steps(call_type, deadline)
+        try:
+            step = next(steps)
+            while True:
+                if step[0] == _STEP_SLEEP:
+                    await asyncio.sleep(step[1])
+                    step = next(steps)
+                    continue
+                _step_kind, slot, request_options = step
+                try:
+                    outcome = True, await api_call_logic_coro_func(slot, request_options)
+                except Exception as e_api:
+                    outcome = False, e_api
+                step = steps.send(outcome)
+        except StopIteration as retry_done:
+            return retry_done.value
+        finally:
+            steps.close()
+
+    def get_stats(self) -> list[dict]:
+        """Trạng thái hiện tại của từng key (không bao gồm giá trị key)."""
+        with self._lock:
+            return [
+                {
+                    "key_number": slot.index + 1,
+                    "in_flight": slot.in_flight,
+                    "total_calls": slot.total_calls,
+                    "total_failures": slot.total_failures,
+                    "consecutive_failures": slot.consecutive_failures,
+                    "cooldown_remaining_seconds": round(
+                        max(0.0, slot.cooldown_until - time.monotonic()), 2
+                    ),
+                }
+                for slot in self.key_slots
+            ]
 
     def execute_generative_call(
-        self, model_name_to_use, api_params_for_method, call_type="Generation"
+        self,
+        model_name_to_use,
+        api_params_for_method,
+        call_type="Generation",
+        deadline=None,
     ):
         """
-        Thực hiện một lệnh gọi đến phương thức generate_content của GenerativeModel.
-        api_params_for_method là dict chứa các tham số cho generate_content (ví dụ: contents, generation_config,...).
+        Thực hiện một lệnh gọi generate_content (kết quả giống GenerativeModel.generate_content).
+        api_params_for_method là dict gồm contents và tùy chọn generation_config, safety_settings.
+        deadline: thời điểm time.monotonic() mà sau đó không thử lại nữa (trả về None).
         """
+        request = _build_generate_content_request(
+            model_name_to_use, **api_params_for_method
+        )
 
-        def api_logic():
-            model = genai.GenerativeModel(model_name_to_use)
-            return model.generate_content(**api_params_for_method)
+        def api_logic(slot, request_options):
+            # Gọi thẳng client của key: không cần genai.configure (toàn cục, không an toàn
+            # khi chạy song song) và không phụ thuộc thuộc tính private của GenerativeModel
+            response = slot.client.generate_content(request, **(request_options or {}))
+            return genai.types.GenerateContentResponse.from_response(response)
 
-        # print(f"    (ApiKeyManager) Chuẩn bị gọi execute_generative_call cho model {model_name_to_use}...")
-        return self._execute_with_retry(api_logic, call_type)
+        return self._execute_with_retry(api_logic, call_type, deadline)
 
     def call_embedding_model(
-        self, model_name, content_to_embed, task_type, call_type="Embedding"
+        self,
+        model_name,
+        content_to_embed,
+        task_type,
+        call_type="Embedding",
+        deadline=None,
+        raise_request_errors=False,
     ):
-        """Thực hiện gọi API embedding của Gemini."""
+        """
+        Thực hiện gọi API embedding của Gemini.
+        raise_request_errors=True: raise google.api_core.exceptions.BadRequest khi nội dung bị
+        từ chối (để caller tách batch), thay vì trả về None như khi hết quota / deadline.
+        """
 
-        def api_logic():
+        def api_logic(slot, request_options):
             return genai.embed_content(
                 model=model_name,
                 content=content_to_embed,  # content có thể là string hoặc list of strings
                 task_type=task_type,
+                client=slot.client,
+                request_options=request_options,
+            )
+
+        return self._execute_with_retry(
+            api_logic, call_type, deadline, raise_request_errors
+        )
+
+    async def execute_generative_call_async(
+        self,
+        model_name_to_use,
+        api_params_for_method,
+        call_type="Generation",
+        deadline=None,
+    ):
+        """Phiên bản async của execute_generative_call (dùng generate_content_async)."""
+
+        request = _build_generate_content_request(
+            model_name_to_use, **api_params_for_method
+        )
+
+        async def api_logic(slot, request_options):
+            response = await slot.get_async_client().generate_content(
+                request, **(request_options or {})
+            )
+            return genai.types.AsyncGenerateContentResponse.from_response(response)
+
+        return await self._execute_with_retry_async(api_logic, call_type, deadline)
+
+    async def call_embedding_model_async(
+        self,
+        model_name,
+        content_to_embed,
+        task_type,
+        call_type="Embedding",
+        deadline=None,
+    ):
+        """Phiên bản async của call_embedding_model (dùng genai.embed_content_async)."""
+
+        async def api_logic(slot, request_options):
+            return await genai.embed_content_async(
+                model=model_name,
+                content=content_to_embed,
+                task_type=task_type,
+                client=slot.get_async_client(),
+                request_options=request_options,
             )
 
-        # print(f"    (ApiKeyManager) Chuẩn bị gọi call_embedding_model cho model {model_name}...")
-        return self._execute_with_retry(api_logic, call_type)
+        return await self._execute_with_retry_async(api_logic, call_type, deadline)
@@ -0,0 +1,82 @@
+# src/utils/cache_utils.py
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_query_text(text: str) -> str:
+    """
+    Chuẩn hóa câu hỏi để dùng làm khóa cache: Unicode NFC (tiếng Việt có thể đến ở dạng
+    tổ hợp NFD), chữ thường, gộp khoảng trắng và bỏ dấu câu thừa ở cuối.
+    """
+    if not text:
+        return ""
+    normalized = unicodedata.normalize("NFC", text).lower()
+    normalized = " ".join(normalized.split())
+    return normalized.rstrip(" ?!.…")
+
+
+class LruTtlCache:
+    """
+    Cache LRU trong bộ nhớ có giới hạn số phần tử và thời gian sống (TTL), an toàn khi dùng
+    từ nhiều thread. ttl_seconds <= 0 nghĩa là không hết hạn.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float = 0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = (
+            time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        )
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,102 @@
+# src/utils/data_version.py
+import hashlib
+import os
+import threading
+import time
+
+
+class DataVersionTracker:
+    """
+    Theo dõi "phiên bản dữ liệu" mà API đang phục vụ: file Knowledge Graph (mtime, kích thước)
+    + thông tin Qdrant collection (số điểm) + tag thủ công (tùy chọn). Khi phiên bản thay đổi,
+    các listener (ví dụ các cache kết quả) được gọi để tự vô hiệu hóa.
+    """
+
+    def __init__(
+        self,
+        kg_file_path: str,
+        collection_name: str,
+        refresh_interval_seconds: float = 60,
+        manual_tag: str | None = None,
+    ):
+        self.kg_file_path = kg_file_path
+        self.collection_name = collection_name
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.manual_tag = manual_tag or ""
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._version = None
+        self._collection_fingerprint = ""
+        self._last_refresh = 0.0
+
+    def add_listener(self, callback):
+        """callback(new_version) được gọi mỗi khi phiên bản dữ liệu thay đổi."""
+        self._listeners.append(callback)
+
+    def _kg_fingerprint(self) -> str:
+        try:
+            stat = os.stat(self.kg_file_path)
+            return f"{stat.st_mtime_ns}:{stat.st_size}"
+        except OSError:
+            return "missing"
+
+    @staticmethod
+    def _fingerprint_from_collection_info(collection_info) -> str:
+        return f"{collection_info.points_count}:{collection_info.config.params.vectors}"
+
+    def _update(self, collection_fingerprint: str | None) -> str:
+        with self._lock:
+            if collection_fingerprint is not None:
+                self._collection_fingerprint = collection_fingerprint
+            raw = f"{self._kg_fingerprint()}|{self._collection_fingerprint}|{self.manual_tag}"
+            new_version = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+            changed = self._version is not None and new_version != self._version
+            self._version = new_version
+            self._last_refresh = time.monotonic()
+        if changed:
+            print(
+                f"Thông tin (DataVersion): Dữ liệu KG/Qdrant đã thay đổi, phiên bản mới: {new_version}. Vô hiệu hóa các cache liên quan."
+            )
+            for callback in self._listeners:
+                callback(new_version)
+        return new_version
+
+    def _needs_refresh(self) -> bool:
+        return (
+            self._version is None
+            or time.monotonic() - self._last_refresh >= self.refresh_interval_seconds
+        )
+
+    def refresh_from_collection_info(self, collection_info) -> str:
+        """Làm mới phiên bản từ thông tin collection đã có sẵn (ví dụ đọc lúc startup)."""
+        return self._update(self._fingerprint_from_collection_info(collection_info))
+
+    def refresh(self, qdrant_client) -> str:
+        """Làm mới phiên bản bằng QdrantClient (sync)."""
+        collection_fingerprint = None
+        try:
+            collection_fingerprint = self._fingerprint_from_collection_info(
+                qdrant_client.get_collection(collection_name=self.collection_name)
+            )
+        except Exception as e_info:
+            print(f"CẢNH BÁO (DataVersion): Không lấy được thông tin collection: {e_info}")
+        return self._update(collection_fingerprint)
+
+    async def get_version_async(self, async_qdrant_client) -> str:
+        """Trả về phiên bản hiện tại, làm mới (qua AsyncQdrantClient) nếu đã quá refresh_interval_seconds."""
+        if not self._needs_refresh():
+            return self._version
+        collection_fingerprint = None
+        try:
+            collection_fingerprint = self._fingerprint_from_collection_info(
+                await async_qdrant_client.get_collection(
+                    collection_name=self.collection_name
+                )
+            )
+        except Exception as e_info:
+            print(f"CẢNH BÁO (DataVersion): Không lấy được thông tin collection: {e_info}")
+        return self._update(collection_fingerprint)
+
+    @property
+    def version(self) -> str | None:
+        return self._version
@@ -0,0 +1,42 @@
+# src/utils/histogram.py
+import bisect
+import threading
+
+
+class Histogram:
+    """
+    Histogram đơn giản với các ngưỡng bucket cố định (kiểu Prometheus: mỗi bucket đếm số
+    quan sát <= ngưỡng, cộng thêm bucket "+Inf"). An toàn khi dùng từ nhiều thread.
+    """
+
+    def __init__(self, bucket_bounds: list[float]):
+        self.bucket_bounds = sorted(bucket_bounds)
+        self._counts = [0] * (len(self.bucket_bounds) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max_value = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bucket_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max_value:
+                self.max_value = value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = {}
+            cumulative = 0
+            for bound, bucket_count in zip(self.bucket_bounds, self._counts):
+                cumulative += bucket_count
+                buckets[f"<={bound:g}"] = cumulative
+            buckets["+Inf"] = cumulative + self._counts[-1]
+            return {
+                "count": self.count,
+                "mean": round(self.total / self.count, 3) if self.count else 0.0,
+                "max": round(self.max_value, 3),
+                "buckets": buckets,
+            }
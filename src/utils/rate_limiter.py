@@ -0,0 +1,51 @@
+# src/utils/rate_limiter.py
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket đơn giản: `rate_per_minute` request/phút, cho phép burst tối đa `capacity`
+    (mặc định bằng quota một phút, vì quota Gemini tính theo phút chứ không theo giây).
+    Lớp này KHÔNG tự khóa; nơi gọi (ví dụ GeminiApiKeyManager) phải giữ lock khi dùng chung giữa các thread.
+    """
+
+    __slots__ = ("rate_per_second", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        self.rate_per_second = max(float(rate_per_minute), 0.0) / 60.0
+        self.capacity = (
+            float(capacity) if capacity else max(1.0, float(rate_per_minute))
+        )
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated_at:
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.updated_at) * self.rate_per_second,
+            )
+            self.updated_at = now
+
+    def has_token(self, now: float | None = None) -> bool:
+        if self.rate_per_second <= 0:  # rate <= 0 nghĩa là không giới hạn
+            return True
+        self._refill(time.monotonic() if now is None else now)
+        return self.tokens >= 1.0
+
+    def consume(self, now: float | None = None) -> bool:
+        if self.rate_per_second <= 0:
+            return True
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def seconds_until_available(self, now: float | None = None) -> float:
+        if self.rate_per_second <= 0:
+            return 0.0
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate_per_second
@@ -0,0 +1,108 @@
+# src/vector_store/incremental_index.py
+"""
+Index lại tăng dần: ID điểm được suy ra cố định từ graph_node_id + hash nội dung, nên chạy lại
+pipeline trên KG gần như không đổi chỉ phải embed / upsert các node mới hoặc đã sửa, thay vì
+embed lại toàn bộ (và nhân đôi collection với uuid4 như trước).
+
+- content_hash: sha256 của văn bản embed + chữ ký embedding (model, task type, số chiều);
+  đổi model embedding -> mọi hash đổi -> embed lại toàn bộ.
+- point ID = uuid5(namespace cố định, "<graph_node_id>|<content_hash>"): nội dung đổi -> ID mới,
+  điểm cũ bị xóa sau khi điểm mới đã upsert.
+- Chỉ payload đổi (ví dụ thêm trường mới) -> ghi đè payload, không embed lại.
+- Với mỗi điểm đã có chỉ giữ (graph_node_id, dấu vân tay payload) thay vì cả payload (có thể
+  chứa toàn văn node), nên bộ nhớ so sánh nhỏ dù vẫn tỉ lệ với số điểm của collection.
+"""
+import hashlib
+import json
+import uuid
+from typing import Any, Dict, List, Tuple
+
+# Namespace cố định cho uuid5 của các điểm KG (không được đổi, nếu không mọi ID sẽ đổi theo)
+POINT_ID_NAMESPACE = uuid.UUID("6f1c7f4e-2b1a-5c8e-9d3f-4a6b8c0d2e1f")
+
+ITEM_NEEDS_EMBEDDING = "embed"  # ID chưa có: node mới hoặc nội dung đã đổi
+ITEM_NEEDS_PAYLOAD_UPDATE = "payload"  # ID đã có, chỉ payload khác
+ITEM_UNCHANGED = "unchanged"
+
+
+def compute_content_hash(text_to_embed: str, embedding_signature: str = "") -> str:
+    hasher = hashlib.sha256()
+    hasher.update(embedding_signature.encode("utf-8"))
+    hasher.update(b"\x00")
+    hasher.update(text_to_embed.encode("utf-8"))
+    return hasher.hexdigest()[:32]
+
+
+def deterministic_point_id(graph_node_id: str, content_hash: str) -> str:
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{graph_node_id}|{content_hash}"))
+
+
+def payload_fingerprint(payload: dict) -> str:
+    """sha256 rút gọn của payload (JSON, khóa đã sắp xếp), để so sánh mà không giữ cả payload."""
+    encoded = json.dumps(
+        payload or {}, sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+
+
+def fetch_existing_points(
+    qdrant_client, collection_name: str, page_size: int = 1024
+) -> Dict[str, Tuple[str, str]]:
+    """
+    {point_id: (graph_node_id, payload_fingerprint)} của toàn bộ collection (scroll, không lấy
+    vector); payload chỉ nằm trong bộ nhớ theo từng trang.
+    """
+    existing_points: Dict[str, Tuple[str, str]] = {}
+    offset = None
+    while True:
+        records, offset = qdrant_client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        for record in records:
+            payload = record.payload or {}
+            existing_points[str(record.id)] = (
+                payload.get("graph_node_id"),
+                payload_fingerprint(payload),
+            )
+        if offset is None:
+            break
+    return existing_points
+
+
+def classify_item(
+    item: Dict[str, Any], existing_points: Dict[str, Tuple[str, str]]
+) -> str:
+    """Việc cần làm với một mục (qdrant_id, payload) so với collection hiện có."""
+    existing_point = existing_points.get(item["qdrant_id"])
+    if existing_point is None:
+        return ITEM_NEEDS_EMBEDDING
+    if existing_point[1] != payload_fingerprint(item["payload"]):
+        return ITEM_NEEDS_PAYLOAD_UPDATE
+    return ITEM_UNCHANGED
+
+
+def stale_point_ids_of(
+    existing_points: Dict[str, Tuple[str, str]], wanted_ids: set
+) -> List[str]:
+    """Điểm đang có trong collection nhưng không còn tương ứng với mục nào."""
+    return [point_id for point_id in existing_points if point_id not in wanted_ids]
+
+
+def stale_ids_safe_to_delete(
+    stale_point_ids: List[str],
+    existing_points: Dict[str, Tuple[str, str]],
+    failed_graph_node_ids: set,
+) -> List[str]:
+    """
+    Bỏ khỏi danh sách xóa các điểm cũ của node mà bản mới embed / upsert thất bại,
+    để node đó vẫn tìm được (bằng nội dung cũ) cho tới lần index sau.
+    """
+    return [
+        point_id
+        for point_id in stale_point_ids
+        if existing_points.get(point_id, (None, None))[0] not in failed_graph_node_ids
+    ]
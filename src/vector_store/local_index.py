@@ -0,0 +1,699 @@
+# src/vector_store/local_index.py
+"""
+Chỉ mục vector chạy ngay trong process, thay thế Qdrant cho dev / CI / benchmark / triển khai nhỏ
+(config.VECTOR_STORE_BACKEND = "local").
+
+LocalVectorIndex cài đặt đúng phần giao diện QdrantClient mà qdrant_service dùng (upsert, delete,
+batch_update_points, scroll, search, query_points, query_batch_points, get_collection,
+collection_exists, close), nên
+upsert_data_to_qdrant / search_qdrant_collection* chạy không cần sửa; AsyncLocalVectorIndex là
+bản async tương ứng cho đường request của API.
+
+- Vector được chuẩn hóa L2 (distance Cosine như collection Qdrant) và lưu thành ma trận
+  float32 hoặc float16; khi mở từ snapshot, ma trận được np.load(mmap_mode="r") nên các worker
+  dùng chung trang bộ nhớ của OS.
+- Tìm kiếm: tích vô hướng NumPy theo khối + argpartition lấy top-k (brute force, chính xác).
+  Tùy chọn chỉ mục IVF (k-means): chỉ chấm điểm các cụm gần nhất (nprobe), SearchParams(exact=True)
+  bỏ qua IVF.
+- Bộ lọc: models.Filter với must / must_not gồm FieldCondition MatchValue / MatchAny
+  (đúng dạng search_filters.build_search_filter tạo ra).
+- Sparse vector (tìm kiếm hybrid) không được hỗ trợ: truy vấn hybrid chỉ dùng nhánh dense.
+
+Snapshot là một thư mục: vectors.npy (ma trận), points.json (id + payload), ivf.npz (nếu có).
+"""
+import json
+import os
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from qdrant_client import models
+from qdrant_client.http.models import QueryResponse
+
+_VECTORS_FILE = "vectors.npy"
+_POINTS_FILE = "points.json"
+_IVF_FILE = "ivf.npz"
+# Số hàng chấm điểm mỗi lần (giới hạn bộ nhớ tạm khi đổi float16 -> float32)
+_SCORE_BLOCK_ROWS = 65536
+# Dung lượng tối thiểu (số hàng) của bộ đệm vector khi bắt đầu ghi thêm
+_MIN_BUFFER_ROWS = 64
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _dense_vector_of_point(vector) -> Optional[list]:
+    """Vector dense của một PointStruct: list, hoặc named vectors {"": dense, "<sparse>": ...}."""
+    if isinstance(vector, dict):
+        return vector.get("")
+    return vector
+
+
+class LocalVectorIndex:
+    """Một "collection" vector trong process: ma trận vector + id + payload theo hàng."""
+
+    def __init__(
+        self,
+        collection_name: str,
+        vector_dimension: int,
+        dtype: str = "float32",
+        ivf_nprobe: int = 8,
+    ):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"dtype không hợp lệ: '{dtype}' (chỉ hỗ trợ float32, float16).")
+        self.collection_name = collection_name
+        self.vector_dimension = vector_dimension
+        self.dtype = np.dtype(dtype)
+        self.ivf_nprobe = max(1, int(ivf_nprobe))
+        self._vectors = np.zeros((0, vector_dimension), dtype=self.dtype)
+        # Bộ đệm ghi được có dư chỗ (dung lượng tăng gấp đôi khi đầy); khi khác None,
+        # self._vectors luôn là view self._buffer[:số điểm]. None: chưa ghi / ma trận mmap.
+        self._buffer: Optional[np.ndarray] = None
+        self._ids: List[Any] = []
+        self._payloads: List[dict] = []
+        self._row_of_id: Dict[Any, int] = {}
+        # field -> {giá trị -> mảng chỉ số hàng}; dựng lười, xóa khi dữ liệu thay đổi
+        self._payload_value_rows: Dict[str, Dict[Any, np.ndarray]] = {}
+        # IVF: tâm cụm + danh sách hàng theo cụm dạng CSR (offsets, rows)
+        self._ivf_centroids: Optional[np.ndarray] = None
+        self._ivf_offsets: Optional[np.ndarray] = None
+        self._ivf_rows: Optional[np.ndarray] = None
+
+    # --- Snapshot ---
+    @classmethod
+    def load_snapshot(
+        cls, snapshot_dir: str, collection_name: str, ivf_nprobe: int = 8
+    ) -> "LocalVectorIndex":
+        vectors = np.load(os.path.join(snapshot_dir, _VECTORS_FILE), mmap_mode="r")
+        with open(os.path.join(snapshot_dir, _POINTS_FILE), "r", encoding="utf-8") as f:
+            points_data = json.load(f)
+        if len(points_data["ids"]) != vectors.shape[0]:
+            raise ValueError(
+                f"Snapshot '{snapshot_dir}' không nhất quán: {len(points_data['ids'])} id, {vectors.shape[0]} vector."
+            )
+        index = cls(
+            collection_name,
+            vectors.shape[1],
+            dtype=str(vectors.dtype),
+            ivf_nprobe=ivf_nprobe,
+        )
+        index._vectors = vectors
+        index._ids = points_data["ids"]
+        index._payloads = points_data["payloads"]
+        index._row_of_id = {point_id: row for row, point_id in enumerate(index._ids)}
+        ivf_path = os.path.join(snapshot_dir, _IVF_FILE)
+        if os.path.exists(ivf_path):
+            with np.load(ivf_path) as ivf_data:
+                if int(ivf_data["num_points"]) == vectors.shape[0]:
+                    index._ivf_centroids = ivf_data["centroids"]
+                    index._ivf_offsets = ivf_data["offsets"]
+                    index._ivf_rows = ivf_data["rows"]
+                else:
+                    print(
+                        f"CẢNH BÁO (Local Index): Chỉ mục IVF trong '{snapshot_dir}' đã cũ, bỏ qua (tìm kiếm brute force)."
+                    )
+        return index
+
+    def save_snapshot(self, snapshot_dir: str) -> str:
+        """Ghi snapshot (file tạm rồi os.replace; points.json ghi sau cùng)."""
+        os.makedirs(snapshot_dir, exist_ok=True)
+        vectors_path = os.path.join(snapshot_dir, _VECTORS_FILE)
+        with open(vectors_path + ".tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(self._vectors))
+        os.replace(vectors_path + ".tmp", vectors_path)
+
+        ivf_path = os.path.join(snapshot_dir, _IVF_FILE)
+        if self._ivf_centroids is not None:
+            with open(ivf_path + ".tmp", "wb") as f:
+                np.savez(
+                    f,
+                    centroids=self._ivf_centroids,
+                    offsets=self._ivf_offsets,
+                    rows=self._ivf_rows,
+                    num_points=np.int64(len(self._ids)),
+                )
+            os.replace(ivf_path + ".tmp", ivf_path)
+        elif os.path.exists(ivf_path):
+            os.remove(ivf_path)
+
+        points_path = os.path.join(snapshot_dir, _POINTS_FILE)
+        with open(points_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(
+                {"ids": self._ids, "payloads": self._payloads}, f, ensure_ascii=False
+            )
+        os.replace(points_path + ".tmp", points_path)
+        return snapshot_dir
+
+    # --- Ghi dữ liệu ---
+    def _check_collection(self, collection_name: str):
+        if collection_name != self.collection_name:
+            raise ValueError(
+                f"Collection '{collection_name}' không tồn tại trong chỉ mục cục bộ ('{self.collection_name}')."
+            )
+
+    def upsert(self, collection_name: str, points: list, wait: bool = True, **kwargs):
+        self._check_collection(collection_name)
+        if not points:
+            return None
+        new_rows = []
+        new_vectors = []
+        replaced_rows = []
+        replaced_vectors = []
+        pending_new_ids: Dict[Any, int] = {}
+        for point in points:
+            dense_vector = _dense_vector_of_point(point.vector)
+            if dense_vector is None or len(dense_vector) != self.vector_dimension:
+                raise ValueError(
+                    f"Điểm '{point.id}' không có vector dense {self.vector_dimension} chiều."
+                )
+            point_id = str(point.id) if not isinstance(point.id, int) else point.id
+            payload = dict(point.payload or {})
+            if point_id in self._row_of_id:
+                row = self._row_of_id[point_id]
+                self._payloads[row] = payload
+                replaced_rows.append(row)
+                replaced_vectors.append(dense_vector)
+            elif point_id in pending_new_ids:
+                position = pending_new_ids[point_id]
+                new_rows[position] = (point_id, payload)
+                new_vectors[position] = dense_vector
+            else:
+                pending_new_ids[point_id] = len(new_rows)
+                new_rows.append((point_id, payload))
+                new_vectors.append(dense_vector)
+
+        num_rows = self._vectors.shape[0]
+        buffer = self._reserve_rows(len(new_rows))
+        if replaced_rows:
+            buffer[replaced_rows] = _normalize_rows(
+                np.asarray(replaced_vectors, dtype=np.float32)
+            ).astype(self.dtype)
+        if new_rows:
+            buffer[num_rows : num_rows + len(new_rows)] = _normalize_rows(
+                np.asarray(new_vectors, dtype=np.float32)
+            ).astype(self.dtype)
+            for point_id, payload in new_rows:
+                self._row_of_id[point_id] = len(self._ids)
+                self._ids.append(point_id)
+                self._payloads.append(payload)
+        self._vectors = buffer[: num_rows + len(new_rows)]
+        self._payload_value_rows = {}
+        self._drop_ivf_if_built()
+        return models.UpdateResult(
+            operation_id=0, status=models.UpdateStatus.COMPLETED
+        )
+
+    def _reserve_rows(self, extra_rows: int) -> np.ndarray:
+        """
+        Bộ đệm ghi được, đủ chỗ cho thêm extra_rows hàng. Khi hết chỗ, dung lượng tăng gấp đôi
+        nên dựng index theo từng batch chỉ chép toàn bộ ma trận O(log N) lần thay vì mỗi batch.
+        Ma trận mở từ snapshot là mmap chỉ đọc: được chép ra bộ nhớ ở lần ghi đầu tiên.
+        """
+        num_rows = self._vectors.shape[0]
+        needed_rows = num_rows + extra_rows
+        buffer = self._buffer
+        if buffer is not None and buffer.shape[0] >= needed_rows:
+            return buffer
+        if extra_rows == 0:
+            capacity = needed_rows  # Chỉ ghi đè hàng cũ: không cần chỗ dư
+        else:
+            current_capacity = buffer.shape[0] if buffer is not None else num_rows
+            capacity = max(needed_rows, 2 * current_capacity, _MIN_BUFFER_ROWS)
+        new_buffer = np.empty((capacity, self.vector_dimension), dtype=self.dtype)
+        new_buffer[:num_rows] = self._vectors
+        self._buffer = new_buffer
+        return new_buffer
+
+    def _drop_ivf_if_built(self):
+        if self._ivf_centroids is not None:
+            print(
+                "CẢNH BÁO (Local Index): Dữ liệu thay đổi, chỉ mục IVF bị hủy (gọi build_ivf để dựng lại)."
+            )
+            self._ivf_centroids = self._ivf_offsets = self._ivf_rows = None
+
+    def delete(self, collection_name: str, points_selector, wait: bool = True, **kwargs):
+        self._check_collection(collection_name)
+        point_ids = (
+            points_selector.points
+            if isinstance(points_selector, models.PointIdsList)
+            else points_selector
+        )
+        rows_to_delete = {
+            self._row_of_id[point_id]
+            for point_id in (
+                str(point_id) if not isinstance(point_id, int) else point_id
+                for point_id in point_ids
+            )
+            if point_id in self._row_of_id
+        }
+        if rows_to_delete:
+            keep = np.ones(len(self._ids), dtype=bool)
+            keep[list(rows_to_delete)] = False
+            self._vectors = np.asarray(self._vectors)[keep]
+            self._buffer = self._vectors  # Bản chép mới, ghi được, vừa khít số hàng
+            self._ids = [point_id for point_id, kept in zip(self._ids, keep) if kept]
+            self._payloads = [
+                payload for payload, kept in zip(self._payloads, keep) if kept
+            ]
+            self._row_of_id = {point_id: row for row, point_id in enumerate(self._ids)}
+            self._payload_value_rows = {}
+            self._drop_ivf_if_built()
+        return models.UpdateResult(
+            operation_id=0, status=models.UpdateStatus.COMPLETED
+        )
+
+    def batch_update_points(
+        self, collection_name: str, update_operations: list, wait: bool = True, **kwargs
+    ):
+        """Chỉ hỗ trợ OverwritePayloadOperation (ghi đè payload, vector giữ nguyên)."""
+        self._check_collection(collection_name)
+        for operation in update_operations:
+            if not isinstance(operation, models.OverwritePayloadOperation):
+                raise NotImplementedError(
+                    f"Chỉ mục cục bộ không hỗ trợ thao tác {type(operation).__name__}."
+                )
+            set_payload = operation.overwrite_payload
+            for point_id in set_payload.points or []:
+                row = self._row_of_id.get(
+                    str(point_id) if not isinstance(point_id, int) else point_id
+                )
+                if row is not None:
+                    self._payloads[row] = dict(set_payload.payload)
+        self._payload_value_rows = {}
+        return [
+            models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+            for _ in update_operations
+        ]
+
+    def scroll(
+        self,
+        collection_name: str,
+        limit: int = 10,
+        offset=None,
+        with_payload=True,
+        with_vectors: bool = False,
+        **kwargs,
+    ):
+        """Duyệt theo thứ tự hàng; offset là chỉ số hàng (giá trị trả về lần trước)."""
+        self._check_collection(collection_name)
+        start = int(offset or 0)
+        end = min(start + limit, len(self._ids))
+        records = [
+            models.Record(
+                id=self._ids[row],
+                payload=self._payloads[row] if with_payload else None,
+                vector=(
+                    self._vectors[row].astype(np.float32).tolist() if with_vectors else None
+                ),
+            )
+            for row in range(start, end)
+        ]
+        return records, (end if end < len(self._ids) else None)
+
+    def retrieve(
+        self,
+        collection_name: str,
+        ids: list,
+        with_payload=True,
+        with_vectors: bool = False,
+        **kwargs,
+    ):
+        self._check_collection(collection_name)
+        rows = [
+            self._row_of_id[point_id]
+            for point_id in (
+                str(point_id) if not isinstance(point_id, int) else point_id
+                for point_id in ids
+            )
+            if point_id in self._row_of_id
+        ]
+        return [
+            models.Record(
+                id=self._ids[row],
+                payload=self._payloads[row] if with_payload else None,
+                vector=(
+                    self._vectors[row].astype(np.float32).tolist() if with_vectors else None
+                ),
+            )
+            for row in rows
+        ]
+
+    def build_ivf(self, num_lists: int, num_iterations: int = 10, sample_size: int = 50000, seed: int = 0):
+        """
+        Dựng chỉ mục IVF bằng k-means cầu (tâm cụm chuẩn hóa) trên một mẫu tối đa sample_size
+        vector; mỗi vector được gán vào cụm có tâm gần nhất.
+        """
+        num_points = len(self._ids)
+        num_lists = min(int(num_lists), num_points)
+        if num_lists <= 1:
+            self._ivf_centroids = self._ivf_offsets = self._ivf_rows = None
+            return self
+        start_time = time.perf_counter()
+        rng = np.random.default_rng(seed)
+        sample_rows = rng.choice(num_points, size=min(sample_size, num_points), replace=False)
+        sample = np.asarray(self._vectors[np.sort(sample_rows)], dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), size=num_lists, replace=False)]
+        for _ in range(num_iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            empty = np.bincount(assignments, minlength=num_lists) == 0
+            sums[empty] = centroids[empty]  # Cụm rỗng giữ tâm cũ
+            centroids = _normalize_rows(sums)
+
+        assignments = np.empty(num_points, dtype=np.int64)
+        for start in range(0, num_points, _SCORE_BLOCK_ROWS):
+            block = np.asarray(self._vectors[start : start + _SCORE_BLOCK_ROWS], dtype=np.float32)
+            assignments[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        self._ivf_rows = np.argsort(assignments, kind="stable")
+        self._ivf_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(assignments, minlength=num_lists))]
+        )
+        self._ivf_centroids = centroids.astype(np.float32)
+        print(
+            f"Thông tin (Local Index): Đã dựng IVF {num_lists} cụm cho {num_points} vector ({time.perf_counter() - start_time:.1f} giây)."
+        )
+        return self
+
+    # --- Lọc theo payload ---
+    def _rows_with_value(self, field_name: str, values: list) -> np.ndarray:
+        value_rows = self._payload_value_rows.get(field_name)
+        if value_rows is None:
+            grouped: Dict[Any, List[int]] = {}
+            for row, payload in enumerate(self._payloads):
+                field_value = payload.get(field_name)
+                for value in field_value if isinstance(field_value, list) else [field_value]:
+                    if value is not None:
+                        grouped.setdefault(value, []).append(row)
+            value_rows = {
+                value: np.asarray(rows, dtype=np.int64) for value, rows in grouped.items()
+            }
+            self._payload_value_rows[field_name] = value_rows
+        matched = [value_rows[value] for value in values if value in value_rows]
+        if not matched:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(matched))
+
+    def _condition_mask(self, condition) -> np.ndarray:
+        if not isinstance(condition, models.FieldCondition) or condition.match is None:
+            raise NotImplementedError(
+                f"Chỉ mục cục bộ chỉ hỗ trợ FieldCondition với MatchValue/MatchAny (nhận: {condition!r})."
+            )
+        if isinstance(condition.match, models.MatchAny):
+            values = list(condition.match.any)
+        elif isinstance(condition.match, models.MatchValue):
+            values = [condition.match.value]
+        else:
+            raise NotImplementedError(
+                f"Chỉ mục cục bộ không hỗ trợ điều kiện match {type(condition.match).__name__}."
+            )
+        mask = np.zeros(len(self._ids), dtype=bool)
+        mask[self._rows_with_value(condition.key, values)] = True
+        return mask
+
+    def _filter_mask(self, query_filter: Optional[models.Filter]) -> Optional[np.ndarray]:
+        if query_filter is None:
+            return None
+        if query_filter.should or query_filter.min_should:
+            raise NotImplementedError("Chỉ mục cục bộ chỉ hỗ trợ bộ lọc must / must_not.")
+        mask = np.ones(len(self._ids), dtype=bool)
+        for clause, negate in ((query_filter.must, False), (query_filter.must_not, True)):
+            if clause is None:
+                continue
+            for condition in clause if isinstance(clause, list) else [clause]:
+                condition_mask = self._condition_mask(condition)
+                mask &= ~condition_mask if negate else condition_mask
+        return mask
+
+    # --- Tìm kiếm ---
+    def _score_rows(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        if rows is None:
+            num_rows = self._vectors.shape[0]
+            scores = np.empty(num_rows, dtype=np.float32)
+            for start in range(0, num_rows, _SCORE_BLOCK_ROWS):
+                block = self._vectors[start : start + _SCORE_BLOCK_ROWS]
+                scores[start : start + len(block)] = block.astype(np.float32, copy=False) @ query
+            return scores
+        return self._vectors[rows].astype(np.float32, copy=False) @ query
+
+    def _candidate_rows(self, query: np.ndarray, exact: bool) -> Optional[np.ndarray]:
+        """Hàng cần chấm điểm: None = toàn bộ (brute force), hoặc các hàng thuộc nprobe cụm gần nhất."""
+        if exact or self._ivf_centroids is None:
+            return None
+        num_lists = len(self._ivf_centroids)
+        nprobe = min(self.ivf_nprobe, num_lists)
+        centroid_scores = self._ivf_centroids @ query
+        probe_lists = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        return np.concatenate(
+            [
+                self._ivf_rows[self._ivf_offsets[i] : self._ivf_offsets[i + 1]]
+                for i in probe_lists
+            ]
+        )
+
+    def _top_k(
+        self,
+        query_vector: list,
+        limit: int,
+        with_payload=True,
+        search_params: Optional[models.SearchParams] = None,
+        query_filter: Optional[models.Filter] = None,
+        with_vectors: bool = False,
+    ) -> List[models.ScoredPoint]:
+        if not self._ids or limit <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if query_norm > 0:
+            query = query / query_norm
+
+        exact = bool(search_params and search_params.exact)
+        mask = self._filter_mask(query_filter)
+        rows = self._candidate_rows(query, exact)
+        if mask is not None:
+            rows = np.flatnonzero(mask) if rows is None else rows[mask[rows]]
+            if len(rows) < limit and not exact and self._ivf_centroids is not None:
+                rows = np.flatnonzero(mask)  # Cụm gần không đủ điểm thỏa bộ lọc
+        elif rows is not None and len(rows) < limit:
+            rows = None
+        if rows is not None and len(rows) == 0:
+            return []
+
+        scores = self._score_rows(query, rows)
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        results = []
+        for position in top:
+            row = int(rows[position]) if rows is not None else int(position)
+            payload = None
+            if with_payload is True:
+                payload = self._payloads[row]
+            elif isinstance(with_payload, list):
+                payload = {
+                    key: value
+                    for key, value in self._payloads[row].items()
+                    if key in with_payload
+                }
+            results.append(
+                models.ScoredPoint(
+                    id=self._ids[row],
+                    version=0,
+                    score=float(scores[position]),
+                    payload=payload,
+                    vector=(
+                        self._vectors[row].astype(np.float32).tolist()
+                        if with_vectors
+                        else None
+                    ),
+                )
+            )
+        return results
+
+    def search(
+        self,
+        collection_name: str,
+        query_vector: list,
+        limit: int = 10,
+        with_payload=True,
+        search_params: Optional[models.SearchParams] = None,
+        query_filter: Optional[models.Filter] = None,
+        timeout: Optional[int] = None,
+        with_vectors: bool = False,
+        **kwargs,
+    ) -> List[models.ScoredPoint]:
+        self._check_collection(collection_name)
+        return self._top_k(
+            query_vector, limit, with_payload, search_params, query_filter, with_vectors
+        )
+
+    @staticmethod
+    def _dense_query_of(query, prefetch, search_params, query_filter):
+        """Truy vấn hybrid (prefetch dense + sparse, RRF) -> chỉ dùng nhánh dense."""
+        if prefetch:
+            for prefetch_query in prefetch if isinstance(prefetch, list) else [prefetch]:
+                if prefetch_query.using in (None, "") and isinstance(prefetch_query.query, list):
+                    return (
+                        prefetch_query.query,
+                        prefetch_query.params or search_params,
+                        prefetch_query.filter or query_filter,
+                    )
+        if not isinstance(query, list):
+            raise NotImplementedError(
+                f"Chỉ mục cục bộ chỉ hỗ trợ truy vấn bằng dense vector (nhận: {type(query).__name__})."
+            )
+        return query, search_params, query_filter
+
+    def query_points(
+        self,
+        collection_name: str,
+        query=None,
+        prefetch=None,
+        limit: int = 10,
+        with_payload=True,
+        search_params: Optional[models.SearchParams] = None,
+        query_filter: Optional[models.Filter] = None,
+        timeout: Optional[int] = None,
+        with_vectors: bool = False,
+        **kwargs,
+    ) -> QueryResponse:
+        self._check_collection(collection_name)
+        dense_query, params, dense_filter = self._dense_query_of(
+            query, prefetch, search_params, query_filter
+        )
+        return QueryResponse(
+            points=self._top_k(
+                dense_query, limit, with_payload, params, dense_filter, with_vectors
+            )
+        )
+
+    def query_batch_points(
+        self, collection_name: str, requests: list, timeout: Optional[int] = None, **kwargs
+    ) -> List[QueryResponse]:
+        self._check_collection(collection_name)
+        responses = []
+        for request in requests:
+            dense_query, params, dense_filter = self._dense_query_of(
+                request.query, request.prefetch, request.params, request.filter
+            )
+            responses.append(
+                QueryResponse(
+                    points=self._top_k(
+                        dense_query,
+                        request.limit or 10,
+                        request.with_payload if request.with_payload is not None else True,
+                        params,
+                        dense_filter,
+                        bool(request.with_vector),
+                    )
+                )
+            )
+        return responses
+
+    # --- Thông tin collection ---
+    def collection_exists(self, collection_name: str, **kwargs) -> bool:
+        return collection_name == self.collection_name
+
+    def get_collection(self, collection_name: str, **kwargs):
+        """Thông tin tối thiểu cùng dạng CollectionInfo (points_count, status, config.params)."""
+        self._check_collection(collection_name)
+        return SimpleNamespace(
+            status=models.CollectionStatus.GREEN,
+            points_count=len(self._ids),
+            config=SimpleNamespace(
+                params=SimpleNamespace(
+                    vectors=models.VectorParams(
+                        size=self.vector_dimension, distance=models.Distance.COSINE
+                    ),
+                    sparse_vectors=None,
+                )
+            ),
+        )
+
+    def stats(self) -> dict:
+        return {
+            "points": len(self._ids),
+            "dimension": self.vector_dimension,
+            "dtype": str(self.dtype),
+            "memory_mapped": isinstance(self._vectors, np.memmap),
+            "ivf_lists": len(self._ivf_centroids) if self._ivf_centroids is not None else 0,
+            "ivf_nprobe": self.ivf_nprobe,
+        }
+
+    def close(self, **kwargs):
+        return None
+
+
+class AsyncLocalVectorIndex:
+    """
+    Bản async của LocalVectorIndex (cùng giao diện AsyncQdrantClient). Tìm kiếm NumPy đủ nhanh
+    để chạy thẳng trong event loop, không cần executor.
+    """
+
+    def __init__(self, index: LocalVectorIndex):
+        self.index = index
+
+    async def search(self, *args, **kwargs):
+        return self.index.search(*args, **kwargs)
+
+    async def query_points(self, *args, **kwargs):
+        return self.index.query_points(*args, **kwargs)
+
+    async def query_batch_points(self, *args, **kwargs):
+        return self.index.query_batch_points(*args, **kwargs)
+
+    async def upsert(self, *args, **kwargs):
+        return self.index.upsert(*args, **kwargs)
+
+    async def get_collection(self, *args, **kwargs):
+        return self.index.get_collection(*args, **kwargs)
+
+    async def collection_exists(self, *args, **kwargs):
+        return self.index.collection_exists(*args, **kwargs)
+
+    async def close(self, **kwargs):
+        return self.index.close()
+
+
+def open_local_vector_index(
+    snapshot_dir: str,
+    collection_name: str,
+    vector_dimension: int,
+    dtype: str = "float32",
+    ivf_nprobe: int = 8,
+    create_if_missing: bool = False,
+) -> Optional[LocalVectorIndex]:
+    """
+    Mở chỉ mục cục bộ từ snapshot; nếu snapshot chưa có thì tạo chỉ mục rỗng
+    (create_if_missing, dùng cho pipeline ghi dữ liệu) hoặc trả về None.
+    """
+    if os.path.exists(os.path.join(snapshot_dir, _POINTS_FILE)):
+        try:
+            index = LocalVectorIndex.load_snapshot(
+                snapshot_dir, collection_name, ivf_nprobe=ivf_nprobe
+            )
+        except Exception as e_load:
+            print(
+                f"LỖI (Local Index): Không đọc được snapshot '{snapshot_dir}': {type(e_load).__name__} - {e_load}"
+            )
+            return None
+        if index.vector_dimension != vector_dimension:
+            print(
+                f"CẢNH BÁO (Local Index): Snapshot có vector {index.vector_dimension} chiều, cấu hình là {vector_dimension}."
+            )
+        print(
+            f"Thông tin (Local Index): Đã mở snapshot '{snapshot_dir}' ({index.stats()})."
+        )
+        return index
+    if not create_if_missing:
+        print(f"LỖI (Local Index): Không tìm thấy snapshot chỉ mục cục bộ tại '{snapshot_dir}'.")
+        return None
+    print(f"Thông tin (Local Index): Tạo chỉ mục cục bộ rỗng '{collection_name}' ({dtype}).")
+    return LocalVectorIndex(
+        collection_name, vector_dimension, dtype=dtype, ivf_nprobe=ivf_nprobe
+    )
@@ -1,10 +1,145 @@
 # src/vector_store/qdrant_service.py
+import grpc
+import httpx
 from qdrant_client import (
+    AsyncQdrantClient,
     QdrantClient,
     models,
 )  # Đảm bảo models được import từ qdrant_client
+from qdrant_client.http.exceptions import UnexpectedResponse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import random
+import threading
 import time
 
+# Thông tin collection đọc được lúc initialize_qdrant_and_collection (một lần khi khởi tạo),
+# dùng lại cho các kiểm tra lúc startup thay vì gọi get_collection thêm.
+_startup_collection_info = {}
+
+
+def build_qdrant_client_kwargs(
+    connection_params: dict, transport_params: dict | None = None
+) -> dict:
+    """
+    Gộp tham số kết nối (url/api_key hoặc host/port) với tham số transport:
+    - prefer_grpc / grpc_port: dùng gRPC (kênh HTTP/2 dài hạn, keep-alive ping).
+    - http2 + pool_max_connections + keepalive_seconds: pool httpx giữ kết nối REST ấm.
+    - timeout: timeout mặc định (giây) của client; check_compatibility: gọi kiểm tra phiên bản
+      server khi tạo client (thêm một round trip).
+    """
+    final_connection_params = connection_params.copy()
+    transport_params = transport_params or {}
+    if "timeout" in transport_params:
+        final_connection_params["timeout"] = transport_params["timeout"]
+    elif "timeout" not in final_connection_params:
+        final_connection_params["timeout"] = 20  # Giây
+
+    keepalive_seconds = transport_params.get("keepalive_seconds")
+    if transport_params.get("prefer_grpc"):
+        final_connection_params["prefer_grpc"] = True
+        final_connection_params["grpc_port"] = transport_params.get("grpc_port", 6334)
+        if keepalive_seconds:
+            final_connection_params["grpc_options"] = {
+                "grpc.keepalive_time_ms": int(keepalive_seconds * 1000),
+                "grpc.keepalive_timeout_ms": 10000,
+                "grpc.keepalive_permit_without_calls": 1,
+                "grpc.http2.max_pings_without_data": 0,
+            }
+    if transport_params.get("http2"):
+        final_connection_params["http2"] = True
+    pool_max_connections = transport_params.get("pool_max_connections")
+    if pool_max_connections:
+        final_connection_params["limits"] = httpx.Limits(
+            max_connections=pool_max_connections,
+            max_keepalive_connections=pool_max_connections,
+            keepalive_expiry=keepalive_seconds or 5.0,
+        )
+    if "check_compatibility" in transport_params:
+        final_connection_params["check_compatibility"] = transport_params[
+            "check_compatibility"
+        ]
+    return final_connection_params
+
+
+def _display_connection_params(final_connection_params: dict) -> dict:
+    # Che api_key khi in ra log
+    return {
+        k: (v if k != "api_key" else "********")
+        for k, v in final_connection_params.items()
+        if k not in ("limits", "grpc_options")
+    }
+
+
+def build_collection_profile_kwargs(collection_profile: dict | None) -> dict:
+    """
+    Chuyển một profile collection (config.QDRANT_COLLECTION_PROFILES) thành tham số
+    create_collection: hnsw_config (m, ef_construct) và quantization_config (scalar int8 /
+    binary, giữ bản lượng tử hóa trong RAM). on_disk của vector gốc được xử lý khi tạo VectorParams.
+    """
+    if not collection_profile:
+        return {}
+    collection_kwargs = {
+        "hnsw_config": models.HnswConfigDiff(
+            m=collection_profile.get("hnsw_m"),
+            ef_construct=collection_profile.get("hnsw_ef_construct"),
+        )
+    }
+    quantization = collection_profile.get("quantization")
+    always_ram = collection_profile.get("quantization_always_ram", True)
+    if quantization == "scalar":
+        collection_kwargs["quantization_config"] = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=always_ram
+            )
+        )
+    elif quantization == "binary":
+        collection_kwargs["quantization_config"] = models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=always_ram)
+        )
+    return collection_kwargs
+
+
+def build_search_params(collection_profile: dict | None) -> models.SearchParams | None:
+    """SearchParams cho mỗi lần tìm kiếm theo profile: hnsw_ef và rescore/oversampling khi có quantization."""
+    if not collection_profile:
+        return None
+    quantization_params = None
+    if collection_profile.get("quantization"):
+        quantization_params = models.QuantizationSearchParams(
+            rescore=collection_profile.get("search_rescore", True),
+            oversampling=collection_profile.get("search_oversampling"),
+        )
+    return models.SearchParams(
+        hnsw_ef=collection_profile.get("search_hnsw_ef"),
+        exact=collection_profile.get("search_exact", False),
+        quantization=quantization_params,
+    )
+
+
+def _describe_quantization(quantization_config) -> str:
+    if isinstance(quantization_config, models.ScalarQuantization):
+        return "scalar"
+    if isinstance(quantization_config, models.BinaryQuantization):
+        return "binary"
+    if isinstance(quantization_config, models.ProductQuantization):
+        return "product"
+    return "none"
+
+
+def _get_collection_info_or_none(client: QdrantClient, collection_name: str):
+    """Một lần gọi get_collection: trả về thông tin collection, hoặc None nếu chưa tồn tại."""
+    try:
+        return client.get_collection(collection_name=collection_name)
+    except UnexpectedResponse as e_http:
+        if e_http.status_code == 404:
+            return None
+        raise
+    except grpc.RpcError as e_grpc:
+        if e_grpc.code() == grpc.StatusCode.NOT_FOUND:
+            return None
+        raise
+
 
 def initialize_qdrant_and_collection(
     connection_params: dict,  # <<---- THAM SỐ ĐÚNG LÀ ĐÂY
@@ -12,11 +147,21 @@ def initialize_qdrant_and_collection(
     vector_dimension: int,
     distance_metric=models.Distance.COSINE,  # distance_metric từ models của qdrant_client
     recreate_collection: bool = False,
+    sparse_vector_name: str | None = None,
+    transport_params: dict | None = None,
+    collection_profile: dict | None = None,
+    payload_index_fields: list[str] | None = None,
 ) -> QdrantClient | None:
     """
     Khởi tạo Qdrant client và đảm bảo collection tồn tại với cấu hình đúng.
     connection_params là một dict chứa 'url' (và 'api_key' nếu có) cho cloud,
     hoặc 'host' và 'port' cho local.
+    sparse_vector_name: nếu có, collection mới được tạo kèm sparse vector (IDF do Qdrant tính)
+    để tìm kiếm hybrid dense + sparse.
+    transport_params: xem build_qdrant_client_kwargs (gRPC, pool keep-alive, timeout).
+    collection_profile: HNSW / on-disk / quantization khi tạo collection mới
+    (xem build_collection_profile_kwargs).
+    payload_index_fields: các trường payload cần keyword index (tạo nếu chưa có) để lọc nhanh.
     """
     if not connection_params or not (
         connection_params.get("url") or connection_params.get("host")
@@ -27,19 +172,13 @@ def initialize_qdrant_and_collection(
         return None
 
     try:
-        # Thêm timeout mặc định nếu chưa có trong connection_params
-        final_connection_params = connection_params.copy()
-        if "timeout" not in final_connection_params:
-            final_connection_params["timeout"] = 20  # Giây
+        final_connection_params = build_qdrant_client_kwargs(
+            connection_params, transport_params
+        )
 
         if final_connection_params.get("url"):
-            # Che api_key khi in ra log
-            display_params = {
-                k: (v if k != "api_key" else "********")
-                for k, v in final_connection_params.items()
-            }
             print(
-                f"Thông tin (Qdrant Service): Đang thử kết nối tới Qdrant với params: {display_params}"
+                f"Thông tin (Qdrant Service): Đang thử kết nối tới Qdrant với params: {_display_connection_params(final_connection_params)}"
             )
         else:  # Local connection
             print(
@@ -48,23 +187,24 @@ def initialize_qdrant_and_collection(
 
         client = QdrantClient(**final_connection_params)  # Sử dụng ** để unpack dict
 
-        # Kiểm tra collection
-        existing_collections_response = client.get_collections()
-        existing_collection_names = [
-            col.name for col in existing_collections_response.collections
-        ]
-        collection_exists = collection_name in existing_collection_names
-
-        if collection_exists and recreate_collection:
+        # Kiểm tra collection: chỉ một lần get_collection (404 = chưa tồn tại)
+        _startup_collection_info.pop(collection_name, None)
+        if recreate_collection:
             print(
-                f"Collection '{collection_name}' tồn tại và recreate_collection=True. Đang xóa collection cũ..."
+                f"recreate_collection=True. Đang xóa collection cũ '{collection_name}' (nếu có)..."
             )
-            client.delete_collection(collection_name=collection_name)
-            print(f"Đã xóa collection '{collection_name}'.")
-            collection_exists = False  # Để tạo lại ở bước sau
+            try:
+                if client.delete_collection(collection_name=collection_name):
+                    print(f"Đã xóa collection '{collection_name}'.")
+            except UnexpectedResponse as e_delete:
+                if e_delete.status_code != 404:
+                    raise
+            collection_info = None  # Để tạo lại ở bước sau
+        else:
+            collection_info = _get_collection_info_or_none(client, collection_name)
 
-        if collection_exists:
-            collection_info = client.get_collection(collection_name=collection_name)
+        if collection_info is not None:
+            _startup_collection_info[collection_name] = collection_info
             print(f"Collection '{collection_name}' đã tồn tại.")
 
             current_vector_size = None
@@ -99,23 +239,59 @@ def initialize_qdrant_and_collection(
                 print(
                     f"CẢNH BÁO: Không xác định được kích thước vector cho collection '{collection_name}'. Cấu trúc: {vectors_cfg}"
                 )
+            if collection_profile:
+                current_quantization = _describe_quantization(
+                    collection_info.config.quantization_config
+                )
+                expected_quantization = collection_profile.get("quantization") or "none"
+                if current_quantization != expected_quantization:
+                    print(
+                        f"CẢNH BÁO: Collection '{collection_name}' đang dùng quantization '{current_quantization}', "
+                        f"khác với profile ('{expected_quantization}'). Tạo lại collection để áp dụng profile."
+                    )
+            if sparse_vector_name and not collection_info_has_sparse_vector(
+                collection_info, sparse_vector_name
+            ):
+                print(
+                    f"CẢNH BÁO: Collection '{collection_name}' chưa có sparse vector '{sparse_vector_name}' "
+                    "(không thể thêm vào collection đã tồn tại). Cần tạo lại collection để dùng tìm kiếm hybrid; "
+                    "hiện chỉ dùng dense vector."
+                )
 
         else:  # Collection không tồn tại hoặc đã bị xóa để tạo lại
             print(
                 f"Collection '{collection_name}' chưa tồn tại hoặc được yêu cầu tạo lại. Đang tạo mới..."
             )
+            sparse_vectors_config = None
+            if sparse_vector_name:
+                sparse_vectors_config = {
+                    sparse_vector_name: models.SparseVectorParams(
+                        modifier=models.Modifier.IDF
+                    )
+                }
             client.create_collection(
                 collection_name=collection_name,
                 vectors_config=models.VectorParams(
-                    size=vector_dimension, distance=distance_metric
+                    size=vector_dimension,
+                    distance=distance_metric,
+                    on_disk=(collection_profile or {}).get("on_disk"),
                 ),
+                sparse_vectors_config=sparse_vectors_config,
+                **build_collection_profile_kwargs(collection_profile),
             )
             print(
-                f"Đã tạo collection '{collection_name}' với kích thước vector {vector_dimension} và distance {distance_metric}."
+                f"Đã tạo collection '{collection_name}' với kích thước vector {vector_dimension} và distance {distance_metric}"
+                + (f", sparse vector '{sparse_vector_name}'" if sparse_vector_name else "")
+                + (
+                    f", profile {collection_profile}."
+                    if collection_profile
+                    else "."
+                )
             )
 
-        # Kiểm tra lại một lần nữa sau khi có thể đã tạo
-        client.get_collection(collection_name=collection_name)
+        if payload_index_fields:
+            ensure_payload_indexes(client, collection_name, payload_index_fields, collection_info)
+
         print(f"Kết nối và thiết lập collection '{collection_name}' thành công.")
         return client
 
@@ -127,6 +303,304 @@ def initialize_qdrant_and_collection(
         return None
 
 
+def ensure_payload_indexes(
+    client: QdrantClient,
+    collection_name: str,
+    field_names: list[str],
+    collection_info=None,
+):
+    """
+    Tạo keyword payload index cho các trường còn thiếu (collection_info.payload_schema cho biết
+    index đã có; None = collection vừa tạo, tạo tất cả).
+    """
+    existing_schema = (
+        collection_info.payload_schema if collection_info is not None else {}
+    ) or {}
+    for field_name in field_names:
+        if field_name in existing_schema:
+            continue
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=models.PayloadSchemaType.KEYWORD,
+            wait=True,
+        )
+        print(
+            f"Thông tin (Qdrant Service): Đã tạo payload index (keyword) cho '{field_name}' trên '{collection_name}'."
+        )
+
+
+def collection_info_has_sparse_vector(collection_info, sparse_vector_name: str) -> bool:
+    sparse_vectors_cfg = collection_info.config.params.sparse_vectors or {}
+    return sparse_vector_name in sparse_vectors_cfg
+
+
+def get_startup_collection_info(collection_name: str):
+    """Thông tin collection đã đọc lúc initialize_qdrant_and_collection (None nếu vừa tạo mới)."""
+    return _startup_collection_info.get(collection_name)
+
+
+def collection_has_sparse_vector(
+    qdrant_client: QdrantClient, collection_name: str, sparse_vector_name: str
+) -> bool:
+    """Collection có sparse vector tên sparse_vector_name hay không (để bật tìm kiếm hybrid)."""
+    try:
+        collection_info = get_startup_collection_info(
+            collection_name
+        ) or qdrant_client.get_collection(collection_name=collection_name)
+        return collection_info_has_sparse_vector(collection_info, sparse_vector_name)
+    except Exception as e_info:
+        print(
+            f"CẢNH BÁO (Qdrant Service): Không lấy được cấu hình sparse vector của '{collection_name}': {e_info}"
+        )
+        return False
+
+
+def _build_hybrid_query_kwargs(
+    query_vector: list[float],
+    sparse_query_vector: models.SparseVector,
+    sparse_vector_name: str,
+    limit: int,
+    prefetch_limit: int | None,
+    search_params: models.SearchParams | None = None,
+    query_filter: models.Filter | None = None,
+) -> dict:
+    """
+    Tham số query_points cho tìm kiếm hybrid: dense và sparse chạy song song phía Qdrant
+    (prefetch, cùng một round trip), kết quả được hợp nhất bằng Reciprocal Rank Fusion.
+    """
+    prefetch_limit = max(prefetch_limit or limit, limit)
+    return {
+        "prefetch": [
+            models.Prefetch(
+                query=query_vector,
+                limit=prefetch_limit,
+                params=search_params,
+                filter=query_filter,
+            ),
+            models.Prefetch(
+                query=sparse_query_vector,
+                using=sparse_vector_name,
+                limit=prefetch_limit,
+                filter=query_filter,
+            ),
+        ],
+        "query": models.FusionQuery(fusion=models.Fusion.RRF),
+        "limit": limit,
+    }
+
+
+def estimate_point_bytes(point: models.PointStruct) -> int:
+    """Ước lượng kích thước (byte) của một điểm trong request upsert: vector + payload JSON."""
+    vector = point.vector
+    vector_bytes = 0
+    for value in vector.values() if isinstance(vector, dict) else [vector]:
+        if isinstance(value, models.SparseVector):
+            vector_bytes += 12 * len(value.indices)  # index + value dạng text JSON
+        elif value is not None:
+            vector_bytes += 12 * len(value)  # ~12 ký tự cho một số thực trong JSON
+    payload_bytes = len(
+        json.dumps(point.payload or {}, ensure_ascii=False, default=str).encode("utf-8")
+    )
+    return vector_bytes + payload_bytes + 64  # + id và khung JSON
+
+
+def split_points_by_bytes(
+    points: list, max_batch_bytes: int | None, max_batch_points: int
+) -> list:
+    """
+    Chia điểm thành các batch sao cho mỗi batch không vượt max_batch_bytes (ước lượng) và
+    max_batch_points điểm. Điểm đơn lẻ lớn hơn max_batch_bytes vẫn nằm riêng một batch.
+    """
+    max_batch_points = max(1, int(max_batch_points))
+    batches = []
+    current_batch = []
+    current_bytes = 0
+    for point in points:
+        point_bytes = estimate_point_bytes(point) if max_batch_bytes else 0
+        if current_batch and (
+            len(current_batch) >= max_batch_points
+            or (max_batch_bytes and current_bytes + point_bytes > max_batch_bytes)
+        ):
+            batches.append(current_batch)
+            current_batch = []
+            current_bytes = 0
+        current_batch.append(point)
+        current_bytes += point_bytes
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+class ParallelPointUpserter:
+    """
+    Upsert song song, không chặn: điểm được chia batch theo kích thước payload (byte), mỗi batch
+    gửi với wait=False trên một thread pool (Qdrant chỉ xác nhận đã nhận vào WAL, không chờ áp
+    dụng). Batch lỗi được thử lại với exponential backoff có jitter. finish() là rào chắn cuối:
+    chờ mọi batch, gửi lại batch cuối với wait=True (Qdrant áp dụng thao tác theo thứ tự nên
+    các batch trước đó cũng đã được áp dụng), rồi kiểm tra bằng retrieve rằng mọi điểm đã xác
+    nhận đều có trong collection; điểm thiếu được báo lỗi theo ID.
+    Số batch đang chờ bị giới hạn (2 * parallel_workers): submit() bị chặn khi đủ, tạo
+    backpressure cho stage phía trước.
+    """
+
+    def __init__(
+        self,
+        qdrant_client,
+        collection_name: str,
+        max_batch_points: int = 256,
+        max_batch_bytes: int | None = 4 * 1024 * 1024,
+        parallel_workers: int = 4,
+        max_retries: int = 3,
+        backoff_base_seconds: float = 0.5,
+        wait_for_each_batch: bool = False,
+        verify_page_size: int = 1000,
+    ):
+        self.qdrant_client = qdrant_client
+        self.collection_name = collection_name
+        self.max_batch_points = max_batch_points
+        self.max_batch_bytes = max_batch_bytes
+        self.parallel_workers = max(1, int(parallel_workers))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base_seconds = backoff_base_seconds
+        self.wait_for_each_batch = wait_for_each_batch
+        self.verify_page_size = verify_page_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.parallel_workers, thread_name_prefix="qdrant-upsert"
+        )
+        self._in_flight = threading.BoundedSemaphore(2 * self.parallel_workers)
+        self._lock = threading.Lock()
+        self._futures = []
+        self._acknowledged_point_ids = []
+        self._last_acknowledged_batch = None
+        self._failed_points = []
+        self.points_submitted = 0
+        self.batches_submitted = 0
+        self.retries = 0
+
+    def _upsert_with_retry(self, batch_points: list, wait: bool, label: str) -> bool:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.qdrant_client.upsert(
+                    collection_name=self.collection_name, points=batch_points, wait=wait
+                )
+                return True
+            except Exception as e_qdrant_upsert:
+                if attempt >= self.max_retries:
+                    print(
+                        f"    Lỗi khi upsert {label} ({len(batch_points)} điểm) sau {attempt + 1} lần thử: {e_qdrant_upsert}"
+                    )
+                    return False
+                backoff_seconds = self.backoff_base_seconds * (2**attempt)
+                backoff_seconds *= random.uniform(0.5, 1.0)
+                with self._lock:
+                    self.retries += 1
+                print(
+                    f"    Lỗi khi upsert {label}: {e_qdrant_upsert}. Thử lại sau {backoff_seconds:.1f}s..."
+                )
+                time.sleep(backoff_seconds)
+        return False
+
+    def _run_batch(self, batch_points: list, label: str):
+        try:
+            succeeded = self._upsert_with_retry(
+                batch_points, self.wait_for_each_batch, label
+            )
+            with self._lock:
+                if succeeded:
+                    self._acknowledged_point_ids.extend(
+                        point.id for point in batch_points
+                    )
+                    self._last_acknowledged_batch = batch_points
+                else:
+                    self._failed_points.extend(batch_points)
+        finally:
+            self._in_flight.release()
+
+    def submit(self, points: list):
+        """Chia batch và đưa vào hàng đợi upsert; chặn khi số batch đang chờ đã đạt giới hạn."""
+        for batch_points in split_points_by_bytes(
+            points, self.max_batch_bytes, self.max_batch_points
+        ):
+            self._in_flight.acquire()
+            self.batches_submitted += 1
+            self.points_submitted += len(batch_points)
+            label = f"batch {self.batches_submitted}"
+            try:
+                future = self._executor.submit(self._run_batch, batch_points, label)
+            except Exception:
+                self._in_flight.release()
+                raise
+            self._futures.append(future)
+            self._futures = [f for f in self._futures if not f.done()]
+
+    def _missing_point_ids(self, point_ids: list) -> set:
+        """ID trong point_ids chưa đọc được từ collection (retrieve theo trang, không lấy vector)."""
+        missing = set()
+        for i in range(0, len(point_ids), self.verify_page_size):
+            page_ids = point_ids[i : i + self.verify_page_size]
+            records = self.qdrant_client.retrieve(
+                collection_name=self.collection_name,
+                ids=page_ids,
+                with_payload=False,
+                with_vectors=False,
+            )
+            found_ids = {str(record.id) for record in records}
+            missing.update(
+                point_id for point_id in page_ids if str(point_id) not in found_ids
+            )
+        return missing
+
+    def finish(self, verify: bool = True) -> dict:
+        """
+        Rào chắn cuối: chờ mọi batch, xác nhận dữ liệu đã được áp dụng và upsert lại điểm thiếu.
+        Trả về {"upserted": số điểm đã xác nhận, "failed_points": [PointStruct lỗi], ...}.
+        """
+        for future in self._futures:
+            future.result()
+        self._executor.shutdown(wait=True)
+        self._futures = []
+
+        if self._last_acknowledged_batch is not None and not self.wait_for_each_batch:
+            # Một thao tác wait=True sau cùng: trả về khi mọi thao tác trước đó đã được áp dụng
+            if not self._upsert_with_retry(
+                self._last_acknowledged_batch, True, "batch rào chắn"
+            ):
+                print(
+                    "CẢNH BÁO (Qdrant Service): Rào chắn wait=True thất bại, kết quả kiểm tra có thể thiếu điểm."
+                )
+
+        missing_ids = set()
+        if verify and self._acknowledged_point_ids:
+            try:
+                missing_ids = self._missing_point_ids(self._acknowledged_point_ids)
+            except Exception as e_verify:
+                print(
+                    f"CẢNH BÁO (Qdrant Service): Không kiểm tra được các điểm đã upsert: {e_verify}"
+                )
+            if missing_ids:
+                # Không giữ lại dữ liệu của batch đã xác nhận (để bộ nhớ không tăng theo corpus):
+                # báo lỗi theo ID để phía gọi giữ điểm cũ và index lại ở lần chạy sau
+                print(
+                    f"CẢNH BÁO (Qdrant Service): {len(missing_ids)} điểm đã được xác nhận nhưng không có trong collection sau rào chắn."
+                )
+        failed_ids = {str(point.id) for point in self._failed_points}
+        failed_ids.update(str(point_id) for point_id in missing_ids)
+        print(
+            f"Hoàn thành upsert {self.points_submitted - len(failed_ids)}/{self.points_submitted} điểm "
+            f"({self.batches_submitted} batch, {self.parallel_workers} luồng, {self.retries} lần thử lại)."
+        )
+        return {
+            "submitted": self.points_submitted,
+            "batches": self.batches_submitted,
+            "upserted": self.points_submitted - len(failed_ids),
+            "retries": self.retries,
+            "missing_after_barrier": len(missing_ids),
+            "failed_points": list(self._failed_points),
+            "failed_point_ids": failed_ids,
+        }
+
+
 def upsert_data_to_qdrant(
     qdrant_client: QdrantClient,
     collection_name: str,
@@ -134,9 +608,15 @@ def upsert_data_to_qdrant(
         models.PointStruct
     ],  # Sử dụng models.PointStruct từ qdrant_client
     batch_size: int = 100,
+    max_batch_bytes: int | None = None,
+    parallel_workers: int = 1,
+    wait_for_each_batch: bool = True,
+    max_retries: int = 3,
+    backoff_base_seconds: float = 0.5,
 ):
     """
-    Upsert một danh sách các PointStruct vào Qdrant theo batch.
+    Upsert một danh sách các PointStruct vào Qdrant theo batch (tối đa batch_size điểm và
+    max_batch_bytes byte mỗi batch), song song trên parallel_workers luồng (ParallelPointUpserter).
     """
     if not points_to_upsert:
         print("Không có điểm dữ liệu nào để upsert vào Qdrant.")
@@ -145,31 +625,18 @@ def upsert_data_to_qdrant(
     print(
         f"Chuẩn bị upsert {len(points_to_upsert)} điểm vào Qdrant collection '{collection_name}'..."
     )
-    success_count = 0
-    total_points = len(points_to_upsert)
-    num_batches = (total_points - 1) // batch_size + 1 if total_points > 0 else 0
-
-    for i in range(0, total_points, batch_size):
-        batch_points = points_to_upsert[i : i + batch_size]
-        current_batch_num = i // batch_size + 1
-        print(
-            f"  Đang upsert batch {current_batch_num}/{num_batches} ({len(batch_points)} điểm)..."
-        )
-        try:
-            qdrant_client.upsert(
-                collection_name=collection_name, points=batch_points, wait=True
-            )
-            success_count += len(batch_points)
-        except Exception as e_qdrant_upsert:
-            print(
-                f"    Lỗi khi upsert batch {current_batch_num} vào Qdrant: {e_qdrant_upsert}"
-            )
-        if num_batches > 1 and current_batch_num < num_batches:
-            time.sleep(0.1)
-
-    print(
-        f"Hoàn thành việc upsert dữ liệu. {success_count}/{total_points} điểm đã được thử upsert."
+    upserter = ParallelPointUpserter(
+        qdrant_client,
+        collection_name,
+        max_batch_points=batch_size,
+        max_batch_bytes=max_batch_bytes,
+        parallel_workers=parallel_workers,
+        max_retries=max_retries,
+        backoff_base_seconds=backoff_base_seconds,
+        wait_for_each_batch=wait_for_each_batch,
     )
+    upserter.submit(points_to_upsert)
+    upsert_result = upserter.finish()
     try:
         collection_info_after = qdrant_client.get_collection(
             collection_name=collection_name
@@ -179,7 +646,69 @@ def upsert_data_to_qdrant(
         )
     except Exception as e_info:
         print(f"Không thể lấy thông tin collection sau khi upsert: {e_info}")
-    return success_count == total_points
+    return not upsert_result["failed_point_ids"]
+
+
+def overwrite_payloads_in_qdrant(
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    payloads_by_point_id: dict,
+    batch_size: int = 256,
+) -> bool:
+    """
+    Ghi đè payload của các điểm đã có (vector giữ nguyên), nhiều điểm trong một request
+    batch_update_points.
+    """
+    if not payloads_by_point_id:
+        return True
+    point_ids = list(payloads_by_point_id)
+    print(
+        f"Ghi đè payload của {len(point_ids)} điểm trong collection '{collection_name}'..."
+    )
+    success = True
+    for i in range(0, len(point_ids), batch_size):
+        batch_ids = point_ids[i : i + batch_size]
+        try:
+            qdrant_client.batch_update_points(
+                collection_name=collection_name,
+                update_operations=[
+                    models.OverwritePayloadOperation(
+                        overwrite_payload=models.SetPayload(
+                            payload=payloads_by_point_id[point_id], points=[point_id]
+                        )
+                    )
+                    for point_id in batch_ids
+                ],
+                wait=True,
+            )
+        except Exception as e_payload:
+            print(f"    Lỗi khi ghi đè payload (batch từ vị trí {i}): {e_payload}")
+            success = False
+    return success
+
+
+def delete_points_from_qdrant(
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    point_ids: list,
+    batch_size: int = 1000,
+) -> bool:
+    """Xóa các điểm theo ID (theo batch)."""
+    if not point_ids:
+        return True
+    print(f"Xóa {len(point_ids)} điểm không còn dùng khỏi collection '{collection_name}'...")
+    success = True
+    for i in range(0, len(point_ids), batch_size):
+        try:
+            qdrant_client.delete(
+                collection_name=collection_name,
+                points_selector=models.PointIdsList(points=point_ids[i : i + batch_size]),
+                wait=True,
+            )
+        except Exception as e_delete:
+            print(f"    Lỗi khi xóa điểm (batch từ vị trí {i}): {e_delete}")
+            success = False
+    return success
 
 
 def search_qdrant_collection(  # Hàm này dùng cho chatbot, không phải cho pipeline embedding
@@ -187,16 +716,129 @@ def search_qdrant_collection(  # Hàm này dùng cho chatbot, không phải cho
     collection_name: str,
     query_vector: list[float],
     limit: int,
+    sparse_query_vector: models.SparseVector | None = None,
+    sparse_vector_name: str | None = None,
+    prefetch_limit: int | None = None,
+    payload_fields: list[str] | None = None,
+    timeout: int | None = None,
+    search_params: models.SearchParams | None = None,
+    query_filter: models.Filter | None = None,
+    with_vectors: bool | list[str] = False,
 ) -> list:
     """
     Thực hiện tìm kiếm vector trong Qdrant collection.
+    Nếu có sparse_query_vector: tìm kiếm hybrid dense + sparse, hợp nhất bằng RRF.
+    payload_fields: chỉ lấy các trường payload này (None = toàn bộ payload).
+    timeout: timeout (giây) riêng cho lần gọi này (None = timeout mặc định của client).
+    with_vectors: trả về cả vector của các điểm (dùng cho bước MMR); list tên vector (ví dụ [""]:
+    chỉ dense vector) để không kéo theo sparse vector của collection hybrid.
     """
+    with_payload = payload_fields if payload_fields else True
     try:
+        if sparse_query_vector is not None and sparse_vector_name:
+            return qdrant_client.query_points(
+                collection_name=collection_name,
+                with_payload=with_payload,
+                with_vectors=with_vectors,
+                timeout=timeout,
+                **_build_hybrid_query_kwargs(
+                    query_vector,
+                    sparse_query_vector,
+                    sparse_vector_name,
+                    limit,
+                    prefetch_limit,
+                    search_params,
+                    query_filter,
+                ),
+            ).points
         search_results = qdrant_client.search(
             collection_name=collection_name,
             query_vector=query_vector,
             limit=limit,
-            with_payload=True,
+            with_payload=with_payload,
+            with_vectors=with_vectors,
+            timeout=timeout,
+            search_params=search_params,
+            query_filter=query_filter,
+        )
+        return search_results
+    except Exception as e_q_search:
+        print(
+            f"    Lỗi khi tìm kiếm trên Qdrant collection '{collection_name}': {e_q_search}"
+        )
+        return []
+
+
+def create_async_qdrant_client(
+    connection_params: dict, transport_params: dict | None = None
+) -> AsyncQdrantClient | None:
+    """
+    Tạo AsyncQdrantClient cho đường request của API (collection đã được kiểm tra
+    bởi initialize_qdrant_and_collection nên ở đây không gọi thêm API nào).
+    """
+    if not connection_params or not (
+        connection_params.get("url") or connection_params.get("host")
+    ):
+        print(
+            "LỖI (Qdrant Service): Tham số kết nối Qdrant (connection_params) không hợp lệ hoặc thiếu url/host."
+        )
+        return None
+    try:
+        return AsyncQdrantClient(
+            **build_qdrant_client_kwargs(connection_params, transport_params)
+        )
+    except Exception as e:
+        print(
+            f"LỖI (Qdrant Service): Không thể tạo AsyncQdrantClient: {type(e).__name__} - {e}"
+        )
+        return None
+
+
+async def search_qdrant_collection_async(
+    qdrant_client: AsyncQdrantClient,
+    collection_name: str,
+    query_vector: list[float],
+    limit: int,
+    sparse_query_vector: models.SparseVector | None = None,
+    sparse_vector_name: str | None = None,
+    prefetch_limit: int | None = None,
+    payload_fields: list[str] | None = None,
+    timeout: int | None = None,
+    search_params: models.SearchParams | None = None,
+    query_filter: models.Filter | None = None,
+    with_vectors: bool | list[str] = False,
+) -> list:
+    """
+    Phiên bản async của search_qdrant_collection (dùng cho API).
+    """
+    with_payload = payload_fields if payload_fields else True
+    try:
+        if sparse_query_vector is not None and sparse_vector_name:
+            query_response = await qdrant_client.query_points(
+                collection_name=collection_name,
+                with_payload=with_payload,
+                with_vectors=with_vectors,
+                timeout=timeout,
+                **_build_hybrid_query_kwargs(
+                    query_vector,
+                    sparse_query_vector,
+                    sparse_vector_name,
+                    limit,
+                    prefetch_limit,
+                    search_params,
+                    query_filter,
+                ),
+            )
+            return query_response.points
+        search_results = await qdrant_client.search(
+            collection_name=collection_name,
+            query_vector=query_vector,
+            limit=limit,
+            with_payload=with_payload,
+            with_vectors=with_vectors,
+            timeout=timeout,
+            search_params=search_params,
+            query_filter=query_filter,
         )
         return search_results
     except Exception as e_q_search:
@@ -204,3 +846,81 @@ def search_qdrant_collection(  # Hàm này dùng cho chatbot, không phải cho
             f"    Lỗi khi tìm kiếm trên Qdrant collection '{collection_name}': {e_q_search}"
         )
         return []
+
+
+async def search_qdrant_collection_batch_async(
+    qdrant_client: AsyncQdrantClient,
+    collection_name: str,
+    query_vectors: list[list[float]],
+    limit: int,
+    sparse_query_vectors: list[models.SparseVector] | None = None,
+    sparse_vector_name: str | None = None,
+    prefetch_limit: int | None = None,
+    payload_fields: list[str] | None = None,
+    timeout: int | None = None,
+    search_params: models.SearchParams | None = None,
+    query_filter: models.Filter | None = None,
+    with_vectors: bool | list[str] = False,
+    query_filters: list[models.Filter | None] | None = None,
+) -> list[list]:
+    """
+    Tìm kiếm nhiều vector trong MỘT request (query_batch_points). Trả về list kết quả
+    cùng thứ tự với query_vectors; lỗi -> list rỗng cho mọi câu hỏi.
+    Nếu có sparse_query_vectors: mỗi câu hỏi là một truy vấn hybrid (prefetch + RRF).
+    query_filters: bộ lọc riêng cho từng câu hỏi (thay cho query_filter dùng chung).
+    """
+    with_payload = payload_fields if payload_fields else True
+    query_requests = []
+    for i, query_vector in enumerate(query_vectors):
+        request_filter = query_filters[i] if query_filters is not None else query_filter
+        if sparse_query_vectors is not None and sparse_vector_name:
+            query_kwargs = _build_hybrid_query_kwargs(
+                query_vector,
+                sparse_query_vectors[i],
+                sparse_vector_name,
+                limit,
+                prefetch_limit,
+                search_params,
+                request_filter,
+            )
+        else:
+            query_kwargs = {
+                "query": query_vector,
+                "limit": limit,
+                "params": search_params,
+                "filter": request_filter,
+            }
+        query_requests.append(
+            models.QueryRequest(
+                with_payload=with_payload, with_vector=with_vectors, **query_kwargs
+            )
+        )
+    try:
+        query_responses = await qdrant_client.query_batch_points(
+            collection_name=collection_name, requests=query_requests, timeout=timeout
+        )
+        return [query_response.points for query_response in query_responses]
+    except Exception as e_q_search:
+        print(
+            f"    Lỗi khi tìm kiếm batch trên Qdrant collection '{collection_name}': {e_q_search}"
+        )
+        return [[] for _ in query_vectors]
+
+
+async def warm_up_async_qdrant_client(
+    qdrant_client: AsyncQdrantClient, collection_name: str
+) -> bool:
+    """
+    Mở sẵn kết nối (kênh gRPC / kết nối HTTP/2 trong pool) lúc startup để request đầu tiên
+    không phải chịu chi phí TCP + TLS handshake.
+    """
+    try:
+        start_time = time.perf_counter()
+        await qdrant_client.collection_exists(collection_name=collection_name)
+        print(
+            f"Thông tin (Qdrant Service): Kết nối async tới Qdrant đã sẵn sàng ({(time.perf_counter() - start_time) * 1000:.1f} ms)."
+        )
+        return True
+    except Exception as e_warm:
+        print(f"CẢNH BÁO (Qdrant Service): Không làm ấm được kết nối Qdrant: {e_warm}")
+        return False
@@ -0,0 +1,177 @@
+# src/vector_store/streaming_pipeline.py
+"""
+Pipeline index dạng luồng: KG -> embed -> upsert chạy song song theo từng "cửa sổ" mục,
+nối với nhau bằng các hàng đợi có giới hạn.
+
+- Nguồn (generator) sinh các cửa sổ mục; mỗi stage chạy trong một thread riêng, nhận cửa sổ
+  từ hàng đợi phía trước, xử lý rồi đẩy kết quả sang hàng đợi phía sau.
+- Hàng đợi có maxsize nên stage nhanh bị chặn khi stage sau chưa kịp xử lý (backpressure):
+  bộ nhớ chỉ giữ khoảng (số stage + 1) * (queue_size + 1) cửa sổ, không phụ thuộc kích thước corpus.
+- Điểm đầu tiên tới Qdrant ngay khi cửa sổ đầu tiên embed xong, thay vì chờ embed hết.
+- Mỗi stage có bộ đếm số mục, số cửa sổ, thời gian bận và throughput (StageStats).
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+_END_OF_STREAM = object()  # Đánh dấu nguồn đã hết, được chuyển tiếp qua mọi stage
+
+
+def iter_windows(items: Iterable[Any], window_size: int) -> Iterator[List[Any]]:
+    """Gom một iterable thành các list tối đa window_size phần tử (không đọc trước toàn bộ)."""
+    window_size = max(1, int(window_size))
+    window = []
+    for item in items:
+        window.append(item)
+        if len(window) >= window_size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+
+class StageStats:
+    """Bộ đếm của một stage: số mục vào / ra, số cửa sổ, thời gian bận (giây)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.windows = 0
+        self.busy_seconds = 0.0
+        self.waiting_seconds = 0.0  # Thời gian bị chặn vì stage sau chưa nhận (backpressure)
+        self.errors = 0
+        self._started_at = None
+        self._finished_at = None
+
+    def start(self):
+        self._started_at = time.monotonic()
+
+    def finish(self):
+        self._finished_at = time.monotonic()
+
+    def record(self, items_in: int, items_out: int, busy_seconds: float):
+        self.items_in += items_in
+        self.items_out += items_out
+        self.windows += 1
+        self.busy_seconds += busy_seconds
+
+    def elapsed_seconds(self) -> float:
+        if self._started_at is None:
+            return 0.0
+        return (self._finished_at or time.monotonic()) - self._started_at
+
+    def summary(self) -> dict:
+        elapsed = self.elapsed_seconds()
+        return {
+            "stage": self.name,
+            "windows": self.windows,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "waiting_seconds": round(self.waiting_seconds, 3),
+            "elapsed_seconds": round(elapsed, 3),
+            "items_per_second": (
+                round(self.items_in / elapsed, 2) if elapsed > 0 else None
+            ),
+        }
+
+
+def _put(out_queue: queue.Queue, value, stats: StageStats):
+    wait_started = time.monotonic()
+    out_queue.put(value)
+    stats.waiting_seconds += time.monotonic() - wait_started
+
+
+def run_streaming_pipeline(
+    source_windows: Iterable[Sequence[Any]],
+    stages: Sequence[Tuple[str, Callable[[Sequence[Any]], Optional[Sequence[Any]]]]],
+    queue_size: int = 2,
+    log_every_windows: int = 10,
+) -> List[dict]:
+    """
+    Chạy source_windows qua lần lượt các stage (tên, hàm). Hàm của stage nhận một cửa sổ và trả
+    về cửa sổ cho stage sau (None hoặc rỗng: không chuyển tiếp). Kết quả của stage cuối bị bỏ.
+    Lỗi trong một stage chỉ làm mất cửa sổ đó (đếm vào errors); lỗi ở nguồn dừng nguồn.
+    Trả về danh sách StageStats.summary() theo thứ tự: nguồn, rồi các stage.
+    """
+    queue_size = max(1, int(queue_size))
+    source_stats = StageStats("source")
+    stage_stats = [StageStats(name) for name, _fn in stages]
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+
+    def run_source():
+        source_stats.start()
+        iterator = iter(source_windows)
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    window = next(iterator)
+                except StopIteration:
+                    break
+                source_stats.record(
+                    len(window), len(window), time.monotonic() - started
+                )
+                _put(queues[0], window, source_stats)
+        except Exception as e_source:
+            source_stats.errors += 1
+            print(
+                f"LỖI (streaming_pipeline): Nguồn dữ liệu gặp lỗi, dừng đọc tiếp: {e_source}"
+            )
+        finally:
+            queues[0].put(_END_OF_STREAM)
+            source_stats.finish()
+
+    def run_stage(position: int):
+        name, stage_fn = stages[position]
+        stats = stage_stats[position]
+        in_queue = queues[position]
+        out_queue = queues[position + 1] if position + 1 < len(queues) else None
+        stats.start()
+        while True:
+            window = in_queue.get()
+            if window is _END_OF_STREAM:
+                break
+            started = time.monotonic()
+            try:
+                result = stage_fn(window)
+            except Exception as e_stage:
+                stats.errors += 1
+                print(
+                    f"LỖI (streaming_pipeline): Stage '{name}' lỗi ở một cửa sổ {len(window)} mục: {e_stage}"
+                )
+                result = None
+            stats.record(len(window), len(result or ()), time.monotonic() - started)
+            if log_every_windows and stats.windows % log_every_windows == 0:
+                print(
+                    f"    [{name}] {stats.windows} cửa sổ, {stats.items_in} mục ({stats.summary()['items_per_second']} mục/giây)."
+                )
+            if out_queue is not None and result:
+                _put(out_queue, result, stats)
+        if out_queue is not None:
+            out_queue.put(_END_OF_STREAM)
+        stats.finish()
+
+    threads = [threading.Thread(target=run_source, name="index-source", daemon=True)]
+    threads += [
+        threading.Thread(
+            target=run_stage, args=(position,), name=f"index-{name}", daemon=True
+        )
+        for position, (name, _fn) in enumerate(stages)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summaries = [source_stats.summary()] + [stats.summary() for stats in stage_stats]
+    for summary in summaries:
+        print(
+            f"    Stage '{summary['stage']}': {summary['items_in']} mục / {summary['windows']} cửa sổ, "
+            f"bận {summary['busy_seconds']}s, chờ stage sau {summary['waiting_seconds']}s, "
+            f"{summary['items_per_second']} mục/giây, {summary['errors']} lỗi."
+        )
+    return summaries